@@ -5,7 +5,6 @@ import subprocess
 import sys
 import uuid
 import time
-import queue
 import asyncio
 import traceback
 
@@ -17,7 +16,6 @@ from config.logger import setup_logging
 from core.utils.dialogue import Message, Dialogue
 from core.handle.textHandle import handleTextMessage
 from core.utils.util import (
-    get_string_no_punctuation_or_emoji,
     extract_json_from_string,
     initialize_modules,
     check_vad_update,
@@ -26,7 +24,6 @@ from core.utils.util import (
 )
 from typing import Dict, Any
 from collections import deque
-from concurrent.futures import ThreadPoolExecutor, TimeoutError
 from core.utils.modules_initialize import (
     initialize_modules,
     initialize_tts,
@@ -37,7 +34,12 @@ from core.providers.tts.default import DefaultTTS
 from core.handle.sendAudioHandle import sendAudioMessage
 from core.handle.receiveAudioHandle import handleAudioMessage
 from core.handle.functionHandler import FunctionHandler
-from core.utils.dialogue import Message, Dialogue
+from core.utils.dialogue import (
+    Message,
+    Dialogue,
+    SUMMARY_PROMPT,
+    format_summary_input,
+)
 from core.providers.asr.dto.dto import InterfaceType
 from core.handle.textHandle import handleTextMessage
 from core.providers.tools.unified_tool_handler import UnifiedToolHandler
@@ -51,6 +53,9 @@ from config.logger import setup_logging, build_module_string, create_connection_
 from config.manage_api_client import DeviceNotFoundException, DeviceBindException
 from core.utils.output_counter import add_device_output
 from core.utils.prompt_manager import PromptManager
+from core.utils.prompt_layout import prefix_hash, prefix_stats, sort_functions
+from core.utils.audio_buffer import PCMRingBuffer
+from core.utils.runtime import runtime, WorkloadType, LoopQueue
 from core.utils.voiceprint_provider import VoiceprintProvider
 from core.utils import textUtils
 from core.handle.reportHandle import enqueue_tts_report, report
@@ -100,16 +105,17 @@ class ConnectionHandler:
         self.client_abort = False
         self.client_listen_mode = "auto"
 
-        # 线程任务相关
+        # 线程任务相关，阻塞任务统一提交到进程级共享运行时
         self.loop = asyncio.get_event_loop()
         self.stop_event = threading.Event()
-        self.tts_queue = queue.Queue()
-        self.audio_play_queue = queue.Queue()
-        self.executor = ThreadPoolExecutor(max_workers=10)
-
-        # 上报线程
-        self.report_queue = queue.Queue()
-        self.report_thread = None
+        self.tts_queue = LoopQueue(self.loop)
+        self.audio_play_queue = LoopQueue(self.loop)
+        self.tts_priority_task = None
+        self.audio_play_priority_task = None
+
+        # 上报任务
+        self.report_queue = LoopQueue(self.loop)
+        self.report_task = None
         # TODO(haotian): 2025/5/12 可以通过修改此处，调节asr的上报和tts的上报
         self.report_asr_enable = self.read_config_from_api
         self.report_tts_enable = self.read_config_from_api
@@ -128,21 +134,43 @@ class ConnectionHandler:
         self.voiceprint_provider = None
 
         # vad相关变量
-        self.client_audio_buffer = bytearray()
+        self.client_audio_buffer = PCMRingBuffer()
         self.client_have_voice = False
         self.client_have_voice_last_time = 0.0
         self.client_no_voice_last_time = 0.0
         self.client_voice_stop = False
         self.client_voice_window = deque(maxlen=5)
         self.last_is_voice = False
+        self.vad_stream = None
 
         # asr相关变量
         self.asr_audio = []
+        # 未检测到声音时保留最新的10帧音频，有声音时并入asr_audio，解决ASR句首丢字问题
+        self.asr_audio_preroll = deque(maxlen=10)
+        # 在线识别模式下当前这句话的识别流
+        self.asr_online_session = None
         self.asr_server_receive = True
 
         # llm相关变量
         self.llm_finish_task = False
-        self.dialogue = Dialogue()
+        window_config = self.config.get("dialogue_window", {})
+        max_tokens = window_config.get("max_tokens", "4000")
+        self.dialogue = Dialogue(
+            static_prefix=str(self.config.get("prompt_prefix_cache", True)).lower()
+            in ("true", "1", "yes"),
+            max_tokens=int(max_tokens) if max_tokens else 0,
+        )
+        # 是否为移出窗口的历史对话生成摘要，以及正在进行的摘要任务
+        self.dialogue_summary_enabled = str(
+            window_config.get("summary", True)
+        ).lower() in ("true", "1", "yes")
+        self._summary_future = None
+        # 上一次请求稳定前缀的哈希
+        self.prompt_prefix_hash = None
+        # 当前对话任务，以及正在读取大模型输出流、进行意图识别的任务（打断时取消）
+        self.chat_task = None
+        self.llm_stream_task = None
+        self.intent_task = None
 
         # tts相关变量
         self.sentence_id = None
@@ -220,18 +248,13 @@ class ConnectionHandler:
             # 获取差异化配置
             self._initialize_private_config()
             # 异步初始化
-            self.executor.submit(self._initialize_components)
-            # tts 消化线程
-            self.tts_priority_thread = threading.Thread(
-                target=self._tts_priority_thread, daemon=True
+            runtime.submit(WorkloadType.NETWORK, self._initialize_components)
+            # tts 消化任务
+            self.tts_priority_task = asyncio.create_task(self._tts_priority_task())
+            # 音频播放 消化任务
+            self.audio_play_priority_task = asyncio.create_task(
+                self._audio_play_priority_task()
             )
-            self.tts_priority_thread.start()
-
-            # 音频播放 消化线程
-            self.audio_play_priority_thread = threading.Thread(
-                target=self._audio_play_priority_thread, daemon=True
-            )
-            self.audio_play_priority_thread.start()
 
             try:
                 async for message in self.websocket:
@@ -263,25 +286,13 @@ class ConnectionHandler:
         """保存记忆并关闭连接"""
         try:
             if self.memory:
-                # 使用线程池异步保存记忆
-                def save_memory_task():
-                    try:
-                        # 创建新事件循环（避免与主循环冲突）
-                        loop = asyncio.new_event_loop()
-                        asyncio.set_event_loop(loop)
-                        loop.run_until_complete(
-                            self.memory.save_memory(self.dialogue.dialogue)
-                        )
-                    except Exception as e:
-                        self.logger.bind(tag=TAG).error(f"保存记忆失败: {e}")
-                    finally:
-                        try:
-                            loop.close()
-                        except Exception:
-                            pass
-
-                # 启动线程保存记忆，不等待完成
-                threading.Thread(target=save_memory_task, daemon=True).start()
+                # 在共享线程池中保存记忆，不等待完成
+                future = runtime.submit_coroutine(
+                    WorkloadType.NETWORK,
+                    self.memory.save_memory,
+                    self.dialogue.dialogue,
+                )
+                future.add_done_callback(self._on_memory_saved)
         except Exception as e:
             self.logger.bind(tag=TAG).error(f"保存记忆失败: {e}")
         finally:
@@ -293,6 +304,10 @@ class ConnectionHandler:
                     f"保存记忆后关闭连接失败: {close_error}"
                 )
 
+    def _on_memory_saved(self, future):
+        if future.exception() is not None:
+            self.logger.bind(tag=TAG).error(f"保存记忆失败: {future.exception()}")
+
     async def reset_timeout(self):
         """重置超时计时器"""
         if self.timeout_task:
@@ -417,17 +432,16 @@ class ConnectionHandler:
             self.logger.bind(tag=TAG).info("系统提示词已增强更新")
 
     def _init_report_threads(self):
-        """初始化ASR和TTS上报线程"""
+        """初始化ASR和TTS上报任务"""
         if not self.read_config_from_api or self.need_bind:
             return
         if self.chat_history_conf == 0:
             return
-        if self.report_thread is None or not self.report_thread.is_alive():
-            self.report_thread = threading.Thread(
-                target=self._report_worker, daemon=True
+        if self.report_task is None or self.report_task.done():
+            self.report_task = asyncio.run_coroutine_threadsafe(
+                self._report_worker(), self.loop
             )
-            self.report_thread.start()
-            self.logger.bind(tag=TAG).info("TTS上报线程已启动")
+            self.logger.bind(tag=TAG).info("TTS上报任务已启动")
 
     def _initialize_tts(self):
         """初始化TTS"""
@@ -633,54 +647,13 @@ class ConnectionHandler:
         # 更新系统prompt至上下文
         self.dialogue.update_system_message(self.prompt)
 
-    def _process_text_segment(self, current_text, processed_chars, text_index):
-        """处理文本分段，根据标点符号或字符长度进行分段"""
-        # 查找最后一个有效标点
-        punctuations = ("。", ".", "？", "?", "！", "!", "；", ";", "：")
-        last_punct_pos = -1
-        number_flag = True
-        for punct in punctuations:
-            pos = current_text.rfind(punct)
-            prev_char = current_text[pos - 1] if pos - 1 >= 0 else ""
-            # 如果.前面是数字统一判断为小数
-            if prev_char.isdigit() and punct == ".":
-                number_flag = False
-            if pos > last_punct_pos and number_flag:
-                last_punct_pos = pos
-
-        # 如果找到标点符号，按标点符号分段
-        if last_punct_pos != -1:
-            segment_text_raw = current_text[: last_punct_pos + 1]
-            segment_text = get_string_no_punctuation_or_emoji(segment_text_raw)
-            if segment_text:
-                text_index += 1
-                self.recode_first_last_text(segment_text, text_index)
-                future = self.executor.submit(
-                    self.speak_and_play, segment_text, text_index
-                )
-                self.tts_queue.put(future)
-                return len(segment_text_raw), text_index
-        # 如果没有找到标点符号，但文本长度超过10个字符，也进行分段
-        elif len(current_text) > 10:
-            segment_text_raw = current_text[:10]
-            segment_text = get_string_no_punctuation_or_emoji(segment_text_raw)
-            if segment_text:
-                text_index += 1
-                self.recode_first_last_text(segment_text, text_index)
-                future = self.executor.submit(
-                    self.speak_and_play, segment_text, text_index
-                )
-                self.tts_queue.put(future)
-                return len(segment_text_raw), text_index
-        
-        return 0, text_index
-
-    def chat(self, query, depth=0):
+    async def chat(self, query, depth=0):
         self.logger.bind(tag=TAG).info(f"大模型收到用户消息: {query}")
         self.llm_finish_task = False
 
         # 为最顶层时新建会话ID和发送FIRST请求
         if depth == 0:
+            self.client_abort = False
             self.sentence_id = str(uuid.uuid4().hex)
             self.dialogue.put(Message(role="user", content=query))
             self.tts.tts_text_queue.put(
@@ -691,136 +664,38 @@ class ConnectionHandler:
                 )
             )
 
-        response_message = []
-        processed_chars = 0  # 跟踪已处理的字符位置
-        try:
-            # 使用带记忆的对话
-            memory_str = None
-            if self.memory is not None:
-                future = asyncio.run_coroutine_threadsafe(
-                    self.memory.query_memory(query), self.loop
-                )
-                memory_str = future.result()
-
-            if self.intent_type == "function_call" and functions is not None:
-                # 使用支持functions的streaming接口
-                llm_responses = self.llm.response_with_functions(
-                    self.session_id,
-                    self.dialogue.get_llm_dialogue_with_memory(
-                        memory_str, self.config.get("voiceprint", {})
-                    ),
-                    functions=functions,
-                )
-            else:
-                llm_responses = self.llm.response(
-                    self.session_id,
-                    self.dialogue.get_llm_dialogue_with_memory(
-                        memory_str, self.config.get("voiceprint", {})
-                    ),
-                )
-        except Exception as e:
-            self.logger.bind(tag=TAG).error(f"LLM 处理出错 {query}: {e}")
-            return None
-
-        self.llm_finish_task = False
-        text_index = 0
-        for content in llm_responses:
-            response_message.append(content)
-            if self.client_abort:
-                break
-
-            # 合并当前全部文本并处理未分割部分
-            full_text = "".join(response_message)
-            current_text = full_text[processed_chars:]  # 从未处理的位置开始
-
-            # 查找最后一个有效标点
-            punctuations = ("。", ".", "？", "?", "！", "!", "；", ";", "：")
-            last_punct_pos = -1
-            number_flag = True
-            for punct in punctuations:
-                pos = current_text.rfind(punct)
-                prev_char = current_text[pos - 1] if pos - 1 >= 0 else ""
-                # 如果.前面是数字统一判断为小数
-                if prev_char.isdigit() and punct == ".":
-                    number_flag = False
-                if pos > last_punct_pos and number_flag:
-                    last_punct_pos = pos
-
-            # 找到分割点则处理
-            if last_punct_pos != -1:
-                segment_text_raw = current_text[: last_punct_pos + 1]
-                segment_text = get_string_no_punctuation_or_emoji(segment_text_raw)
-                if segment_text:
-                    # 强制设置空字符，测试TTS出错返回语音的健壮性
-                    # if text_index % 2 == 0:
-                    #     segment_text = " "
-                    text_index += 1
-                    self.recode_first_last_text(segment_text, text_index)
-                    future = self.executor.submit(
-                        self.speak_and_play, segment_text, text_index
-                    )
-                    self.tts_queue.put(future)
-                    processed_chars += len(segment_text_raw)  # 更新已处理字符位置
-
-        # 处理最后剩余的文本
-        full_text = "".join(response_message)
-        remaining_text = full_text[processed_chars:]
-        if remaining_text:
-            segment_text = get_string_no_punctuation_or_emoji(remaining_text)
-            if segment_text:
-                text_index += 1
-                self.recode_first_last_text(segment_text, text_index)
-                future = self.executor.submit(
-                    self.speak_and_play, segment_text, text_index
-                )
-                self.tts_queue.put((future, text_index))
-
-        self.llm_finish_task = True
-        self.dialogue.put(Message(role="assistant", content="".join(response_message)))
-        self.logger.bind(tag=TAG).debug(
-            json.dumps(self.dialogue.get_llm_dialogue(), indent=4, ensure_ascii=False)
-        )
-        return True
-
-    def chat_with_function_calling(self, query, tool_call=False):
-        self.logger.bind(tag=TAG).debug(f"Chat with function calling start: {query}")
-        """Chat with function calling for intent detection using streaming"""
-
-        if not tool_call:
-            self.dialogue.put(Message(role="user", content=query))
-
-        # Define intent functions
         functions = None
-        if hasattr(self, "func_handler"):
-            functions = self.func_handler.get_functions()
+        if self.intent_type == "function_call" and self.func_handler is not None:
+            # 工具按名称排序，注册顺序不影响请求前缀
+            functions = sort_functions(self.func_handler.get_functions())
         response_message = []
-        processed_chars = 0  # 跟踪已处理的字符位置
 
         try:
-            start_time = time.time()
-
             # 使用带记忆的对话
             memory_str = None
             if self.memory is not None:
-                future = asyncio.run_coroutine_threadsafe(
-                    self.memory.query_memory(query), self.loop
-                )
-                memory_str = future.result()
-
-            # self.logger.bind(tag=TAG).info(f"对话记录: {self.dialogue.get_llm_dialogue_with_memory(memory_str)}")
+                memory_str = await self.memory.query_memory(query)
 
-            # 使用支持functions的streaming接口
-            llm_responses = self.llm.response_with_functions(
-                self.session_id,
-                self.dialogue.get_llm_dialogue_with_memory(memory_str),
-                functions=functions,
+            dialogue = self.dialogue.get_llm_dialogue_with_memory(
+                memory_str,
+                self.config.get("voiceprint", {}),
+                self.prompt_manager.build_context_prompt(self.client_ip),
             )
+            self._record_prompt_prefix(dialogue, functions)
+            # 在事件循环中异步读取输出流，打断时关闭上游连接，不占用线程
+            if functions is not None:
+                # 使用支持functions的streaming接口
+                llm_responses = self.llm.response_with_functions_stream(
+                    self.session_id, dialogue, functions=functions
+                )
+            else:
+                llm_responses = self.llm.response_stream(self.session_id, dialogue)
         except Exception as e:
             self.logger.bind(tag=TAG).error(f"LLM 处理出错 {query}: {e}")
             return None
 
-        self.llm_finish_task = False
-        text_index = 0
+        # 大模型输出按分段投递给TTS，不再每个token一条消息
+        segmenter = self.tts.create_text_segmenter()
 
         # 处理流式响应
         tool_call_flag = False
@@ -828,51 +703,57 @@ class ConnectionHandler:
         function_id = None
         function_arguments = ""
         content_arguments = ""
-        self.client_abort = False
         emotion_flag = True
-        for response in llm_responses:
-            content, tools_call = response
-
-            if "content" in response:
-                content = response["content"]
-                tools_call = None
-            if content is not None and len(content) > 0:
-                content_arguments += content
-
-            if not tool_call_flag and content_arguments.startswith("<tool_call>"):
-                # print("content_arguments", content_arguments)
-                tool_call_flag = True
-
-            if tools_call is not None:
-                tool_call_flag = True
-                if tools_call[0].id is not None:
-                    function_id = tools_call[0].id
-                if tools_call[0].function.name is not None:
-                    function_name = tools_call[0].function.name
-                if tools_call[0].function.arguments is not None:
-                    function_arguments += tools_call[0].function.arguments
-            else:
-                content = response
+        self.llm_stream_task = asyncio.current_task()
+        try:
+            async for response in llm_responses:
+                if self.client_abort:
+                    break
+                if functions is not None:
+                    if isinstance(response, dict):
+                        content, tools_call = response.get("content"), None
+                    else:
+                        content, tools_call = response
+                    if content is not None and len(content) > 0:
+                        content_arguments += content
+
+                    if not tool_call_flag and content_arguments.startswith("<tool_call>"):
+                        tool_call_flag = True
+
+                    if tools_call is not None and len(tools_call) > 0:
+                        tool_call_flag = True
+                        if tools_call[0].id is not None:
+                            function_id = tools_call[0].id
+                        if tools_call[0].function.name is not None:
+                            function_name = tools_call[0].function.name
+                        if tools_call[0].function.arguments is not None:
+                            function_arguments += tools_call[0].function.arguments
+                else:
+                    content = response
 
-            # 在llm回复中获取情绪表情，一轮对话只在开头获取一次
-            if emotion_flag and content is not None and content.strip():
-                asyncio.run_coroutine_threadsafe(
-                    textUtils.get_emotion(self, content),
-                    self.loop,
-                )
-                emotion_flag = False
+                # 在llm回复中获取情绪表情，一轮对话只在开头获取一次
+                if emotion_flag and content is not None and content.strip():
+                    asyncio.create_task(textUtils.get_emotion(self, content))
+                    emotion_flag = False
 
-            if content is not None and len(content) > 0:
-                if not tool_call_flag:
+                if content is not None and len(content) > 0 and not tool_call_flag:
                     response_message.append(content)
-                    self.tts.tts_text_queue.put(
-                        TTSMessageDTO(
-                            sentence_id=self.sentence_id,
-                            sentence_type=SentenceType.MIDDLE,
-                            content_type=ContentType.TEXT,
-                            content_detail=content,
-                        )
-                    )
+                    self._send_tts_text(segmenter, content)
+        except asyncio.CancelledError:
+            if not self.client_abort:
+                raise
+            # 用户打断：取消发生在等待上游数据时，输出流已随之关闭，本轮对话照常收尾
+            self.logger.bind(tag=TAG).info("用户打断，已停止读取大模型输出")
+        except Exception as e:
+            self.logger.bind(tag=TAG).error(f"LLM 输出流出错 {query}: {e}")
+        finally:
+            self.llm_stream_task = None
+            # 提前结束时关闭输出流，释放上游连接
+            await llm_responses.aclose()
+
+        if segmenter is not None:
+            self._send_tts_text(None, segmenter.flush())
+
         # 处理function call
         if tool_call_flag:
             bHasError = False
@@ -886,7 +767,7 @@ class ConnectionHandler:
                             content_arguments_json["arguments"], ensure_ascii=False
                         )
                         function_id = str(uuid.uuid4().hex)
-                    except Exception as e:
+                    except Exception:
                         bHasError = True
                         response_message.append(a)
                 else:
@@ -914,15 +795,18 @@ class ConnectionHandler:
 
                 # 处理MCP工具调用
                 if self.mcp_manager.is_mcp_tool(function_name):
-                    result = self._handle_mcp_tool_call(function_call_data)
+                    result = await self._handle_mcp_tool_call(function_call_data)
                 else:
-                    # 处理系统函数
-                    result = self.func_handler.handle_llm_function_call(
-                        self, function_call_data
-                    ),
-                    self.loop,
-                ).result()
-                self._handle_function_result(result, function_call_data, depth=depth)
+                    # 处理系统函数，插件中有阻塞调用，放到插件线程池执行
+                    result = await runtime.run(
+                        WorkloadType.PLUGIN,
+                        self.func_handler.handle_llm_function_call,
+                        self,
+                        function_call_data,
+                    )
+                await self._handle_function_result(
+                    result, function_call_data, depth=depth
+                )
 
         # 存储对话内容
         if len(response_message) > 0:
@@ -937,6 +821,7 @@ class ConnectionHandler:
                     content_type=ContentType.ACTION,
                 )
             )
+            self._summarize_evicted_dialogue()
         self.llm_finish_task = True
         # 使用lambda延迟计算，只有在DEBUG级别时才执行get_llm_dialogue()
         self.logger.bind(tag=TAG).debug(
@@ -947,7 +832,62 @@ class ConnectionHandler:
 
         return True
 
-    def _handle_mcp_tool_call(self, function_call_data):
+    def _record_prompt_prefix(self, dialogue, functions):
+        """记录请求稳定前缀的哈希，前缀变化时服务端的前缀缓存无法命中"""
+        current_hash = prefix_hash(dialogue, functions)
+        previous_hash = self.prompt_prefix_hash
+        if not prefix_stats.record(previous_hash, current_hash) and previous_hash:
+            self.logger.bind(tag=TAG).debug(
+                f"请求前缀已变化: {previous_hash} -> {current_hash}，"
+                f"累计统计: {prefix_stats.stats()}"
+            )
+        self.prompt_prefix_hash = current_hash
+
+    def _summarize_evicted_dialogue(self):
+        """把移出对话窗口的消息合并进滚动摘要，在后台线程中完成，不阻塞本轮对话"""
+        if not self.dialogue_summary_enabled:
+            self.dialogue.take_evicted()
+            return
+        if self._summary_future is not None and not self._summary_future.done():
+            # 上一次摘要未完成，移出的消息留到下一轮再处理
+            return
+        evicted = self.dialogue.take_evicted()
+        if not evicted:
+            return
+        self._summary_future = runtime.submit(
+            WorkloadType.NETWORK, self._update_dialogue_summary, evicted
+        )
+
+    def _update_dialogue_summary(self, evicted):
+        try:
+            summary = self.llm.response_no_stream(
+                SUMMARY_PROMPT, format_summary_input(evicted, self.dialogue.summary)
+            )
+            # 请求失败时返回【...】形式的错误提示，保留原摘要
+            if summary and not summary.strip().startswith("【"):
+                self.dialogue.summary = summary.strip()
+                self.logger.bind(tag=TAG).debug(
+                    f"对话摘要已更新，移出消息 {len(evicted)} 条"
+                )
+        except Exception as e:
+            self.logger.bind(tag=TAG).error(f"生成对话摘要失败: {e}")
+
+    def _send_tts_text(self, segmenter, text):
+        """把大模型输出的文本交给TTS，有分段器时只投递已完成的分段"""
+        segments = segmenter.feed(text) if segmenter is not None else [text]
+        for segment in segments:
+            if not segment:
+                continue
+            self.tts.tts_text_queue.put(
+                TTSMessageDTO(
+                    sentence_id=self.sentence_id,
+                    sentence_type=SentenceType.MIDDLE,
+                    content_type=ContentType.TEXT,
+                    content_detail=segment,
+                )
+            )
+
+    async def _handle_mcp_tool_call(self, function_call_data):
         function_arguments = function_call_data["arguments"]
         function_name = function_call_data["name"]
         try:
@@ -963,9 +903,9 @@ class ConnectionHandler:
                         action=Action.REQLLM, result="参数解析失败", response=""
                     )
 
-            tool_result = asyncio.run_coroutine_threadsafe(
-                self.mcp_manager.execute_tool(function_name, args_dict), self.loop
-            ).result()
+            tool_result = await self.mcp_manager.execute_tool(
+                function_name, args_dict
+            )
             # meta=None content=[TextContent(type='text', text='北京当前天气:\n温度: 21°C\n天气: 晴\n湿度: 6%\n风向: 西北 风\n风力等级: 5级', annotations=None)] isError=False
             content_text = ""
             if tool_result is not None and tool_result.content is not None:
@@ -989,13 +929,12 @@ class ConnectionHandler:
 
         return ActionResponse(action=Action.REQLLM, result="工具调用出错", response="")
 
-    def _handle_function_result(self, result, function_call_data, depth):
+    async def _handle_function_result(self, result, function_call_data, depth):
         if result.action == Action.RESPONSE:  # 直接回复前端
             text = result.response
-            self.recode_first_last_text(text, text_index)
-            future = self.executor.submit(self.speak_and_play, text, text_index)
-            self.tts_queue.put((future, text_index))
-            self.dialogue.put(Message(role="assistant", content=text))
+            if text is not None:
+                self.tts.tts_one_sentence(self, ContentType.TEXT, content_detail=text)
+                self.dialogue.put(Message(role="assistant", content=text))
         elif result.action == Action.REQLLM:  # 调用函数后再请求llm生成回复
             text = result.result
             if text is not None and len(text) > 0:
@@ -1028,29 +967,23 @@ class ConnectionHandler:
                         content=text,
                     )
                 )
-                self.chat(text, depth=depth + 1)
+                await self.chat(text, depth=depth + 1)
         elif result.action == Action.NOTFOUND or result.action == Action.ERROR:
-            text = result.result
-            self.recode_first_last_text(text, text_index)
-            future = self.executor.submit(self.speak_and_play, text, text_index)
-            self.tts_queue.put((future, text_index))
-            self.dialogue.put(Message(role="assistant", content=text))
+            text = result.response if result.response else result.result
+            if text is not None:
+                self.tts.tts_one_sentence(self, ContentType.TEXT, content_detail=text)
+                self.dialogue.put(Message(role="assistant", content=text))
         else:
             pass
 
-    def _tts_priority_thread(self):
+    async def _tts_priority_task(self):
         while not self.stop_event.is_set():
             text = None
             try:
-                try:
-                    item = self.tts_queue.get(timeout=1)
-                    if item is None:
-                        continue
-                    future, text_index = item  # 解包获取 Future 和 text_index
-                except queue.Empty:
-                    if self.stop_event.is_set():
-                        break
+                item = await self.tts_queue.get()
+                if item is None:
                     continue
+                future, text_index = item  # 解包获取 Future 和 text_index
                 if future is None:
                     continue
                 text = None
@@ -1058,7 +991,9 @@ class ConnectionHandler:
                 try:
                     self.logger.bind(tag=TAG).debug("正在处理TTS任务...")
                     tts_timeout = int(self.config.get("tts_timeout", 10))
-                    tts_file, text, _ = future.result(timeout=tts_timeout)
+                    tts_file, text, _ = await asyncio.wait_for(
+                        asyncio.wrap_future(future), timeout=tts_timeout
+                    )
                     if text is None or len(text) <= 0:
                         self.logger.bind(tag=TAG).error(
                             f"TTS出错：{text_index}: tts text is empty"
@@ -1067,22 +1002,42 @@ class ConnectionHandler:
                         self.logger.bind(tag=TAG).error(
                             f"TTS出错： file is empty: {text_index}: {text}"
                         )
+                    elif isinstance(tts_file, list):
+                        # 命中短句缓存，直接使用已编码的音频
+                        audio_datas, tts_file = tts_file, None
+                        enqueue_tts_report(self, text, audio_datas)
                     else:
                         self.logger.bind(tag=TAG).debug(
                             f"TTS生成：文件路径: {tts_file}"
                         )
                         if os.path.exists(tts_file):
                             if self.audio_format == "pcm":
-                                audio_datas, _ = self.tts.audio_to_pcm_data(tts_file)
+                                audio_datas, _ = await runtime.run(
+                                    WorkloadType.AUDIO,
+                                    self.tts.audio_to_pcm_data,
+                                    tts_file,
+                                )
                             else:
-                                audio_datas, _ = self.tts.audio_to_opus_data(tts_file)
+                                audio_datas, _ = await runtime.run(
+                                    WorkloadType.AUDIO,
+                                    self.tts.audio_to_opus_data,
+                                    tts_file,
+                                )
+                            if audio_datas:
+                                runtime.submit(
+                                    WorkloadType.AUDIO,
+                                    self.tts.cache_audio,
+                                    text,
+                                    self.audio_format,
+                                    audio_datas,
+                                )
                             # 在这里上报TTS数据
                             enqueue_tts_report(self, text, audio_datas)
                         else:
                             self.logger.bind(tag=TAG).error(
                                 f"TTS出错：文件不存在{tts_file}"
                             )
-                except TimeoutError:
+                except asyncio.TimeoutError:
                     self.logger.bind(tag=TAG).error("TTS超时")
                 except Exception as e:
                     self.logger.bind(tag=TAG).error(f"TTS出错: {e}")
@@ -1095,74 +1050,63 @@ class ConnectionHandler:
                     and os.path.exists(tts_file)
                 ):
                     os.remove(tts_file)
+            except asyncio.CancelledError:
+                break
             except Exception as e:
                 self.logger.bind(tag=TAG).error(f"TTS任务处理错误: {e}")
                 self.clearSpeakStatus()
-                asyncio.run_coroutine_threadsafe(
-                    self.websocket.send(
-                        json.dumps(
-                            {
-                                "type": "tts",
-                                "state": "stop",
-                                "session_id": self.session_id,
-                            }
-                        )
-                    ),
-                    self.loop,
+                await self.websocket.send(
+                    json.dumps(
+                        {
+                            "type": "tts",
+                            "state": "stop",
+                            "session_id": self.session_id,
+                        }
+                    )
                 )
                 self.logger.bind(tag=TAG).error(
-                    f"tts_priority priority_thread: {text} {e}"
+                    f"tts_priority priority_task: {text} {e}"
                 )
 
-    def _audio_play_priority_thread(self):
+    async def _audio_play_priority_task(self):
         while not self.stop_event.is_set():
             text = None
             try:
-                try:
-                    audio_datas, text, text_index = self.audio_play_queue.get(timeout=1)
-                except queue.Empty:
-                    if self.stop_event.is_set():
-                        break
-                    continue
-                future = asyncio.run_coroutine_threadsafe(
-                    sendAudioMessage(self, audio_datas, text, text_index), self.loop
-                )
-                future.result()
+                audio_datas, text, text_index = await self.audio_play_queue.get()
+                await sendAudioMessage(self, audio_datas, text, text_index)
+            except asyncio.CancelledError:
+                break
             except Exception as e:
                 self.logger.bind(tag=TAG).error(
-                    f"audio_play_priority priority_thread: {text} {e}"
+                    f"audio_play_priority priority_task: {text} {e}"
                 )
 
-    def _report_worker(self):
-        """聊天记录上报工作线程"""
+    async def _report_worker(self):
+        """聊天记录上报任务"""
         while not self.stop_event.is_set():
             try:
-                # 从队列获取数据，设置超时以便定期检查停止事件
-                item = self.report_queue.get(timeout=1)
+                item = await self.report_queue.get()
                 if item is None:  # 检测毒丸对象
                     break
-                try:
-                    # 检查线程池状态
-                    if self.executor is None:
-                        continue
-                    # 提交任务到线程池
-                    self.executor.submit(self._process_report, *item)
-                except Exception as e:
-                    self.logger.bind(tag=TAG).error(f"聊天记录上报线程异常: {e}")
-                finally:
-                    # 标记任务完成
-                    self.report_queue.task_done()
-            except queue.Empty:
-                continue
+                # 上报是阻塞的HTTP请求，提交到共享线程池执行
+                runtime.submit(WorkloadType.NETWORK, report, self, *item)
+            except asyncio.CancelledError:
+                break
             except Exception as e:
-                self.logger.bind(tag=TAG).error(f"聊天记录上报工作线程异常: {e}")
+                self.logger.bind(tag=TAG).error(f"聊天记录上报任务异常: {e}")
 
-        self.logger.bind(tag=TAG).info("聊天记录上报线程已退出")
+        self.logger.bind(tag=TAG).info("聊天记录上报任务已退出")
 
     def speak_and_play(self, text, text_index=0):
         if text is None or len(text) <= 0:
             self.logger.bind(tag=TAG).info(f"无需tts转换，query为空，{text}")
             return None, text, text_index
+        cached_audio = self.tts.get_cached_audio(text, self.audio_format)
+        if cached_audio is not None:
+            self.logger.bind(tag=TAG).debug(f"TTS 命中短句缓存: {text}")
+            if self.max_output_size > 0:
+                add_device_output(self.headers.get("device-id"), len(text))
+            return cached_audio, text, text_index
         tts_file = self.tts.to_tts(text)
         if tts_file is None:
             self.logger.bind(tag=TAG).error(f"tts转换失败，{text}")
@@ -1204,6 +1148,8 @@ class ConnectionHandler:
                     self.logger.bind(tag=TAG).error(
                         f"清理工具处理器时出错: {cleanup_error}"
                     )
+        except Exception as e:
+            self.logger.bind(tag=TAG).error(f"清理连接资源时出错: {e}")
 
         # 清理MCP资源
         if hasattr(self, "mcp_manager") and self.mcp_manager:
@@ -1213,6 +1159,11 @@ class ConnectionHandler:
         if self.stop_event:
             self.stop_event.set()
 
+        # 丢弃未完成的在线识别流
+        if self.asr_online_session is not None:
+            self.asr_online_session.close()
+            self.asr_online_session = None
+
         # 清空任务队列
         self.clear_queues()
 
@@ -1253,52 +1204,57 @@ class ConnectionHandler:
             self.logger.bind(tag=TAG).error(f"关闭WebSocket连接时出错: {ws_error}")
 
         if self.tts:
+            await self.tts.close_audio_channels()
             await self.tts.close()
 
-        # 最后关闭线程池（避免阻塞）
-        if self.executor:
-            try:
-                self.executor.shutdown(wait=False)
-            except Exception as executor_error:
-                self.logger.bind(tag=TAG).error(
-                    f"关闭线程池时出错: {executor_error}"
-                )
-            self.executor = None
+        # 取消本连接的消化任务，共享线程池由进程统一管理，这里不关闭
+        for task in (
+            self.chat_task,
+            self.tts_priority_task,
+            self.audio_play_priority_task,
+            self.report_task,
+        ):
+            if task is not None and not task.done():
+                task.cancel()
 
         self.logger.bind(tag=TAG).info("连接资源已释放")
 
+    def cancel_llm_stream(self):
+        """打断时立即停止读取大模型输出和进行中的意图识别，关闭上游的流"""
+        for task in (self.llm_stream_task, self.intent_task):
+            if task is not None and not task.done():
+                task.cancel()
+
     def clear_queues(self):
         """清空所有任务队列"""
+        if self.tts is not None:
+            # 取消还未播放的分段合成
+            self.tts.cancel_synthesis()
         self.logger.bind(tag=TAG).debug(
             f"开始清理: TTS队列大小={self.tts_queue.qsize()}, 音频队列大小={self.audio_play_queue.qsize()}"
         )
 
-        # 使用非阻塞方式清空队列
         for q in [self.tts_queue, self.audio_play_queue]:
             if not q:
                 continue
-            while True:
-                try:
-                    q.get_nowait()
-                except queue.Empty:
-                    break
+            q.clear()
 
         self.logger.bind(tag=TAG).debug(
             f"清理结束: TTS队列大小={self.tts_queue.qsize()}, 音频队列大小={self.audio_play_queue.qsize()}"
         )
 
     def reset_vad_states(self):
-        self.client_audio_buffer = bytearray()
+        self.client_audio_buffer.clear()
         self.client_have_voice = False
         self.client_have_voice_last_time = 0
         self.client_voice_stop = False
         self.logger.bind(tag=TAG).debug("VAD states reset.")
 
-    def chat_and_close(self, text):
+    async def chat_and_close(self, text):
         """Chat with the user and then close the connection"""
         try:
             # Use the existing chat method
-            self.chat(text)
+            await self.chat(text)
 
             # After chat is complete, close the connection
             self.close_after_chat = True
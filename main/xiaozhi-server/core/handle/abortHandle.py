@@ -9,6 +9,8 @@ async def handleAbortMessage(conn):
     conn.logger.bind(tag=TAG).info("Abort message received")
     # 设置成打断状态，会自动打断llm、tts任务
     conn.client_abort = True
+    # 立即关闭正在读取的大模型输出流，不再继续生成和计费
+    conn.cancel_llm_stream()
     conn.clear_queues()
     # 打断客户端说话状态
     await conn.websocket.send(
@@ -1,6 +1,7 @@
 import json
 from core.handle.sendAudioHandle import send_stt_message
 from core.utils.util import remove_punctuation_and_length
+from core.utils.asset_bank import asset_bank
 import shutil
 import asyncio
 import os
@@ -51,7 +52,10 @@ async def checkWakeupWords(conn, text):
         if file is None:
             asyncio.create_task(wakeupWordsResponse(conn))
             return False
-        opus_packets, _ = conn.tts.audio_to_opus_data(file)
+        opus_packets = asset_bank.get(file)
+        if opus_packets is None:
+            asyncio.create_task(wakeupWordsResponse(conn))
+            return False
         text_hello = WAKEUP_CONFIG["text"]
         if not text_hello:
             text_hello = text
@@ -99,6 +103,7 @@ async def wakeupWordsResponse(conn):
         old_file = getWakeupWordFile("my_" + WAKEUP_CONFIG["file_name"])
         if old_file is not None:
             os.remove(old_file)
+            asset_bank.invalidate(old_file)
         """将文件挪到"wakeup_words.mp3"""
         shutil.move(
             tts_file,
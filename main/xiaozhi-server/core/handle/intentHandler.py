@@ -1,12 +1,16 @@
 from config.logger import setup_logging
 import json
 import uuid
+import asyncio
 from core.handle.sendAudioHandle import send_stt_message
 from core.handle.helloHandle import checkWakeupWords
 from core.utils.util import remove_punctuation_and_length
 from core.utils.dialogue import Message
 from plugins_func.register import Action, ActionResponse
 from core.providers.tts.dto.dto import TTSMessageDTO, SentenceType
+from core.utils.runtime import runtime, WorkloadType
+from core.utils.intent_classifier import intent_classifier
+from plugins_func.functions.play_music import MUSIC_CACHE
 from loguru import logger
 
 TAG = __name__
@@ -33,8 +37,13 @@ async def handle_user_intent(conn, text):
     if conn.intent_type == "function_call":
         # 使用支持function calling的聊天方法,不再进行意图分析
         return False
-    # 使用LLM进行意图分析
-    intent_result = await analyze_intent_with_llm(conn, text)
+    # 先在本地识别明确的意图，不确定的才使用LLM进行意图分析
+    intent_result = classify_intent_locally(conn, text)
+    if intent_result is None:
+        intent_result = await analyze_intent_with_llm(conn, text)
+    if conn.client_abort:
+        # 识别期间被打断，放弃本轮
+        return True
     if not intent_result:
         return False
     # 会话开始时生成sentence_id
@@ -56,6 +65,27 @@ async def check_direct_exit(conn, text):
     return False
 
 
+def classify_intent_locally(conn, text):
+    """本地识别明确的意图（闲聊、退出、音量亮度、播放音乐），不确定时返回None"""
+    if conn.intent_type != "intent_llm" or conn.func_handler is None:
+        return None
+    functions = {
+        func.get("function", {}).get("name")
+        for func in conn.func_handler.get_functions()
+    }
+    # 只使用已加载的音乐目录，目录未加载时指定歌名的播放交给大模型（加载需要扫描磁盘）
+    intent_result = intent_classifier.classify(
+        text, functions, MUSIC_CACHE.get("catalog")
+    )
+    if intent_result is not None and '"continue_chat"' in intent_result:
+        # 与LLM意图识别一致，继续聊天时清理工具调用相关的历史消息
+        conn.dialogue.dialogue = [
+            msg for msg in conn.dialogue.dialogue
+            if msg.role not in ["tool", "function"]
+        ]
+    return intent_result
+
+
 async def analyze_intent_with_llm(conn, text):
     """使用LLM分析用户意图"""
     if not hasattr(conn, "intent") or not conn.intent:
@@ -64,11 +94,21 @@ async def analyze_intent_with_llm(conn, text):
 
     # 对话历史记录
     dialogue = conn.dialogue
+    # 在单独的任务中识别，打断时取消并关闭上游请求
+    conn.intent_task = asyncio.ensure_future(
+        conn.intent.detect_intent(conn, dialogue.dialogue, text)
+    )
     try:
-        intent_result = await conn.intent.detect_intent(conn, dialogue.dialogue, text)
+        intent_result = await conn.intent_task
         return intent_result
+    except asyncio.CancelledError:
+        if not conn.client_abort:
+            raise
+        conn.logger.bind(tag=TAG).info("意图识别被打断")
     except Exception as e:
         conn.logger.bind(tag=TAG).error(f"意图识别失败: {str(e)}")
+    finally:
+        conn.intent_task = None
 
     return None
 
@@ -145,8 +185,8 @@ async def process_intent_result(conn, intent_result, original_text):
                         if text is not None:
                             speak_and_play(conn, text)
 
-            # 将函数执行放在线程池中
-            conn.executor.submit(process_function_call)
+            # 将函数执行放在共享的插件线程池中
+            runtime.submit(WorkloadType.PLUGIN, process_function_call)
             return True
         return False
     except json.JSONDecodeError as e:
@@ -159,7 +199,9 @@ def speak_and_play(conn, text):
         conn.tts_last_text_index + 1 if hasattr(conn, "tts_last_text_index") else 0
     )
     conn.recode_first_last_text(text, text_index)
-    future = conn.executor.submit(conn.speak_and_play, text, text_index)
+    future = runtime.submit(
+        WorkloadType.NETWORK, conn.speak_and_play, text, text_index
+    )
     conn.llm_finish_task = True
     conn.tts_queue.put((future, text_index))
     conn.dialogue.put(Message(role="assistant", content=text))
@@ -1,5 +1,4 @@
 import time
-import copy
 from core.utils.util import remove_punctuation_and_length
 from core.handle.sendAudioHandle import send_stt_message
 from core.handle.intentHandler import handle_user_intent
@@ -10,46 +9,53 @@ import time
 import asyncio
 import json
 from core.handle.sendAudioHandle import SentenceType
-from core.utils.util import audio_to_data
+from core.utils.asset_bank import asset_bank
+from core.utils.utterance import Utterance
 
 TAG = __name__
 
 
 async def handleAudioMessage(conn, audio):
-    if conn.vad is None:
+    if conn.vad is None or conn.asr is None:
         return
     if not conn.asr_server_receive:
         conn.logger.bind(tag=TAG).debug(f"前期数据处理中，暂停接收")
         return
     if conn.client_listen_mode == "auto" or conn.client_listen_mode == "realtime":
-        have_voice = conn.vad.is_vad(conn, audio)
+        have_voice = await conn.vad.is_vad_async(conn, audio)
     else:
         have_voice = conn.client_have_voice
 
     # 如果本次没有声音，本段也没声音，就把声音丢弃了
     if have_voice == False and conn.client_have_voice == False:
         await no_voice_close_connect(conn)
-        conn.asr_audio.append(audio)
-        conn.asr_audio = conn.asr_audio[
-            -10:
-        ]  # 保留最新的10帧音频内容，解决ASR句首丢字问题
+        # 保留最新的10帧音频内容，解决ASR句首丢字问题
+        conn.asr_audio_preroll.append(audio)
         return
     conn.client_no_voice_last_time = 0.0
-    conn.asr_audio.append(audio)
+    new_frames = list(conn.asr_audio_preroll)
+    conn.asr_audio_preroll.clear()
+    new_frames.append(audio)
+    # 在线识别模式下边说边识别
+    conn.asr.accept_online_audio(conn, new_frames, not conn.asr_audio)
+    conn.asr_audio.extend(new_frames)
     # 如果本段有声音，且已经停止了
     if conn.client_voice_stop:
         conn.client_abort = False
         conn.asr_server_receive = False
         # 音频太短了，无法识别
         if len(conn.asr_audio) < 15:
+            conn.asr.discard_online_session(conn)
             conn.asr_server_receive = True
         else:
-            text, _ = await conn.asr.speech_to_text(conn.asr_audio, conn.session_id)
+            # 识别和上报共用同一个Utterance，音频只解码一次，也不需要深拷贝
+            utterance = Utterance(conn.asr_audio, conn.audio_format)
+            text, _ = await conn.asr.recognize(conn, utterance)
             conn.logger.bind(tag=TAG).info(f"识别文本: {text}")
             text_len, _ = remove_punctuation_and_length(text)
             if text_len > 0:
                 # 使用自定义模块进行上报
-                enqueue_asr_report(conn, text, copy.deepcopy(conn.asr_audio))
+                enqueue_asr_report(conn, text, utterance)
 
                 await startToChat(conn, text)
             else:
@@ -59,6 +65,8 @@ async def handleAudioMessage(conn, audio):
 
 
 async def startToChat(conn, text):
+    # 新的一轮开始，清除之前的打断状态（如唤醒词打断后的listen/detect），只有本轮期间的打断才会取消本轮
+    conn.client_abort = False
     # 检查输入是否是JSON格式（包含说话人信息）
     speaker_name = None
     actual_text = text
@@ -96,8 +104,13 @@ async def startToChat(conn, text):
             await max_out_size(conn)
             return
 
+    # 意图识别和对话在单独的任务中进行，不阻塞后续消息（如打断）的接收
+    conn.chat_task = asyncio.create_task(intent_and_chat(conn, actual_text))
+
+
+async def intent_and_chat(conn, text):
     # 首先进行意图分析，使用实际文本内容
-    intent_handled = await handle_user_intent(conn, actual_text)
+    intent_handled = await handle_user_intent(conn, text)
 
     if intent_handled:
         # 如果意图已被处理，不再进行聊天
@@ -105,8 +118,9 @@ async def startToChat(conn, text):
         return
 
     # 意图未被处理，继续常规聊天流程，使用实际文本内容
-    await send_stt_message(conn, actual_text)
-    conn.executor.submit(conn.chat, actual_text)
+    await send_stt_message(conn, text)
+    # 对话在事件循环中异步进行，大模型输出流读取期间不占用线程
+    await conn.chat(text)
 
 
 async def no_voice_close_connect(conn):
@@ -142,7 +156,7 @@ async def max_out_size(conn):
     conn.tts_last_text_index = 0
     conn.llm_finish_task = True
     file_path = "config/assets/max_output_size.wav"
-    opus_packets, _ = audio_to_data(file_path)
+    opus_packets = asset_bank.get(file_path) or ()
     conn.audio_play_queue.put((opus_packets, text, 0))
     conn.close_after_chat = True
 
@@ -164,7 +178,7 @@ async def check_bind_device(conn):
 
         # 播放提示音
         music_path = "config/assets/bind_code.wav"
-        opus_packets, _ = audio_to_data(music_path)
+        opus_packets = asset_bank.get(music_path) or ()
         conn.audio_play_queue.put((opus_packets, text, 0))
 
         # 逐个播放数字
@@ -172,7 +186,7 @@ async def check_bind_device(conn):
             try:
                 digit = conn.bind_code[i]
                 num_path = f"config/assets/bind_code/{digit}.wav"
-                num_packets, _ = audio_to_data(num_path)
+                num_packets = asset_bank.get(num_path) or ()
                 conn.audio_play_queue.put((num_packets, None, i + 1))
             except Exception as e:
                 conn.logger.bind(tag=TAG).error(f"播放数字音频失败: {e}")
@@ -184,5 +198,5 @@ async def check_bind_device(conn):
         conn.tts_last_text_index = 0
         conn.llm_finish_task = True
         music_path = "config/assets/bind_not_found.wav"
-        opus_packets, _ = audio_to_data(music_path)
+        opus_packets = asset_bank.get(music_path) or ()
         conn.audio_play_queue.put((opus_packets, text, 0))
@@ -12,6 +12,7 @@ TTS上报功能已集成到ConnectionHandler类中。
 import opuslib_next
 
 from config.manage_api_client import report as manage_report
+from core.utils.utterance import Utterance, build_wav
 
 TAG = __name__
 
@@ -26,7 +27,10 @@ def report(conn, type, text, opus_data):
         opus_data: opus音频数据
     """
     try:
-        if opus_data:
+        if isinstance(opus_data, Utterance):
+            # ASR阶段已经解码过，直接复用
+            audio_data = opus_data.wav or None
+        elif opus_data:
             audio_data = opus_to_wav(conn, opus_data)
         else:
             audio_data = None
@@ -65,28 +69,8 @@ def opus_to_wav(conn, opus_data):
     if not pcm_data:
         raise ValueError("没有有效的PCM数据")
 
-    # 创建WAV文件头
-    pcm_data_bytes = b"".join(pcm_data)
-    num_samples = len(pcm_data_bytes) // 2  # 16-bit samples
-
-    # WAV文件头
-    wav_header = bytearray()
-    wav_header.extend(b"RIFF")  # ChunkID
-    wav_header.extend((36 + len(pcm_data_bytes)).to_bytes(4, "little"))  # ChunkSize
-    wav_header.extend(b"WAVE")  # Format
-    wav_header.extend(b"fmt ")  # Subchunk1ID
-    wav_header.extend((16).to_bytes(4, "little"))  # Subchunk1Size
-    wav_header.extend((1).to_bytes(2, "little"))  # AudioFormat (PCM)
-    wav_header.extend((1).to_bytes(2, "little"))  # NumChannels
-    wav_header.extend((16000).to_bytes(4, "little"))  # SampleRate
-    wav_header.extend((32000).to_bytes(4, "little"))  # ByteRate
-    wav_header.extend((2).to_bytes(2, "little"))  # BlockAlign
-    wav_header.extend((16).to_bytes(2, "little"))  # BitsPerSample
-    wav_header.extend(b"data")  # Subchunk2ID
-    wav_header.extend(len(pcm_data_bytes).to_bytes(4, "little"))  # Subchunk2Size
-
     # 返回完整的WAV数据
-    return bytes(wav_header) + pcm_data_bytes
+    return build_wav(b"".join(pcm_data))
 
 
 def enqueue_tts_report(conn, text, opus_data):
@@ -1,14 +1,24 @@
 import json
 import asyncio
 import time
-from core.utils.util import get_string_no_punctuation_or_emoji, analyze_emotion
+from core.utils.util import analyze_emotion, emoji_map
 from core.providers.tts.dto.dto import SentenceType
 from core.utils import textUtils
+from core.utils.asset_bank import asset_bank
 
 TAG = __name__
 
 
-async def sendAudioMessage(conn, audios, text, text_index=0):
+async def sendAudioMessage(conn, audios, text, text_index=0, sentence_type=None):
+    """发送一段语音
+
+    未传 sentence_type 时按 text_index 判断首句、末句；
+    TTS流水线发送时传入 sentence_type，按 FIRST/MIDDLE/LAST 阶段处理
+    """
+    if sentence_type is not None:
+        await _send_sentence_audio(conn, sentence_type, audios, text)
+        return
+
     # 发送句子开始消息
     if text is not None:
         emotion = analyze_emotion(text)
@@ -24,13 +34,7 @@ async def sendAudioMessage(conn, audios, text, text_index=0):
             )
         )
 
-    conn.logger.bind(tag=TAG).info(f"发送音频消息: {sentenceType}, {text}")
-
-    pre_buffer = False
-    if conn.tts.tts_audio_first_sentence:
-        conn.logger.bind(tag=TAG).info(f"发送第一段语音: {text}")
-        conn.tts.tts_audio_first_sentence = False
-        pre_buffer = True
+    conn.logger.bind(tag=TAG).info(f"发送音频消息: {text_index}, {text}")
 
     if text_index == conn.tts_first_text_index:
         conn.logger.bind(tag=TAG).info(f"发送第一段语音: {text}")
@@ -46,11 +50,35 @@ async def sendAudioMessage(conn, audios, text, text_index=0):
             await conn.close()
 
 
+async def _send_sentence_audio(conn, sentence_type, audios, text):
+    # 带文本的片段是一句话的开始，流式TTS只在FIRST中携带文本
+    if text and sentence_type != SentenceType.LAST:
+        await send_tts_message(conn, "sentence_start", text)
+
+    if audios:
+        pre_buffer = False
+        if conn.tts.tts_audio_first_sentence:
+            conn.logger.bind(tag=TAG).info(f"发送第一段语音: {text}")
+            conn.tts.tts_audio_first_sentence = False
+            pre_buffer = True
+        if hasattr(audios, "__aiter__"):
+            await sendAudioStream(conn, audios, pre_buffer=pre_buffer)
+        else:
+            await sendAudio(conn, audios, pre_buffer=pre_buffer)
+
+    # 发送结束消息
+    if conn.llm_finish_task and sentence_type == SentenceType.LAST:
+        await send_tts_message(conn, "stop", None)
+        if conn.close_after_chat:
+            await conn.close()
+
+
 # 播放音频
 async def sendAudio(conn, audios, pre_buffer=True):
     # 流控参数优化
     frame_duration = 60  # 帧时长（毫秒），匹配 Opus 编码
     start_time = time.perf_counter()
+    last_reset_time = start_time
     play_position = 0
 
     # 仅当第一句话时执行预缓冲
@@ -84,6 +112,44 @@ async def sendAudio(conn, audios, pre_buffer=True):
         play_position += frame_duration
 
 
+async def sendAudioStream(conn, audio_stream, pre_buffer=True):
+    """边解码边播放音频流，按批次拉取帧，发送节奏与sendAudio一致"""
+    frame_duration = 60  # 帧时长（毫秒），匹配 Opus 编码
+    start_time = time.perf_counter()
+    last_reset_time = start_time
+    play_position = 0
+    pre_buffer_frames = 3 if pre_buffer else 0
+
+    try:
+        async for audios in audio_stream:
+            for opus_packet in audios:
+                if conn.client_abort:
+                    return
+
+                # 仅当第一句话时预缓冲前几帧
+                if pre_buffer_frames > 0:
+                    pre_buffer_frames -= 1
+                    await conn.websocket.send(opus_packet)
+                    continue
+
+                # 每分钟重置一次计时器
+                if time.perf_counter() - last_reset_time > 60:
+                    await conn.reset_timeout()
+                    last_reset_time = time.perf_counter()
+
+                # 计算预期发送时间，跨批次保持连续
+                expected_time = start_time + (play_position / 1000)
+                delay = expected_time - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+
+                await conn.websocket.send(opus_packet)
+
+                play_position += frame_duration
+    finally:
+        audio_stream.close()
+
+
 async def send_tts_message(conn, state, text=None):
     """发送 TTS 状态消息"""
     message = {"type": "tts", "state": state, "session_id": conn.session_id}
@@ -98,8 +164,9 @@ async def send_tts_message(conn, state, text=None):
             stop_tts_notify_voice = conn.config.get(
                 "stop_tts_notify_voice", "config/assets/tts_notify.mp3"
             )
-            audios, _ = conn.tts.audio_to_opus_data(stop_tts_notify_voice)
-            await sendAudio(conn, audios)
+            audios = asset_bank.get(stop_tts_notify_voice)
+            if audios:
+                await sendAudio(conn, audios)
         # 清除服务端讲话状态
         conn.clearSpeakStatus()
 
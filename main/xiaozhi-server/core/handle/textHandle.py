@@ -45,6 +45,7 @@ async def handleTextMessage(conn, message):
                 conn.asr_server_receive = False
                 conn.client_have_voice = False
                 conn.asr_audio.clear()
+                conn.asr_audio_preroll.clear()
                 if "text" in msg_json:
                     conn.last_activity_time = time.time() * 1000
                     original_text = msg_json["text"]  # 保留原始文本
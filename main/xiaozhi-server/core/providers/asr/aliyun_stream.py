@@ -1,72 +1,19 @@
 import json
-import time
-import uuid
-import hmac
-import base64
-import hashlib
 import asyncio
-import requests
 import websockets
 import opuslib_next
 import random
 from typing import Optional, Tuple, List
-from urllib import parse
-from datetime import datetime
 from config.logger import setup_logging
 from core.providers.asr.base import ASRProviderBase
 from core.providers.asr.dto.dto import InterfaceType
+from core.utils.token_manager import AliyunTokenMixin
 
 TAG = __name__
 logger = setup_logging()
 
 
-class AccessToken:
-    @staticmethod
-    def _encode_text(text):
-        encoded_text = parse.quote_plus(text)
-        return encoded_text.replace("+", "%20").replace("*", "%2A").replace("%7E", "~")
-
-    @staticmethod
-    def _encode_dict(dic):
-        keys = dic.keys()
-        dic_sorted = [(key, dic[key]) for key in sorted(keys)]
-        encoded_text = parse.urlencode(dic_sorted)
-        return encoded_text.replace("+", "%20").replace("*", "%2A").replace("%7E", "~")
-
-    @staticmethod
-    def create_token(access_key_id, access_key_secret):
-        parameters = {
-            "AccessKeyId": access_key_id,
-            "Action": "CreateToken",
-            "Format": "JSON",
-            "RegionId": "cn-shanghai",
-            "SignatureMethod": "HMAC-SHA1",
-            "SignatureNonce": str(uuid.uuid1()),
-            "SignatureVersion": "1.0",
-            "Timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
-            "Version": "2019-02-28",
-        }
-        query_string = AccessToken._encode_dict(parameters)
-        string_to_sign = (
-            "GET" + "&" + AccessToken._encode_text("/") + "&" + AccessToken._encode_text(query_string)
-        )
-        secreted_string = hmac.new(
-            bytes(access_key_secret + "&", encoding="utf-8"),
-            bytes(string_to_sign, encoding="utf-8"),
-            hashlib.sha1,
-        ).digest()
-        signature = base64.b64encode(secreted_string)
-        signature = AccessToken._encode_text(signature)
-        full_url = "http://nls-meta.cn-shanghai.aliyuncs.com/?Signature=%s&%s" % (signature, query_string)
-        response = requests.get(full_url)
-        if response.ok:
-            root_obj = response.json()
-            if "Token" in root_obj:
-                return root_obj["Token"]["Id"], root_obj["Token"]["ExpireTime"]
-        return None, None
-
-
-class ASRProvider(ASRProviderBase):
+class ASRProvider(AliyunTokenMixin, ASRProviderBase):
     def __init__(self, config, delete_audio_file):
         super().__init__()
         self.interface_type = InterfaceType.STREAM
@@ -79,10 +26,8 @@ class ASRProvider(ASRProviderBase):
         self.server_ready = False  # 服务器准备状态
 
         # 基础配置
-        self.access_key_id = config.get("access_key_id")
-        self.access_key_secret = config.get("access_key_secret")
+        self._init_token(config)
         self.appkey = config.get("appkey")
-        self.token = config.get("token")
         self.host = config.get("host", "nls-gateway-cn-shanghai.aliyuncs.com")
         # 如果配置的是内网地址（包含-internal.aliyuncs.com），则使用ws协议，默认是wss协议
         if "-internal." in self.host:
@@ -94,34 +39,10 @@ class ASRProvider(ASRProviderBase):
         self.max_sentence_silence = config.get("max_sentence_silence")
         self.output_dir = config.get("output_dir", "./audio_output")
         self.delete_audio_file = delete_audio_file
-        self.expire_time = None
 
-        # Token管理
-        if self.access_key_id and self.access_key_secret:
-            self._refresh_token()
-        elif not self.token:
+        if not (self.access_key_id and self.access_key_secret) and not self.token:
             raise ValueError("必须提供access_key_id+access_key_secret或者直接提供token")
 
-    def _refresh_token(self):
-        """刷新Token"""
-        self.token, expire_time_str = AccessToken.create_token(self.access_key_id, self.access_key_secret)
-        if not self.token:
-            raise ValueError("无法获取有效的访问Token")
-        
-        try:
-            expire_str = str(expire_time_str).strip()
-            if expire_str.isdigit():
-                expire_time = datetime.fromtimestamp(int(expire_str))
-            else:
-                expire_time = datetime.strptime(expire_str, "%Y-%m-%dT%H:%M:%SZ")
-            self.expire_time = expire_time.timestamp() - 60
-        except:
-            self.expire_time = None
-
-    def _is_token_expired(self):
-        """检查Token是否过期"""
-        return self.expire_time and time.time() > self.expire_time
-
     async def open_audio_channels(self, conn):
         await super().open_audio_channels(conn)
 
@@ -134,8 +55,7 @@ class ASRProvider(ASRProviderBase):
         if audio:
             conn.asr_audio_for_voiceprint.append(audio)
         
-        conn.asr_audio.append(audio)
-        conn.asr_audio = conn.asr_audio[-10:]
+        conn.asr_audio_preroll.append(audio)
 
         # 只在有声音且没有连接时建立连接
         if audio_have_voice and not self.is_processing:
@@ -156,11 +76,8 @@ class ASRProvider(ASRProviderBase):
 
     async def _start_recognition(self, conn):
         """开始识别会话"""
-        if self._is_token_expired():
-            self._refresh_token()
-        
         # 建立连接
-        headers = {"X-NLS-Token": self.token}
+        headers = {"X-NLS-Token": await self._get_token()}
         self.asr_ws = await websockets.connect(
             self.ws_url,
             additional_headers=headers,
@@ -228,8 +145,8 @@ class ASRProvider(ASRProviderBase):
                         logger.bind(tag=TAG).info("服务器已准备，开始发送缓存音频...")
                         
                         # 发送缓存音频
-                        if conn.asr_audio:
-                            for cached_audio in conn.asr_audio[-10:]:
+                        if conn.asr_audio_preroll:
+                            for cached_audio in list(conn.asr_audio_preroll):
                                 try:
                                     pcm_frame = self.decoder.decode(cached_audio, 960)
                                     await self.asr_ws.send(pcm_frame)
@@ -5,13 +5,13 @@ import json
 import time
 from datetime import datetime, timezone
 import os
-import uuid
 from typing import Optional, Tuple, List
-import wave
 import opuslib_next
 
 from aip import AipSpeech
 from core.providers.asr.base import ASRProviderBase
+from core.providers.asr.dto.dto import InterfaceType
+from core.utils.runtime import runtime, WorkloadType
 from config.logger import setup_logging
 
 TAG = __name__
@@ -21,6 +21,7 @@ logger = setup_logging()
 class ASRProvider(ASRProviderBase):
     def __init__(self, config: dict, delete_audio_file: bool = True):
         super().__init__()
+        self.interface_type = InterfaceType.NON_STREAM
         self.app_id = config.get("app_id")
         self.api_key = config.get("api_key")
         self.secret_key = config.get("secret_key")
@@ -32,24 +33,15 @@ class ASRProvider(ASRProviderBase):
         self.delete_audio_file = delete_audio_file
 
         self.client = AipSpeech(str(self.app_id), self.api_key, self.secret_key)
+        # 百度SDK自带HTTP实现，无法接入共享HTTP客户端，这里只同步超时配置
+        timeout = config.get("timeout")
+        if timeout:
+            self.client.setConnectionTimeoutInMillis(int(float(timeout) * 1000))
+            self.client.setSocketTimeoutInMillis(int(float(timeout) * 1000))
 
         # 确保输出目录存在
         os.makedirs(self.output_dir, exist_ok=True)
 
-    def save_audio_to_file(self, pcm_data: List[bytes], session_id: str) -> str:
-        """PCM数据保存为WAV文件"""
-        module_name = __name__.split(".")[-1]
-        file_name = f"asr_{module_name}_{session_id}_{uuid.uuid4()}.wav"
-        file_path = os.path.join(self.output_dir, file_name)
-
-        with wave.open(file_path, "wb") as wf:
-            wf.setnchannels(1)
-            wf.setsampwidth(2)  # 2 bytes = 16-bit
-            wf.setframerate(16000)
-            wf.writeframes(b"".join(pcm_data))
-
-        return file_path
-
     async def speech_to_text(
         self, opus_data: List[bytes], session_id: str
     ) -> Tuple[Optional[str], Optional[str]]:
@@ -65,22 +57,18 @@ class ASRProvider(ASRProviderBase):
                 logger.bind(tag=TAG).error("百度语音识别配置未设置，无法进行识别")
                 return None, file_path
 
-            # 将Opus音频数据解码为PCM
-            if self.audio_format == "pcm":
-                pcm_data = opus_data
-            else:
-                pcm_data = self.decode_opus(opus_data)
-            combined_pcm_data = b"".join(pcm_data)
+            # 直接使用内存中的PCM数据，不经过磁盘
+            combined_pcm_data = self.to_utterance(opus_data).pcm
 
-            # 判断是否保存为WAV文件
-            if self.delete_audio_file:
-                pass
-            else:
-                self.save_audio_to_file(pcm_data, session_id)
+            # 需要保留录音时交给后台归档写入
+            if not self.delete_audio_file:
+                file_path = self.save_audio_to_file(combined_pcm_data, session_id)
 
             start_time = time.time()
-            # 识别本地文件
-            result = self.client.asr(
+            # 百度SDK内部使用阻塞请求，放到网络线程池执行，不阻塞事件循环
+            result = await runtime.run(
+                WorkloadType.NETWORK,
+                self.client.asr,
                 combined_pcm_data,
                 "pcm",
                 16000,
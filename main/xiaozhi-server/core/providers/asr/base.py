@@ -1,22 +1,20 @@
 import os
-import wave
 import uuid
-import queue
 import asyncio
-import traceback
-import threading
 import opuslib_next
 import json
-import io
 import time
-import concurrent.futures
 from abc import ABC, abstractmethod
 from config.logger import setup_logging
 from typing import Optional, Tuple, List, Dict, Any
 from core.handle.receiveAudioHandle import startToChat
 from core.handle.reportHandle import enqueue_asr_report
 from core.utils.util import remove_punctuation_and_length
-from core.handle.receiveAudioHandle import handleAudioMessage
+from core.utils.runtime import runtime, WorkloadType
+from core.providers.asr.dto.dto import InterfaceType
+from core.utils.utterance import Utterance, build_wav
+from core.utils.audio_archive import audio_archive
+from core.providers.asr.online import OnlineASRMixin, OnlineRecognition
 
 TAG = __name__
 logger = setup_logging()
@@ -25,31 +23,15 @@ logger = setup_logging()
 class ASRProviderBase(ABC):
     def __init__(self):
         self.audio_format = "opus"
+        # 默认按本地服务处理，远程服务的子类会在初始化时覆盖
+        self.interface_type = InterfaceType.LOCAL
+        # 在线识别模式：音频到达时即送入流式模型，由继承OnlineASRMixin的本地引擎在初始化时开启
+        self.online = False
 
     # 打开音频通道
+    # 音频由连接的消息路由直接在事件循环中处理，不再为每个连接创建轮询线程
     async def open_audio_channels(self, conn):
-        conn.asr_priority_thread = threading.Thread(
-            target=self.asr_text_priority_thread, args=(conn,), daemon=True
-        )
-        conn.asr_priority_thread.start()
-
-    # 有序处理ASR音频
-    def asr_text_priority_thread(self, conn):
-        while not conn.stop_event.is_set():
-            try:
-                message = conn.asr_audio_queue.get(timeout=1)
-                future = asyncio.run_coroutine_threadsafe(
-                    handleAudioMessage(conn, message),
-                    conn.loop,
-                )
-                future.result()
-            except queue.Empty:
-                continue
-            except Exception as e:
-                logger.bind(tag=TAG).error(
-                    f"处理ASR文本失败: {str(e)}, 类型: {type(e).__name__}, 堆栈: {traceback.format_exc()}"
-                )
-                continue
+        pass
 
     # 接收音频
     async def receive_audio(self, conn, audio, audio_have_voice):
@@ -58,98 +40,92 @@ class ASRProviderBase(ABC):
         else:
             have_voice = conn.client_have_voice
         
-        conn.asr_audio.append(audio)
         if not have_voice and not conn.client_have_voice:
-            conn.asr_audio = conn.asr_audio[-10:]
+            conn.asr_audio_preroll.append(audio)
             return
 
+        new_frames = list(conn.asr_audio_preroll)
+        conn.asr_audio_preroll.clear()
+        new_frames.append(audio)
+        self.accept_online_audio(conn, new_frames, not conn.asr_audio)
+        conn.asr_audio.extend(new_frames)
+
         if conn.client_voice_stop:
-            asr_audio_task = conn.asr_audio.copy()
+            asr_audio_task = Utterance(conn.asr_audio, conn.audio_format)
             conn.asr_audio.clear()
             conn.reset_vad_states()
 
             if len(asr_audio_task) > 15:
                 await self.handle_voice_stop(conn, asr_audio_task)
+            else:
+                self.discard_online_session(conn)
 
     # 处理语音停止
     async def handle_voice_stop(self, conn, asr_audio_task: List[bytes]):
         """并行处理ASR和声纹识别"""
         try:
             total_start_time = time.monotonic()
-            
-            # 准备音频数据
-            if conn.audio_format == "pcm":
-                pcm_data = asr_audio_task
-            else:
-                pcm_data = self.decode_opus(asr_audio_task)
-            
-            combined_pcm_data = b"".join(pcm_data)
-            
-            # 预先准备WAV数据
-            wav_data = None
-            # 使用连接的声纹识别提供者
-            if conn.voiceprint_provider and combined_pcm_data:
-                wav_data = self._pcm_to_wav(combined_pcm_data)
-            
-            
+
+            # ASR、声纹识别和上报共用同一个Utterance，音频只解码一次
+            if not isinstance(asr_audio_task, Utterance):
+                asr_audio_task = Utterance(asr_audio_task, conn.audio_format)
+
             # 定义ASR任务
-            def run_asr():
+            async def run_asr():
                 start_time = time.monotonic()
                 try:
-                    loop = asyncio.new_event_loop()
-                    asyncio.set_event_loop(loop)
-                    try:
-                        result = loop.run_until_complete(
-                            self.speech_to_text(asr_audio_task, conn.session_id, conn.audio_format)
+                    online_session = self.pop_online_session(conn)
+                    if online_session is not None:
+                        # 在线模式下音频已在说话过程中识别完毕，这里只需收尾
+                        asr_coro = self.finish_online(online_session)
+                    elif self.interface_type == InterfaceType.LOCAL:
+                        # 本地模型推理是阻塞的CPU计算，放到共享的音频线程池执行
+                        asr_coro = runtime.run_coroutine(
+                            WorkloadType.AUDIO,
+                            self.speech_to_text,
+                            asr_audio_task,
+                            conn.session_id,
+                            conn.audio_format,
                         )
-                        end_time = time.monotonic()
-                        logger.bind(tag=TAG).info(f"ASR耗时: {end_time - start_time:.3f}s")
-                        return result
-                    finally:
-                        loop.close()
-                except Exception as e:
+                    else:
+                        asr_coro = self.speech_to_text(
+                            asr_audio_task, conn.session_id, conn.audio_format
+                        )
+                    result = await asyncio.wait_for(asr_coro, timeout=15)
                     end_time = time.monotonic()
+                    logger.bind(tag=TAG).info(f"ASR耗时: {end_time - start_time:.3f}s")
+                    return result
+                except Exception as e:
                     logger.bind(tag=TAG).error(f"ASR失败: {e}")
                     return ("", None)
-            
+
             # 定义声纹识别任务
-            def run_voiceprint():
-                if not wav_data:
+            async def run_voiceprint():
+                if not conn.voiceprint_provider:
                     return None
                 try:
-                    loop = asyncio.new_event_loop()
-                    asyncio.set_event_loop(loop)
-                    try:
-                        # 使用连接的声纹识别提供者
-                        result = loop.run_until_complete(
-                            conn.voiceprint_provider.identify_speaker(wav_data, conn.session_id)
-                        )
-                        return result
-                    finally:
-                        loop.close()
+                    wav_data = await runtime.run(
+                        WorkloadType.AUDIO, lambda: asr_audio_task.wav
+                    )
+                    if not wav_data:
+                        return None
+                    # 使用连接的声纹识别提供者
+                    return await asyncio.wait_for(
+                        conn.voiceprint_provider.identify_speaker(
+                            wav_data, conn.session_id
+                        ),
+                        timeout=15,
+                    )
                 except Exception as e:
                     logger.bind(tag=TAG).error(f"声纹识别失败: {e}")
                     return None
-            
-            # 使用线程池执行器并行运行
-            parallel_start_time = time.monotonic()
-            
-            with concurrent.futures.ThreadPoolExecutor(max_workers=2) as thread_executor:
-                asr_future = thread_executor.submit(run_asr)
-                
-                if conn.voiceprint_provider and wav_data:
-                    voiceprint_future = thread_executor.submit(run_voiceprint)
-                    
-                    # 等待两个线程都完成
-                    asr_result = asr_future.result(timeout=15)
-                    voiceprint_result = voiceprint_future.result(timeout=15)
-                    
-                    results = {"asr": asr_result, "voiceprint": voiceprint_result}
-                else:
-                    asr_result = asr_future.result(timeout=15)
-                    results = {"asr": asr_result, "voiceprint": None}
-            
-            
+
+            # 在事件循环中并行运行
+            asr_result, voiceprint_result = await asyncio.gather(
+                run_asr(), run_voiceprint()
+            )
+            results = {"asr": asr_result, "voiceprint": voiceprint_result}
+
             # 处理结果
             raw_text, file_path = results.get("asr", ("", None))
             speaker_name = results.get("voiceprint", None)
@@ -181,6 +157,55 @@ class ASRProviderBase(ABC):
             import traceback
             logger.bind(tag=TAG).debug(f"异常详情: {traceback.format_exc()}")
 
+    async def recognize(self, conn, utterance: Utterance) -> Tuple[Optional[str], Optional[str]]:
+        """识别一句话，在线模式下只需结束当前识别流"""
+        online_session = self.pop_online_session(conn)
+        if online_session is not None:
+            return await self.finish_online(online_session)
+        if self.interface_type == InterfaceType.LOCAL:
+            # 本地模型推理是阻塞的CPU计算，与handle_voice_stop一样放到音频线程池执行
+            return await runtime.run_coroutine(
+                WorkloadType.AUDIO, self.speech_to_text, utterance, conn.session_id
+            )
+        return await self.speech_to_text(utterance, conn.session_id)
+
+    @property
+    def supports_online(self) -> bool:
+        """是否开启了在线识别，需要引擎实现OnlineASRMixin"""
+        return self.online and isinstance(self, OnlineASRMixin)
+
+    def accept_online_audio(self, conn, frames: List[bytes], new_utterance: bool) -> None:
+        """在线模式下把新到的音频帧送入当前连接的识别流，新的一句话开始时重建识别流"""
+        if not self.supports_online:
+            return
+        session = conn.asr_online_session
+        if new_utterance or session is None or session.closed:
+            if session is not None:
+                session.close()
+            session = OnlineRecognition(self, conn.audio_format)
+            conn.asr_online_session = session
+        session.accept(frames)
+
+    def pop_online_session(self, conn) -> Optional[OnlineRecognition]:
+        """取出当前连接的识别流，之后的音频属于下一句话"""
+        session = getattr(conn, "asr_online_session", None)
+        conn.asr_online_session = None
+        return session
+
+    def discard_online_session(self, conn) -> None:
+        session = self.pop_online_session(conn)
+        if session is not None:
+            session.close()
+
+    async def finish_online(self, session: OnlineRecognition) -> Tuple[Optional[str], Optional[str]]:
+        start_time = time.monotonic()
+        text = await runtime.run(WorkloadType.AUDIO, session.finish)
+        logger.bind(tag=TAG).debug(
+            f"在线识别收尾耗时: {time.monotonic() - start_time:.3f}s | "
+            f"帧数: {session.frame_count} | 结果: {text}"
+        )
+        return text, None
+
     def _build_enhanced_text(self, text: str, speaker_name: Optional[str]) -> str:
         """构建包含说话人信息的文本"""
         if speaker_name and speaker_name.strip():
@@ -196,41 +221,36 @@ class ASRProviderBase(ABC):
         if len(pcm_data) == 0:
             logger.bind(tag=TAG).warning("PCM数据为空，无法转换WAV")
             return b""
-        
-        # 确保数据长度是偶数（16位音频）
-        if len(pcm_data) % 2 != 0:
-            pcm_data = pcm_data[:-1]
-        
-        # 创建WAV文件头
-        wav_buffer = io.BytesIO()
-        try:
-            with wave.open(wav_buffer, 'wb') as wav_file:
-                wav_file.setnchannels(1)      # 单声道
-                wav_file.setsampwidth(2)      # 16位
-                wav_file.setframerate(16000)  # 16kHz采样率
-                wav_file.writeframes(pcm_data)
-            
-            wav_buffer.seek(0)
-            wav_data = wav_buffer.read()
-            
-            return wav_data
-        except Exception as e:
-            logger.bind(tag=TAG).error(f"WAV转换失败: {e}")
-            return b""
+        return build_wav(pcm_data)
 
     def stop_ws_connection(self):
         pass
 
-    @abstractmethod
-    def save_audio_to_file(self, pcm_data: List[bytes], session_id: str) -> str:
-        """PCM数据保存为WAV文件"""
-        pass
+    def save_audio_to_file(self, pcm_data, session_id: str) -> str:
+        """把PCM数据交给后台归档写入WAV文件，立即返回文件路径（文件稍后才会出现）"""
+        if isinstance(pcm_data, (list, tuple)):
+            pcm_data = b"".join(pcm_data)
+        module_name = self.__class__.__module__.split(".")[-1]
+        file_name = f"asr_{module_name}_{session_id}_{uuid.uuid4()}.wav"
+        file_path = os.path.join(getattr(self, "output_dir", None) or "tmp/", file_name)
+        audio_archive.write_wav(file_path, pcm_data)
+        return file_path
+
+    def to_utterance(self, audio, audio_format: str = None) -> Utterance:
+        """ASR的输入统一为内存中的Utterance，按需取 pcm（16位PCM）或 samples（float32）"""
+        if isinstance(audio, Utterance):
+            return audio
+        return Utterance(audio, audio_format or self.audio_format)
 
     @abstractmethod
     async def speech_to_text(
         self, opus_data: List[bytes], session_id: str
     ) -> Tuple[Optional[str], Optional[str]]:
-        """将语音数据转换为文本"""
+        """将语音数据转换为文本
+
+        opus_data 通常是 Utterance，不是时可用 to_utterance 转换；识别只使用内存中的音频，
+        不写入磁盘。返回 (文本, 录音文件路径)，未保存录音时路径为 None
+        """
         pass
 
     def set_audio_format(self, format: str) -> None:
@@ -240,6 +260,9 @@ class ASRProviderBase(ABC):
     @staticmethod
     def decode_opus(opus_data: List[bytes]) -> List[bytes]:
         """将Opus音频数据解码为PCM数据"""
+        if isinstance(opus_data, Utterance):
+            # 复用已解码的结果
+            return list(opus_data.pcm_frames)
         try:
             decoder = opuslib_next.Decoder(16000, 1)
             pcm_data = []
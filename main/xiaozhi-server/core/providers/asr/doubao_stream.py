@@ -54,8 +54,7 @@ class ASRProvider(ASRProviderBase):
         await super().open_audio_channels(conn)
 
     async def receive_audio(self, conn, audio, audio_have_voice):
-        conn.asr_audio.append(audio)
-        conn.asr_audio = conn.asr_audio[-10:]
+        conn.asr_audio_preroll.append(audio)
         
         # 存储音频数据
         if not hasattr(conn, 'asr_audio_for_voiceprint'):
@@ -117,8 +116,8 @@ class ASRProvider(ASRProviderBase):
                 self.forward_task = asyncio.create_task(self._forward_asr_results(conn))
 
                 # 发送缓存的音频数据
-                if conn.asr_audio and len(conn.asr_audio) > 0:
-                    for cached_audio in conn.asr_audio[-10:]:
+                if conn.asr_audio_preroll:
+                    for cached_audio in list(conn.asr_audio_preroll):
                         try:
                             pcm_frame = self.decoder.decode(cached_audio, 960)
                             payload = gzip.compress(pcm_frame)
@@ -225,8 +224,8 @@ class ASRProvider(ASRProviderBase):
             if conn:
                 if hasattr(conn, 'asr_audio_for_voiceprint'):
                     conn.asr_audio_for_voiceprint = []
-                if hasattr(conn, 'asr_audio'):
-                    conn.asr_audio = []
+                if hasattr(conn, 'asr_audio_preroll'):
+                    conn.asr_audio_preroll.clear()
                 if hasattr(conn, 'has_valid_voice'):
                     conn.has_valid_voice = False
 
@@ -375,7 +374,7 @@ class ASRProvider(ASRProviderBase):
             for conn in self._connections.values():
                 if hasattr(conn, 'asr_audio_for_voiceprint'):
                     conn.asr_audio_for_voiceprint = []
-                if hasattr(conn, 'asr_audio'):
-                    conn.asr_audio = []
+                if hasattr(conn, 'asr_audio_preroll'):
+                    conn.asr_audio_preroll.clear()
                 if hasattr(conn, 'has_valid_voice'):
                     conn.has_valid_voice = False
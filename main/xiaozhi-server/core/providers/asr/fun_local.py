@@ -1,12 +1,12 @@
 import time
-import wave
 import os
 import sys
 import io
 from config.logger import setup_logging
 from typing import Optional, Tuple, List
-import uuid
+import numpy as np
 from core.providers.asr.base import ASRProviderBase
+from core.providers.asr.online import OnlineASRMixin
 from funasr import AutoModel
 from funasr.utils.postprocess_utils import rich_transcription_postprocess
 
@@ -31,15 +31,36 @@ class CaptureOutput:
             logger.bind(tag=TAG).info(self.output.strip())
 
 
-class ASRProvider(ASRProviderBase):
+class ASRProvider(ASRProviderBase, OnlineASRMixin):
     def __init__(self, config: dict, delete_audio_file: bool):
         super().__init__()
         self.model_dir = config.get("model_dir")
         self.output_dir = config.get("output_dir")  # 修正配置键名
         self.delete_audio_file = delete_audio_file
+        # offline：说话结束后整句识别；online：使用流式paraformer边说边识别
+        self.mode = config.get("mode", "offline")
 
         # 确保输出目录存在
         os.makedirs(self.output_dir, exist_ok=True)
+        if self.mode == "online":
+            # 流式参数：[0, 10, 5] 表示每块600ms、向后看300ms
+            self.chunk_size = config.get("chunk_size", [0, 10, 5])
+            self.chunk_stride = self.chunk_size[1] * 960
+            self.encoder_chunk_look_back = int(
+                config.get("encoder_chunk_look_back", 4)
+            )
+            self.decoder_chunk_look_back = int(
+                config.get("decoder_chunk_look_back", 1)
+            )
+            with CaptureOutput():
+                self.model = AutoModel(
+                    model=self.model_dir,
+                    disable_update=True,
+                    hub="hf",
+                )
+            self.online = True
+            return
+
         with CaptureOutput():
             self.model = AutoModel(
                 model=self.model_dir,
@@ -49,19 +70,38 @@ class ASRProvider(ASRProviderBase):
                 # device="cuda:0",  # 启用GPU加速
             )
 
-    def save_audio_to_file(self, pcm_data: List[bytes], session_id: str) -> str:
-        """PCM数据保存为WAV文件"""
-        module_name = __name__.split(".")[-1]
-        file_name = f"asr_{module_name}_{session_id}_{uuid.uuid4()}.wav"
-        file_path = os.path.join(self.output_dir, file_name)
-
-        with wave.open(file_path, "wb") as wf:
-            wf.setnchannels(1)
-            wf.setsampwidth(2)  # 2 bytes = 16-bit
-            wf.setframerate(16000)
-            wf.writeframes(b"".join(pcm_data))
+    def create_online_stream(self):
+        # 模型缓存、未凑满一块的采样和已识别的文本片段
+        return {"cache": {}, "samples": np.zeros(0, dtype=np.float32), "texts": []}
+
+    def _generate_chunk(self, stream, chunk: np.ndarray, is_final: bool) -> None:
+        result = self.model.generate(
+            input=chunk,
+            cache=stream["cache"],
+            is_final=is_final,
+            chunk_size=self.chunk_size,
+            encoder_chunk_look_back=self.encoder_chunk_look_back,
+            decoder_chunk_look_back=self.decoder_chunk_look_back,
+        )
+        if result and result[0].get("text"):
+            stream["texts"].append(result[0]["text"])
+
+    def accept_online_samples(self, stream, samples: np.ndarray) -> None:
+        buffered = np.concatenate((stream["samples"], samples))
+        offset = 0
+        while len(buffered) - offset >= self.chunk_stride:
+            self._generate_chunk(
+                stream, buffered[offset : offset + self.chunk_stride], False
+            )
+            offset += self.chunk_stride
+        stream["samples"] = buffered[offset:]
 
-        return file_path
+    def finish_online_stream(self, stream) -> str:
+        tail = stream["samples"]
+        if len(tail) == 0:
+            tail = np.zeros(960, dtype=np.float32)
+        self._generate_chunk(stream, tail, True)
+        return "".join(stream["texts"])
 
     async def speech_to_text(
         self, opus_data: List[bytes], session_id: str
@@ -69,22 +109,26 @@ class ASRProvider(ASRProviderBase):
         """语音转文本主处理逻辑"""
         file_path = None
         try:
-            # 合并所有opus数据包
-            if self.audio_format == "pcm":
-                pcm_data = opus_data
-            else:
-                pcm_data = self.decode_opus(opus_data)
-
-            combined_pcm_data = b"".join(pcm_data)
+            # 直接使用内存中的音频，不经过磁盘
+            utterance = self.to_utterance(opus_data)
+            combined_pcm_data = utterance.pcm
 
-            # 判断是否保存为WAV文件
-            if self.delete_audio_file:
-                pass
-            else:
-                file_path = self.save_audio_to_file(pcm_data, session_id)
+            # 需要保留录音时交给后台归档写入
+            if not self.delete_audio_file:
+                file_path = self.save_audio_to_file(combined_pcm_data, session_id)
 
             # 语音识别
             start_time = time.time()
+            if self.online:
+                # 在线模式下没有识别流时（例如直接调用）整句按块送入流式模型
+                stream = self.create_online_stream()
+                self.accept_online_samples(stream, utterance.samples)
+                text = self.finish_online_stream(stream)
+                logger.bind(tag=TAG).debug(
+                    f"语音识别耗时: {time.time() - start_time:.3f}s | 结果: {text}"
+                )
+                return text, file_path
+
             result = self.model.generate(
                 input=combined_pcm_data,
                 cache={},
@@ -102,12 +146,3 @@ class ASRProvider(ASRProviderBase):
         except Exception as e:
             logger.bind(tag=TAG).error(f"语音识别失败: {e}", exc_info=True)
             return "", file_path
-
-        # finally:
-        #     # 文件清理逻辑
-        #     if self.delete_audio_file and file_path and os.path.exists(file_path):
-        #         try:
-        #             os.remove(file_path)
-        #             logger.bind(tag=TAG).debug(f"已删除临时音频文件: {file_path}")
-        #         except Exception as e:
-        #             logger.bind(tag=TAG).error(f"文件删除失败: {file_path} | 错误: {e}")
@@ -0,0 +1,146 @@
+"""
+本地ASR的在线识别流
+音频帧到达时即在音频线程池中解码并送入流式识别模型，说话结束后只需做一次很短的收尾解码，
+识别延迟不再随一句话的长度增长
+"""
+
+import threading
+from abc import ABC, abstractmethod
+from collections import deque
+from typing import Iterable, List
+
+import numpy as np
+import opuslib_next
+
+from config.logger import setup_logging
+from core.utils.runtime import runtime, WorkloadType
+
+TAG = __name__
+logger = setup_logging()
+
+SAMPLE_RATE = 16000
+FRAME_SAMPLES = 960  # 60ms at 16kHz
+
+
+class OnlineASRMixin(ABC):
+    """支持在线识别的本地引擎继承此类，初始化时把online置为True开启在线模式
+
+    以下方法均在音频线程池中调用
+    """
+
+    @abstractmethod
+    def create_online_stream(self):
+        """创建一句话的识别流"""
+        pass
+
+    @abstractmethod
+    def accept_online_samples(self, stream, samples: np.ndarray) -> None:
+        """送入归一化到[-1, 1]的float32采样并解码已就绪的部分"""
+        pass
+
+    @abstractmethod
+    def finish_online_stream(self, stream) -> str:
+        """输入结束，解码剩余音频并返回识别文本"""
+        pass
+
+
+class OnlineRecognition:
+    """一句话对应的在线识别流
+
+    accept 在事件循环中调用，只把帧放入待处理队列；解码和识别在音频线程池中按到达顺序执行，
+    同一时间每个识别流最多占用一个工作线程
+    """
+
+    def __init__(self, provider: OnlineASRMixin, audio_format: str = "opus"):
+        self.provider = provider
+        self.audio_format = audio_format
+        self.closed = False
+        self.failed = False
+        self.frame_count = 0
+        self._decoder = (
+            opuslib_next.Decoder(SAMPLE_RATE, 1) if audio_format != "pcm" else None
+        )
+        # 引擎的识别流，在第一次送入音频时创建
+        self._stream = None
+        self._pending = deque()
+        self._scheduled = False
+        self._queue_lock = threading.Lock()
+        # 保证解码、识别和收尾按顺序执行
+        self._process_lock = threading.Lock()
+
+    def accept(self, frames: Iterable[bytes]) -> None:
+        """送入新到的音频帧，不阻塞"""
+        if self.closed:
+            return
+        with self._queue_lock:
+            self._pending.extend(frames)
+            if self._scheduled:
+                return
+            self._scheduled = True
+        runtime.submit(WorkloadType.AUDIO, self._drain)
+
+    def finish(self) -> str:
+        """处理剩余音频并结束识别，返回识别文本（阻塞，在音频线程池中调用）"""
+        with self._process_lock:
+            self._process_pending()
+            stream, self._stream = self._stream, None
+            self.closed = True
+            if self.failed or stream is None:
+                return ""
+            try:
+                return self.provider.finish_online_stream(stream)
+            except Exception as e:
+                logger.bind(tag=TAG).error(f"在线识别收尾失败: {e}")
+                return ""
+
+    def close(self) -> None:
+        """丢弃识别流，例如音频太短或连接关闭"""
+        self.closed = True
+        with self._queue_lock:
+            self._pending.clear()
+
+    def _drain(self) -> None:
+        with self._process_lock:
+            with self._queue_lock:
+                self._scheduled = False
+            self._process_pending()
+
+    def _process_pending(self) -> None:
+        with self._queue_lock:
+            frames = list(self._pending)
+            self._pending.clear()
+        if self.closed:
+            self._stream = None
+            return
+        if self.failed or not frames:
+            return
+        try:
+            samples = self._to_samples(frames)
+            if self._stream is None:
+                self._stream = self.provider.create_online_stream()
+            self.provider.accept_online_samples(self._stream, samples)
+            self.frame_count += len(frames)
+        except Exception as e:
+            # 出错后本句不再继续识别，收尾时返回空文本
+            self.failed = True
+            self._stream = None
+            logger.bind(tag=TAG).error(f"在线识别失败: {e}")
+
+    def _to_samples(self, frames: List[bytes]) -> np.ndarray:
+        """把一批帧转换为归一化到[-1, 1]的float32采样"""
+        if self._decoder is None:
+            pcm_frames = frames
+        else:
+            pcm_frames = []
+            for opus_packet in frames:
+                if not opus_packet:
+                    continue
+                try:
+                    pcm_frames.append(self._decoder.decode(opus_packet, FRAME_SAMPLES))
+                except opuslib_next.OpusError as e:
+                    logger.bind(tag=TAG).warning(f"Opus解码错误，跳过数据包: {e}")
+        samples = np.frombuffer(b"".join(pcm_frames), dtype=np.int16).astype(
+            np.float32
+        )
+        samples /= 32768.0
+        return samples
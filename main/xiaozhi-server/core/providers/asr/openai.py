@@ -4,38 +4,35 @@ from config.logger import setup_logging
 from typing import Optional, Tuple, List
 from core.providers.asr.dto.dto import InterfaceType
 from core.providers.asr.base import ASRProviderBase
-
-import requests
+from core.utils.http_client import http_client
 
 TAG = __name__
 logger = setup_logging()
 
 class ASRProvider(ASRProviderBase):
     def __init__(self, config: dict, delete_audio_file: bool):
+        super().__init__()
         self.interface_type = InterfaceType.NON_STREAM
         self.api_key = config.get("api_key")
         self.api_url = config.get("base_url")
         self.model = config.get("model_name")        
         self.output_dir = config.get("output_dir")
         self.delete_audio_file = delete_audio_file
+        self.http_config = config
 
         os.makedirs(self.output_dir, exist_ok=True)
 
     async def speech_to_text(self, opus_data: List[bytes], session_id: str, audio_format="opus") -> Tuple[Optional[str], Optional[str]]:
         file_path = None
         try:
-            start_time = time.time()
-            if audio_format == "pcm":
-                pcm_data = opus_data
-            else:
-                pcm_data = self.decode_opus(opus_data)
-            file_path = self.save_audio_to_file(pcm_data, session_id)
+            # 直接上传内存中的WAV数据，不再写入临时文件
+            utterance = self.to_utterance(opus_data, audio_format)
+            wav_data = utterance.wav
 
-            logger.bind(tag=TAG).debug(
-                f"音频文件保存耗时: {time.time() - start_time:.3f}s | 路径: {file_path}"
-            )
+            # 需要保留录音时交给后台归档写入
+            if not self.delete_audio_file:
+                file_path = self.save_audio_to_file(utterance.pcm, session_id)
 
-            logger.bind(tag=TAG).info(f"file path: {file_path}")
             headers = {
                 "Authorization": f"Bearer {self.api_key}",
             }
@@ -45,22 +42,21 @@ class ASRProvider(ASRProviderBase):
                 "model": self.model
             }
 
+            files = {
+                "file": (f"{session_id}.wav", wav_data, "audio/wav")
+            }
 
-            with open(file_path, "rb") as audio_file:  # 使用with语句确保文件关闭
-                files = {
-                    "file": audio_file
-                }
-
-                start_time = time.time()
-                response = requests.post(
-                    self.api_url,
-                    files=files,
-                    data=data,
-                    headers=headers
-                )
-                logger.bind(tag=TAG).debug(
-                    f"语音识别耗时: {time.time() - start_time:.3f}s | 结果: {response.text}"
-                )
+            start_time = time.time()
+            client = http_client.get(self.api_url, self.http_config)
+            response = await client.post(
+                self.api_url,
+                files=files,
+                data=data,
+                headers=headers
+            )
+            logger.bind(tag=TAG).debug(
+                f"语音识别耗时: {time.time() - start_time:.3f}s | 结果: {response.text}"
+            )
 
             if response.status_code == 200:
                 text = response.json().get("text", "")
@@ -71,12 +67,3 @@ class ASRProvider(ASRProviderBase):
         except Exception as e:
             logger.bind(tag=TAG).error(f"语音识别失败: {e}")
             return "", None
-        finally:
-            # 文件清理逻辑
-            if self.delete_audio_file and file_path and os.path.exists(file_path):
-                try:
-                    os.remove(file_path)
-                    logger.bind(tag=TAG).debug(f"已删除临时音频文件: {file_path}")
-                except Exception as e:
-                    logger.bind(tag=TAG).error(f"文件删除失败: {file_path} | 错误: {e}")
-        
@@ -1,13 +1,12 @@
 import time
-import wave
 import os
 import sys
 import io
 from config.logger import setup_logging
 from typing import Optional, Tuple, List
-import uuid
 import opuslib_next
 from core.providers.asr.base import ASRProviderBase
+from core.providers.asr.online import OnlineASRMixin
 
 import numpy as np
 import sherpa_onnx
@@ -35,17 +34,23 @@ class CaptureOutput:
             logger.bind(tag=TAG).info(self.output.strip())
 
 
-class ASRProvider(ASRProviderBase):
+class ASRProvider(ASRProviderBase, OnlineASRMixin):
     def __init__(self, config: dict, delete_audio_file: bool):
         super().__init__()
         self.model_dir = config.get("model_dir")
         self.output_dir = config.get("output_dir")
         self.model_type = config.get("model_type", "sense_voice")  # 支持 paraformer
+        # offline：说话结束后整句识别；online：使用流式模型边说边识别
+        self.mode = config.get("mode", "offline")
         self.delete_audio_file = delete_audio_file
 
         # 确保输出目录存在
         os.makedirs(self.output_dir, exist_ok=True)
 
+        if self.mode == "online":
+            self._init_online_model(config)
+            return
+
         # 初始化模型文件路径
         model_files = {
             "model.int8.onnx": os.path.join(self.model_dir, "model.int8.onnx"),
@@ -96,43 +101,61 @@ class ASRProvider(ASRProviderBase):
                     use_itn=True,
                 )
 
-    def save_audio_to_file(self, pcm_data: List[bytes], session_id: str) -> str:
-        """PCM数据保存为WAV文件"""
-        module_name = __name__.split(".")[-1]
-        file_name = f"asr_{module_name}_{session_id}_{uuid.uuid4()}.wav"
-        file_path = os.path.join(self.output_dir, file_name)
-
-        with wave.open(file_path, "wb") as wf:
-            wf.setnchannels(1)
-            wf.setsampwidth(2)  # 2 bytes = 16-bit
-            wf.setframerate(16000)
-            wf.writeframes(b"".join(pcm_data))
-
-        return file_path
-
-    def read_wave(self, wave_filename: str) -> Tuple[np.ndarray, int]:
-        """
-        Args:
-        wave_filename:
-            Path to a wave file. It should be single channel and each sample should
-            be 16-bit. Its sample rate does not need to be 16kHz.
-        Returns:
-        Return a tuple containing:
-        - A 1-D array of dtype np.float32 containing the samples, which are
-        normalized to the range [-1, 1].
-        - sample rate of the wave file
-        """
-
-        with wave.open(wave_filename) as f:
-            assert f.getnchannels() == 1, f.getnchannels()
-            assert f.getsampwidth() == 2, f.getsampwidth()  # it is in bytes
-            num_samples = f.getnframes()
-            samples = f.readframes(num_samples)
-            samples_int16 = np.frombuffer(samples, dtype=np.int16)
-            samples_float32 = samples_int16.astype(np.float32)
-
-            samples_float32 = samples_float32 / 32768
-            return samples_float32, f.getframerate()
+    def _init_online_model(self, config: dict):
+        """加载流式模型（paraformer 或 transducer），模型文件需手动下载"""
+        model_files = {
+            "encoder": config.get("encoder", "encoder.int8.onnx"),
+            "decoder": config.get("decoder", "decoder.int8.onnx"),
+            "tokens": config.get("tokens", "tokens.txt"),
+        }
+        if self.model_type == "transducer":
+            model_files["joiner"] = config.get("joiner", "joiner.int8.onnx")
+        for name, file_name in model_files.items():
+            file_path = os.path.join(self.model_dir, file_name)
+            if not os.path.isfile(file_path):
+                raise FileNotFoundError(f"流式模型文件不存在: {file_path}")
+            model_files[name] = file_path
+
+        with CaptureOutput():
+            if self.model_type == "transducer":
+                self.model = sherpa_onnx.OnlineRecognizer.from_transducer(
+                    encoder=model_files["encoder"],
+                    decoder=model_files["decoder"],
+                    joiner=model_files["joiner"],
+                    tokens=model_files["tokens"],
+                    num_threads=2,
+                    sample_rate=16000,
+                    feature_dim=80,
+                    decoding_method="greedy_search",
+                )
+            else:  # paraformer
+                self.model = sherpa_onnx.OnlineRecognizer.from_paraformer(
+                    encoder=model_files["encoder"],
+                    decoder=model_files["decoder"],
+                    tokens=model_files["tokens"],
+                    num_threads=2,
+                    sample_rate=16000,
+                    feature_dim=80,
+                    decoding_method="greedy_search",
+                )
+        self.online = True
+
+    def create_online_stream(self):
+        return self.model.create_stream()
+
+    def accept_online_samples(self, stream, samples: np.ndarray) -> None:
+        stream.accept_waveform(16000, samples)
+        while self.model.is_ready(stream):
+            self.model.decode_stream(stream)
+
+    def finish_online_stream(self, stream) -> str:
+        # 补一段静音让模型输出最后几个字
+        stream.accept_waveform(16000, np.zeros(int(0.66 * 16000), dtype=np.float32))
+        stream.input_finished()
+        while self.model.is_ready(stream):
+            self.model.decode_stream(stream)
+        result = self.model.get_result(stream)
+        return result if isinstance(result, str) else result.text
 
     async def speech_to_text(
         self, opus_data: List[bytes], session_id: str
@@ -140,24 +163,26 @@ class ASRProvider(ASRProviderBase):
         """语音转文本主处理逻辑"""
         file_path = None
         try:
-            # 保存音频文件
-            start_time = time.time()
-            if self.audio_format == "pcm":
-                pcm_data = opus_data
-            else:
-                pcm_data = self.decode_opus(opus_data)
-            file_path = self.save_audio_to_file(pcm_data, session_id)
-            logger.bind(tag=TAG).debug(
-                f"音频文件保存耗时: {time.time() - start_time:.3f}s | 路径: {file_path}"
-            )
+            # 直接使用内存中的float32采样，不再写入WAV文件再读回
+            utterance = self.to_utterance(opus_data)
+            samples = utterance.samples
+
+            # 需要保留录音时交给后台归档写入
+            if not self.delete_audio_file:
+                file_path = self.save_audio_to_file(utterance.pcm, session_id)
 
             # 语音识别
             start_time = time.time()
-            s = self.model.create_stream()
-            samples, sample_rate = self.read_wave(file_path)
-            s.accept_waveform(sample_rate, samples)
-            self.model.decode_stream(s)
-            text = s.result.text
+            if self.online:
+                # 在线模式下没有识别流时（例如直接调用）整句送入流式模型
+                s = self.create_online_stream()
+                self.accept_online_samples(s, samples)
+                text = self.finish_online_stream(s)
+            else:
+                s = self.model.create_stream()
+                s.accept_waveform(16000, samples)
+                self.model.decode_stream(s)
+                text = s.result.text
             logger.bind(tag=TAG).debug(
                 f"语音识别耗时: {time.time() - start_time:.3f}s | 结果: {text}"
             )
@@ -167,11 +192,3 @@ class ASRProvider(ASRProviderBase):
         except Exception as e:
             logger.bind(tag=TAG).error(f"语音识别失败: {e}", exc_info=True)
             return "", file_path
-        finally:
-            # 文件清理逻辑
-            if self.delete_audio_file and file_path and os.path.exists(file_path):
-                try:
-                    os.remove(file_path)
-                    logger.bind(tag=TAG).debug(f"已删除临时音频文件: {file_path}")
-                except Exception as e:
-                    logger.bind(tag=TAG).error(f"文件删除失败: {file_path} | 错误: {e}")
@@ -5,13 +5,12 @@ import json
 import time
 from datetime import datetime, timezone
 import os
-import uuid
 from typing import Optional, Tuple, List
-import wave
 import opuslib_next
 
-import requests
 from core.providers.asr.base import ASRProviderBase
+from core.providers.asr.dto.dto import InterfaceType
+from core.utils.http_client import http_client
 from config.logger import setup_logging
 
 TAG = __name__
@@ -25,28 +24,16 @@ class ASRProvider(ASRProviderBase):
 
     def __init__(self, config: dict, delete_audio_file: bool = True):
         super().__init__()
+        self.interface_type = InterfaceType.NON_STREAM
         self.secret_id = config.get("secret_id")
         self.secret_key = config.get("secret_key")
         self.output_dir = config.get("output_dir")
         self.delete_audio_file = delete_audio_file
+        self.http_config = config
 
         # 确保输出目录存在
         os.makedirs(self.output_dir, exist_ok=True)
 
-    def save_audio_to_file(self, pcm_data: List[bytes], session_id: str) -> str:
-        """PCM数据保存为WAV文件"""
-        module_name = __name__.split(".")[-1]
-        file_name = f"asr_{module_name}_{session_id}_{uuid.uuid4()}.wav"
-        file_path = os.path.join(self.output_dir, file_name)
-
-        with wave.open(file_path, "wb") as wf:
-            wf.setnchannels(1)
-            wf.setsampwidth(2)  # 2 bytes = 16-bit
-            wf.setframerate(16000)
-            wf.writeframes(b"".join(pcm_data))
-
-        return file_path
-
     async def speech_to_text(
         self, opus_data: List[bytes], session_id: str
     ) -> Tuple[Optional[str], Optional[str]]:
@@ -62,18 +49,12 @@ class ASRProvider(ASRProviderBase):
                 logger.bind(tag=TAG).error("腾讯云语音识别配置未设置，无法进行识别")
                 return None, file_path
 
-            # 将Opus音频数据解码为PCM
-            if self.audio_format == "pcm":
-                pcm_data = opus_data
-            else:
-                pcm_data = self.decode_opus(opus_data)
-            combined_pcm_data = b"".join(pcm_data)
+            # 直接使用内存中的PCM数据，不经过磁盘
+            combined_pcm_data = self.to_utterance(opus_data).pcm
 
-            # 判断是否保存为WAV文件
-            if self.delete_audio_file:
-                pass
-            else:
-                self.save_audio_to_file(pcm_data, session_id)
+            # 需要保留录音时交给后台归档写入
+            if not self.delete_audio_file:
+                file_path = self.save_audio_to_file(combined_pcm_data, session_id)
 
             # 将音频数据转换为Base64编码
             base64_audio = base64.b64encode(combined_pcm_data).decode("utf-8")
@@ -86,7 +67,7 @@ class ASRProvider(ASRProviderBase):
 
             # 发送请求
             start_time = time.time()
-            result = self._send_request(request_body, timestamp, authorization)
+            result = await self._send_request(request_body, timestamp, authorization)
 
             if result:
                 logger.bind(tag=TAG).debug(
@@ -197,7 +178,7 @@ class ASRProvider(ASRProviderBase):
             logger.bind(tag=TAG).error(f"生成认证头失败: {e}", exc_info=True)
             raise RuntimeError(f"生成认证头失败: {e}")
 
-    def _send_request(
+    async def _send_request(
         self, request_body: str, timestamp: str, authorization: str
     ) -> Optional[str]:
         """发送请求到腾讯云API"""
@@ -212,10 +193,15 @@ class ASRProvider(ASRProviderBase):
         }
 
         try:
-            response = requests.post(self.API_URL, headers=headers, data=request_body)
+            client = http_client.get(self.API_URL, self.http_config)
+            response = await client.post(
+                self.API_URL, headers=headers, content=request_body
+            )
 
-            if not response.ok:
-                raise IOError(f"请求失败: {response.status_code} {response.reason}")
+            if not response.is_success:
+                raise IOError(
+                    f"请求失败: {response.status_code} {response.reason_phrase}"
+                )
 
             response_json = response.json()
 
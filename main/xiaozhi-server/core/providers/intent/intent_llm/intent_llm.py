@@ -1,8 +1,10 @@
 from typing import List, Dict
 from ..base import IntentProviderBase
-from plugins_func.functions.play_music import initialize_music_handler
+from plugins_func.functions.play_music import get_music_prompt_names
 from config.logger import setup_logging
+from core.utils.runtime import runtime, WorkloadType
 import re
+import asyncio
 import json
 import hashlib
 import time
@@ -22,6 +24,33 @@ class IntentProvider(IntentProviderBase):
         self.cache_manager = cache_manager
         self.CacheType = CacheType
         self.history_count = 4  # 默认使用最近4条对话记录
+        # 意图识别请求超时（秒），超时后按继续聊天处理
+        timeout = config.get("timeout", "5")
+        self.timeout = float(timeout) if timeout else 5
+        # 提示词中不随用户输入变化的部分（函数说明、智能设备列表），按函数列表和设备列表缓存
+        self._static_prompt_key = None
+        self._static_prompt = ""
+
+    def _get_static_prompt(self, conn) -> str:
+        """函数列表或设备列表变化（如切换配置）时才重新构建"""
+        functions = []
+        if getattr(conn, "func_handler", None) is not None:
+            functions = conn.func_handler.get_functions() or []
+        devices = conn.config["plugins"]["home_assistant"].get("devices", [])
+        key = (
+            tuple(func.get("function", {}).get("name", "") for func in functions),
+            tuple(devices),
+        )
+        if key != self._static_prompt_key:
+            prompt = self.get_intent_system_prompt(functions)
+            if len(devices) > 0:
+                prompt += "\n下面是我家智能设备列表（位置，设备名，entity_id），可以通过homeassistant控制\n"
+                for device in devices:
+                    prompt += device + "\n"
+            self.promot = prompt
+            self._static_prompt = prompt
+            self._static_prompt_key = key
+        return self._static_prompt
 
     def get_intent_system_prompt(self, functions_list: str) -> str:
         """
@@ -116,21 +145,14 @@ class IntentProvider(IntentProviderBase):
             )
             return cached_intent
 
-        if self.promot == "":
-            if hasattr(conn, "func_handler"):
-                functions = conn.func_handler.get_functions()
-                self.promot = self.get_intent_system_prompt(functions)
-
-        music_config = initialize_music_handler(conn)
-        music_file_names = music_config["music_file_names"]
-        prompt_music = f"{self.promot}\n<musicNames>{music_file_names}\n</musicNames>"
-
-        devices = conn.config["plugins"]["home_assistant"].get("devices", [])
-        if len(devices) > 0:
-            hass_prompt = "\n下面是我家智能设备列表（位置，设备名，entity_id），可以通过homeassistant控制\n"
-            for device in devices:
-                hass_prompt += device + "\n"
-            prompt_music += hass_prompt
+        # 只提供与用户输入最相关的若干首歌名，避免曲库较大时提示词过长；
+        # 歌名随输入变化，放在提示词末尾，目录刷新可能读磁盘，放到线程池中执行
+        music_file_names = await runtime.run(
+            WorkloadType.NETWORK, get_music_prompt_names, conn, text
+        )
+        prompt_music = (
+            f"{self._get_static_prompt(conn)}\n<musicNames>{music_file_names}\n</musicNames>"
+        )
 
         logger.bind(tag=TAG).debug(f"User prompt: {prompt_music}")
 
@@ -153,9 +175,19 @@ class IntentProvider(IntentProviderBase):
         llm_start_time = time.time()
         logger.bind(tag=TAG).debug(f"开始LLM意图识别调用, 模型: {model_info}")
 
-        intent = self.llm.response_no_stream(
-            system_prompt=prompt_music, user_prompt=user_prompt
-        )
+        # 异步请求，等待期间不阻塞其他连接；打断时所在任务被取消，同时关闭上游请求
+        try:
+            intent = await asyncio.wait_for(
+                self.llm.response_no_stream_async(
+                    system_prompt=prompt_music, user_prompt=user_prompt
+                ),
+                timeout=self.timeout,
+            )
+        except asyncio.TimeoutError:
+            logger.bind(tag=TAG).warning(
+                f"LLM意图识别超时（{self.timeout}秒），按继续聊天处理, 模型: {model_info}"
+            )
+            return '{"function_call": {"name": "continue_chat"}}'
 
         # 记录LLM调用完成时间
         llm_time = time.time() - llm_start_time
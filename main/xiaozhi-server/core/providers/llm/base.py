@@ -1,9 +1,16 @@
+import asyncio
+import threading
 from abc import ABC, abstractmethod
 from config.logger import setup_logging
+from core.utils.runtime import runtime, WorkloadType, LoopQueue
 
 TAG = __name__
 logger = setup_logging()
 
+# 同步生成器结束的标记
+_STREAM_END = object()
+
+
 class LLMProviderBase(ABC):
     @abstractmethod
     def response(self, session_id, dialogue):
@@ -25,7 +32,25 @@ class LLMProviderBase(ABC):
         except Exception as e:
             logger.bind(tag=TAG).error(f"Error in Ollama response generation: {e}")
             return "【LLM服务响应异常】"
-    
+
+    async def response_no_stream_async(self, system_prompt, user_prompt):
+        """异步版本的 response_no_stream，等待期间不阻塞事件循环，任务取消时关闭上游的流"""
+        dialogue = [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_prompt},
+        ]
+        stream = self.response_stream("", dialogue)
+        try:
+            result = ""
+            async for part in stream:
+                result += part
+            return result
+        except Exception as e:
+            logger.bind(tag=TAG).error(f"Error in response generation: {e}")
+            return "【LLM服务响应异常】"
+        finally:
+            await stream.aclose()
+
     def response_with_functions(self, session_id, dialogue, functions=None):
         """
         Default implementation for function calling (streaming)
@@ -37,3 +62,54 @@ class LLMProviderBase(ABC):
         for token in self.response(session_id, dialogue):
             yield token, None
 
+    async def response_stream(self, session_id, dialogue):
+        """异步流式输出，产出内容与 response 相同
+
+        在事件循环中读取，停止读取（aclose 或任务取消）时立即关闭上游的流。
+        默认实现在网络线程池中驱动同步生成器，支持异步请求的Provider应覆盖此方法
+        """
+        async for token in self._iterate_in_thread(
+            self.response, session_id, dialogue
+        ):
+            yield token
+
+    async def response_with_functions_stream(self, session_id, dialogue, functions=None):
+        """异步流式输出，产出内容与 response_with_functions 相同"""
+        async for item in self._iterate_in_thread(
+            self.response_with_functions, session_id, dialogue, functions=functions
+        ):
+            yield item
+
+    @staticmethod
+    async def _iterate_in_thread(generator_fn, *args, **kwargs):
+        """在网络线程池中驱动同步生成器，在事件循环中逐个产出结果
+
+        停止读取后，线程在上游下一次返回数据时关闭生成器并退出
+        """
+        results = LoopQueue(asyncio.get_running_loop())
+        stopped = threading.Event()
+
+        def produce():
+            generator = generator_fn(*args, **kwargs)
+            try:
+                for item in generator:
+                    if stopped.is_set():
+                        break
+                    results.put((item, None))
+                results.put((_STREAM_END, None))
+            except Exception as e:
+                results.put((_STREAM_END, e))
+            finally:
+                generator.close()
+
+        runtime.submit(WorkloadType.NETWORK, produce)
+        try:
+            while True:
+                item, error = await results.get()
+                if item is _STREAM_END:
+                    if error is not None:
+                        raise error
+                    return
+                yield item
+        finally:
+            stopped.set()
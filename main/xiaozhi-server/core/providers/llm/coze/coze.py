@@ -12,6 +12,7 @@ from cozepy import (
 )  # noqa
 from core.providers.llm.system_prompt import get_system_prompt_for_function
 from core.utils.util import check_model_key
+from core.utils.http_client import http_client
 
 TAG = __name__
 logger = setup_logging()
@@ -23,6 +24,7 @@ class LLMProvider(LLMProviderBase):
         self.bot_id = str(config.get("bot_id"))
         self.user_id = str(config.get("user_id"))
         self.session_conversation_map = {}  # 存储session_id和conversation_id的映射
+        self.http_config = config
         check_model_key("CozeLLM", self.personal_access_token)
 
     def response(self, session_id, dialogue):
@@ -52,22 +54,89 @@ class LLMProvider(LLMProviderBase):
                 print(event.message.content, end="", flush=True)
                 yield event.message.content
 
-    def response_with_functions(self, session_id, dialogue, functions=None):
-        if len(dialogue) == 2 and functions is not None and len(functions) > 0:
+    def _prepare_function_dialogue(self, dialogue, functions):
+        # 对话消息可能被缓存复用，修改时替换为新的字典，不直接改动原消息
+        first_call = sum(1 for m in dialogue if m["role"] != "system") == 1
+        if first_call and functions is not None and len(functions) > 0:
             # 第一次调用llm， 取最后一条用户消息，附加tool提示词
             last_msg = dialogue[-1]["content"]
             function_str = json.dumps(functions, ensure_ascii=False)
             modify_msg = get_system_prompt_for_function(function_str) + last_msg
-            dialogue[-1]["content"] = modify_msg
+            dialogue[-1] = {**dialogue[-1], "content": modify_msg}
 
         # 如果最后一个是 role="tool"，附加到user上
         if len(dialogue) > 1 and dialogue[-1]["role"] == "tool":
             assistant_msg = "\ntool call result: " + dialogue[-1]["content"] + "\n\n"
             while len(dialogue) > 1:
                 if dialogue[-1]["role"] == "user":
-                    dialogue[-1]["content"] = assistant_msg + dialogue[-1]["content"]
+                    dialogue[-1] = {
+                        **dialogue[-1],
+                        "content": assistant_msg + dialogue[-1]["content"],
+                    }
                     break
                 dialogue.pop()
 
+    def response_with_functions(self, session_id, dialogue, functions=None):
+        self._prepare_function_dialogue(dialogue, functions)
         for token in self.response(session_id, dialogue):
             yield token, None
+
+    async def _get_conversation_id(self, client, headers, session_id):
+        conversation_id = self.session_conversation_map.get(session_id)
+        # 如果没有找到conversation_id，则创建新的对话
+        if not conversation_id:
+            resp = await client.post(
+                f"{COZE_CN_BASE_URL}/v1/conversation/create",
+                headers=headers,
+                json={"messages": []},
+            )
+            resp.raise_for_status()
+            result = resp.json()
+            if result.get("code"):
+                raise ValueError(f"创建Coze会话失败: {result.get('msg')}")
+            conversation_id = result["data"]["id"]
+            self.session_conversation_map[session_id] = conversation_id  # 更新映射
+        return conversation_id
+
+    async def response_stream(self, session_id, dialogue):
+        """直接请求Chat v3流式接口，使用共享连接池，停止读取时关闭响应"""
+        last_msg = next(m for m in reversed(dialogue) if m["role"] == "user")
+        url = f"{COZE_CN_BASE_URL}/v3/chat"
+        client = http_client.get(url, self.http_config)
+        headers = {"Authorization": f"Bearer {self.personal_access_token}"}
+        conversation_id = await self._get_conversation_id(client, headers, session_id)
+
+        async with client.stream(
+            "POST",
+            url,
+            headers=headers,
+            params={"conversation_id": conversation_id},
+            json={
+                "bot_id": self.bot_id,
+                "user_id": self.user_id,
+                "additional_messages": [
+                    Message.build_user_question_text(last_msg["content"]).model_dump()
+                ],
+                "stream": True,
+                "auto_save_history": True,
+            },
+        ) as r:
+            r.raise_for_status()
+            event = None
+            async for line in r.aiter_lines():
+                line = line.strip()
+                if line.startswith("event:"):
+                    event = line[len("event:") :].strip()
+                elif line.startswith("data:"):
+                    data = line[len("data:") :].strip()
+                    if event == ChatEventType.CONVERSATION_MESSAGE_DELTA:
+                        yield json.loads(data).get("content", "")
+                    elif event == ChatEventType.ERROR:
+                        raise ValueError(f"Coze返回错误: {data}")
+                    elif event == ChatEventType.DONE:
+                        return
+
+    async def response_with_functions_stream(self, session_id, dialogue, functions=None):
+        self._prepare_function_dialogue(dialogue, functions)
+        async for token in self.response_stream(session_id, dialogue):
+            yield token, None
@@ -1,7 +1,7 @@
 import json
 from config.logger import setup_logging
-import requests
 from core.providers.llm.base import LLMProviderBase
+from core.utils.http_client import http_client
 from core.utils.util import check_model_key
 
 TAG = __name__
@@ -14,6 +14,7 @@ class LLMProvider(LLMProviderBase):
         self.base_url = config.get("base_url")
         self.detail = config.get("detail", False)
         self.variables = config.get("variables", {})
+        self.http_config = config
         check_model_key("FastGPTLLM", self.api_key)
 
     def response(self, session_id, dialogue):
@@ -22,8 +23,11 @@ class LLMProvider(LLMProviderBase):
             last_msg = next(m for m in reversed(dialogue) if m["role"] == "user")
 
             # 发起流式请求
-            with requests.post(
-                f"{self.base_url}/chat/completions",
+            url = f"{self.base_url}/chat/completions"
+            client = http_client.get_sync(url, self.http_config)
+            with client.stream(
+                "POST",
+                url,
                 headers={"Authorization": f"Bearer {self.api_key}"},
                 json={
                     "stream": True,
@@ -32,13 +36,12 @@ class LLMProvider(LLMProviderBase):
                     "variables": self.variables,
                     "messages": [{"role": "user", "content": last_msg["content"]}],
                 },
-                stream=True,
             ) as r:
                 for line in r.iter_lines():
                     if line:
                         try:
-                            if line.startswith(b"data: "):
-                                if line[6:].decode("utf-8") == "[DONE]":
+                            if line.startswith("data: "):
+                                if line[6:] == "[DONE]":
                                     break
 
                                 data = json.loads(line[6:])
@@ -1,7 +1,7 @@
-import requests
-from requests.exceptions import RequestException
+import httpx
 from config.logger import setup_logging
 from core.providers.llm.base import LLMProviderBase
+from core.utils.http_client import http_client
 
 TAG = __name__
 logger = setup_logging()
@@ -13,6 +13,7 @@ class LLMProvider(LLMProviderBase):
         self.api_key = config.get("api_key")
         self.base_url = config.get("base_url", config.get("url"))  # 默认使用 base_url
         self.api_url = f"{self.base_url}/api/conversation/process"  # 拼接完整的 API URL
+        self.http_config = config
 
     def response(self, session_id, dialogue):
         try:
@@ -40,7 +41,8 @@ class LLMProvider(LLMProviderBase):
             }
 
             # 发起 POST 请求
-            response = requests.post(self.api_url, json=payload, headers=headers)
+            client = http_client.get_sync(self.api_url, self.http_config)
+            response = client.post(self.api_url, json=payload, headers=headers)
 
             # 检查请求是否成功
             response.raise_for_status()
@@ -60,7 +62,7 @@ class LLMProvider(LLMProviderBase):
             else:
                 logger.bind(tag=TAG).warning("API 返回数据中没有 speech 内容")
 
-        except RequestException as e:
+        except httpx.HTTPError as e:
             logger.bind(tag=TAG).error(f"HTTP 请求错误: {e}")
         except Exception as e:
             logger.bind(tag=TAG).error(f"生成响应时出错: {e}")
@@ -1,6 +1,7 @@
 from config.logger import setup_logging
-from openai import OpenAI
+from openai import OpenAI, AsyncOpenAI
 import json
+from core.utils.http_client import http_client
 from core.providers.llm.base import LLMProviderBase
 
 TAG = __name__
@@ -20,31 +21,77 @@ class LLMProvider(LLMProviderBase):
             base_url=self.base_url,
             api_key="ollama"  # Ollama doesn't need an API key but OpenAI client requires one
         )
+        self.http_config = config
 
         # 检查是否是qwen3模型
         self.is_qwen3 = self.model_name and self.model_name.lower().startswith("qwen3")
 
+    def _async_client(self):
+        """使用当前事件循环中共享的连接池"""
+        return AsyncOpenAI(
+            base_url=self.base_url,
+            api_key="ollama",
+            http_client=http_client.get(self.base_url, self.http_config),
+        )
+
+    def _prepare_dialogue(self, dialogue):
+        # 如果是qwen3模型，在用户最后一条消息中添加/no_think指令
+        if not self.is_qwen3:
+            return dialogue
+        # 复制对话列表，避免修改原始对话
+        dialogue_copy = dialogue.copy()
+
+        # 找到最后一条用户消息
+        for i in range(len(dialogue_copy) - 1, -1, -1):
+            if dialogue_copy[i]["role"] == "user":
+                # 在用户消息前添加/no_think指令
+                dialogue_copy[i] = {
+                    **dialogue_copy[i],
+                    "content": "/no_think " + dialogue_copy[i]["content"],
+                }
+                logger.bind(tag=TAG).debug(f"为qwen3模型添加/no_think指令")
+                break
+
+        # 使用修改后的对话
+        return dialogue_copy
+
+    @staticmethod
+    def _filter_think(buffer, content, is_active):
+        """把内容加入缓冲区并去掉<think>标签，返回(可输出的内容, 缓冲区, 是否在标签外)"""
+        # 将内容添加到缓冲区
+        buffer += content
+
+        # 处理缓冲区中的标签
+        while '<think>' in buffer and '</think>' in buffer:
+            # 找到完整的<think></think>标签并移除
+            pre = buffer.split('<think>', 1)[0]
+            post = buffer.split('</think>', 1)[1]
+            buffer = pre + post
+
+        # 处理只有开始标签的情况
+        if '<think>' in buffer:
+            is_active = False
+            buffer = buffer.split('<think>', 1)[0]
+
+        # 处理只有结束标签的情况
+        if '</think>' in buffer:
+            is_active = True
+            buffer = buffer.split('</think>', 1)[1]
+
+        # 如果当前处于活动状态且缓冲区有内容，则输出并清空缓冲区
+        if is_active and buffer:
+            return buffer, "", is_active
+        return "", buffer, is_active
+
+    @staticmethod
+    def _chunk_delta(chunk):
+        return chunk.choices[0].delta if getattr(chunk, 'choices', None) else None
+
     def response(self, session_id, dialogue):
         try:
-            # 如果是qwen3模型，在用户最后一条消息中添加/no_think指令
-            if self.is_qwen3:
-                # 复制对话列表，避免修改原始对话
-                dialogue_copy = dialogue.copy()
-
-                # 找到最后一条用户消息
-                for i in range(len(dialogue_copy) - 1, -1, -1):
-                    if dialogue_copy[i]["role"] == "user":
-                        # 在用户消息前添加/no_think指令
-                        dialogue_copy[i]["content"] = "/no_think " + dialogue_copy[i]["content"]
-                        logger.bind(tag=TAG).debug(f"为qwen3模型添加/no_think指令")
-                        break
-
-                # 使用修改后的对话
-                dialogue = dialogue_copy
-
             responses = self.client.chat.completions.create(
                 model=self.model_name,
-                messages=dialogue,
+                messages=self._prepare_dialogue(dialogue),
                 stream=True
             )
             is_active = True
@@ -53,34 +100,15 @@ class LLMProvider(LLMProviderBase):
 
             for chunk in responses:
                 try:
-                    delta = chunk.choices[0].delta if getattr(chunk, 'choices', None) else None
+                    delta = self._chunk_delta(chunk)
                     content = delta.content if hasattr(delta, 'content') else ''
 
                     if content:
-                        # 将内容添加到缓冲区
-                        buffer += content
-
-                        # 处理缓冲区中的标签
-                        while '<think>' in buffer and '</think>' in buffer:
-                            # 找到完整的<think></think>标签并移除
-                            pre = buffer.split('<think>', 1)[0]
-                            post = buffer.split('</think>', 1)[1]
-                            buffer = pre + post
-
-                        # 处理只有开始标签的情况
-                        if '<think>' in buffer:
-                            is_active = False
-                            buffer = buffer.split('<think>', 1)[0]
-
-                        # 处理只有结束标签的情况
-                        if '</think>' in buffer:
-                            is_active = True
-                            buffer = buffer.split('</think>', 1)[1]
-
-                        # 如果当前处于活动状态且缓冲区有内容，则输出
-                        if is_active and buffer:
-                            yield buffer
-                            buffer = ""  # 清空缓冲区
+                        output, buffer, is_active = self._filter_think(
+                            buffer, content, is_active
+                        )
+                        if output:
+                            yield output
 
                 except Exception as e:
                     logger.bind(tag=TAG).error(f"Error processing chunk: {e}")
@@ -91,25 +119,9 @@ class LLMProvider(LLMProviderBase):
 
     def response_with_functions(self, session_id, dialogue, functions=None):
         try:
-            # 如果是qwen3模型，在用户最后一条消息中添加/no_think指令
-            if self.is_qwen3:
-                # 复制对话列表，避免修改原始对话
-                dialogue_copy = dialogue.copy()
-
-                # 找到最后一条用户消息
-                for i in range(len(dialogue_copy) - 1, -1, -1):
-                    if dialogue_copy[i]["role"] == "user":
-                        # 在用户消息前添加/no_think指令
-                        dialogue_copy[i]["content"] = "/no_think " + dialogue_copy[i]["content"]
-                        logger.bind(tag=TAG).debug(f"为qwen3模型添加/no_think指令")
-                        break
-
-                # 使用修改后的对话
-                dialogue = dialogue_copy
-
             stream = self.client.chat.completions.create(
                 model=self.model_name,
-                messages=dialogue,
+                messages=self._prepare_dialogue(dialogue),
                 stream=True,
                 tools=functions,
             )
@@ -119,7 +131,7 @@ class LLMProvider(LLMProviderBase):
 
             for chunk in stream:
                 try:
-                    delta = chunk.choices[0].delta if getattr(chunk, 'choices', None) else None
+                    delta = self._chunk_delta(chunk)
                     content = delta.content if hasattr(delta, 'content') else None
                     tool_calls = delta.tool_calls if hasattr(delta, 'tool_calls') else None
 
@@ -130,30 +142,11 @@ class LLMProvider(LLMProviderBase):
 
                     # 处理文本内容
                     if content:
-                        # 将内容添加到缓冲区
-                        buffer += content
-
-                        # 处理缓冲区中的标签
-                        while '<think>' in buffer and '</think>' in buffer:
-                            # 找到完整的<think></think>标签并移除
-                            pre = buffer.split('<think>', 1)[0]
-                            post = buffer.split('</think>', 1)[1]
-                            buffer = pre + post
-
-                        # 处理只有开始标签的情况
-                        if '<think>' in buffer:
-                            is_active = False
-                            buffer = buffer.split('<think>', 1)[0]
-
-                        # 处理只有结束标签的情况
-                        if '</think>' in buffer:
-                            is_active = True
-                            buffer = buffer.split('</think>', 1)[1]
-
-                        # 如果当前处于活动状态且缓冲区有内容，则输出
-                        if is_active and buffer:
-                            yield buffer, None
-                            buffer = ""  # 清空缓冲区
+                        output, buffer, is_active = self._filter_think(
+                            buffer, content, is_active
+                        )
+                        if output:
+                            yield output, None
                 except Exception as e:
                     logger.bind(tag=TAG).error(f"Error processing function chunk: {e}")
                     continue
@@ -161,3 +154,60 @@ class LLMProvider(LLMProviderBase):
         except Exception as e:
             logger.bind(tag=TAG).error(f"Error in Ollama function call: {e}")
             yield f"【Ollama服务响应异常: {str(e)}】", None
+
+    async def response_stream(self, session_id, dialogue):
+        try:
+            responses = await self._async_client().chat.completions.create(
+                model=self.model_name,
+                messages=self._prepare_dialogue(dialogue),
+                stream=True
+            )
+            # 退出时关闭响应，打断时上游立即停止生成
+            async with responses:
+                is_active = True
+                buffer = ""
+                async for chunk in responses:
+                    delta = self._chunk_delta(chunk)
+                    content = delta.content if hasattr(delta, 'content') else ''
+                    if content:
+                        output, buffer, is_active = self._filter_think(
+                            buffer, content, is_active
+                        )
+                        if output:
+                            yield output
+
+        except Exception as e:
+            logger.bind(tag=TAG).error(f"Error in Ollama response generation: {e}")
+            yield "【Ollama服务响应异常】"
+
+    async def response_with_functions_stream(self, session_id, dialogue, functions=None):
+        try:
+            stream = await self._async_client().chat.completions.create(
+                model=self.model_name,
+                messages=self._prepare_dialogue(dialogue),
+                stream=True,
+                tools=functions,
+            )
+            async with stream:
+                is_active = True
+                buffer = ""
+                async for chunk in stream:
+                    delta = self._chunk_delta(chunk)
+                    content = delta.content if hasattr(delta, 'content') else None
+                    tool_calls = delta.tool_calls if hasattr(delta, 'tool_calls') else None
+
+                    # 如果是工具调用，直接传递
+                    if tool_calls:
+                        yield None, tool_calls
+                        continue
+
+                    if content:
+                        output, buffer, is_active = self._filter_think(
+                            buffer, content, is_active
+                        )
+                        if output:
+                            yield output, None
+
+        except Exception as e:
+            logger.bind(tag=TAG).error(f"Error in Ollama function call: {e}")
+            yield f"【Ollama服务响应异常: {str(e)}】", None
@@ -2,12 +2,48 @@ import openai
 from openai.types import CompletionUsage
 from config.logger import setup_logging
 from core.utils.util import check_model_key
+from core.utils.http_client import http_client
 from core.providers.llm.base import LLMProviderBase
 
 TAG = __name__
 logger = setup_logging()
 
 
+def _chunk_content(chunk):
+    try:
+        # 检查是否存在有效的choice且content不为空
+        delta = chunk.choices[0].delta if getattr(chunk, "choices", None) else None
+        # 结束的chunk和推理模型的reasoning_content chunk中content为None
+        return (delta.content or "") if hasattr(delta, "content") else ""
+    except IndexError:
+        return ""
+
+
+def _strip_think(content, is_active):
+    """去掉<think>标签中的内容，返回(可输出的内容, 是否在标签外)"""
+    if not content:
+        return "", is_active
+    # 处理标签跨多个chunk的情况
+    if "<think>" in content:
+        is_active = False
+        content = content.split("<think>")[0]
+    if "</think>" in content:
+        is_active = True
+        content = content.split("</think>")[-1]
+    return (content if is_active else ""), is_active
+
+
+def _log_usage(chunk):
+    # 存在 CompletionUsage 消息时，生成 Token 消耗 log
+    usage_info = getattr(chunk, "usage", None)
+    if isinstance(usage_info, CompletionUsage):
+        logger.bind(tag=TAG).info(
+            f"Token 消耗：输入 {getattr(usage_info, 'prompt_tokens', '未知')}，"
+            f"输出 {getattr(usage_info, 'completion_tokens', '未知')}，"
+            f"共计 {getattr(usage_info, 'total_tokens', '未知')}"
+        )
+
+
 class LLMProvider(LLMProviderBase):
     def __init__(self, config):
         self.model_name = config.get("model_name")
@@ -25,10 +61,19 @@ class LLMProvider(LLMProviderBase):
         except (ValueError, TypeError):
             max_tokens = 500
         self.max_tokens = max_tokens
+        self.http_config = config
 
         check_model_key("LLM", self.api_key)
         self.client = openai.OpenAI(api_key=self.api_key, base_url=self.base_url)
 
+    def _async_client(self):
+        """使用当前事件循环中共享的连接池，创建开销很小，每次请求单独创建"""
+        return openai.AsyncOpenAI(
+            api_key=self.api_key,
+            base_url=self.base_url,
+            http_client=http_client.get(str(self.client.base_url), self.http_config),
+        )
+
     def response(self, session_id, dialogue):
         try:
             responses = self.client.chat.completions.create(
@@ -40,26 +85,9 @@ class LLMProvider(LLMProviderBase):
 
             is_active = True
             for chunk in responses:
-                try:
-                    # 检查是否存在有效的choice且content不为空
-                    delta = (
-                        chunk.choices[0].delta
-                        if getattr(chunk, "choices", None)
-                        else None
-                    )
-                    content = delta.content if hasattr(delta, "content") else ""
-                except IndexError:
-                    content = ""
+                content, is_active = _strip_think(_chunk_content(chunk), is_active)
                 if content:
-                    # 处理标签跨多个chunk的情况
-                    if "<think>" in content:
-                        is_active = False
-                        content = content.split("<think>")[0]
-                    if "</think>" in content:
-                        is_active = True
-                        content = content.split("</think>")[-1]
-                    if is_active:
-                        yield content
+                    yield content
 
         except Exception as e:
             logger.bind(tag=TAG).error(f"Error in response generation: {e}")
@@ -74,14 +102,43 @@ class LLMProvider(LLMProviderBase):
                 # 检查是否存在有效的choice且content不为空
                 if getattr(chunk, "choices", None):
                     yield chunk.choices[0].delta.content, chunk.choices[0].delta.tool_calls
-                # 存在 CompletionUsage 消息时，生成 Token 消耗 log
-                elif isinstance(getattr(chunk, 'usage', None), CompletionUsage):
-                    usage_info = getattr(chunk, 'usage', None)
-                    logger.bind(tag=TAG).info(
-                        f"Token 消耗：输入 {getattr(usage_info, 'prompt_tokens', '未知')}，" 
-                        f"输出 {getattr(usage_info, 'completion_tokens', '未知')}，"
-                        f"共计 {getattr(usage_info, 'total_tokens', '未知')}"
-                    )
+                else:
+                    _log_usage(chunk)
+
+        except Exception as e:
+            logger.bind(tag=TAG).error(f"Error in function call streaming: {e}")
+            yield f"【OpenAI服务响应异常: {e}】", None
+
+    async def response_stream(self, session_id, dialogue):
+        try:
+            responses = await self._async_client().chat.completions.create(
+                model=self.model_name,
+                messages=dialogue,
+                stream=True,
+                max_tokens=self.max_tokens,
+            )
+            # 退出时关闭响应，打断时上游立即停止生成
+            async with responses:
+                is_active = True
+                async for chunk in responses:
+                    content, is_active = _strip_think(_chunk_content(chunk), is_active)
+                    if content:
+                        yield content
+
+        except Exception as e:
+            logger.bind(tag=TAG).error(f"Error in response generation: {e}")
+
+    async def response_with_functions_stream(self, session_id, dialogue, functions=None):
+        try:
+            stream = await self._async_client().chat.completions.create(
+                model=self.model_name, messages=dialogue, stream=True, tools=functions
+            )
+            async with stream:
+                async for chunk in stream:
+                    if getattr(chunk, "choices", None):
+                        yield chunk.choices[0].delta.content, chunk.choices[0].delta.tool_calls
+                    else:
+                        _log_usage(chunk)
 
         except Exception as e:
             logger.bind(tag=TAG).error(f"Error in function call streaming: {e}")
@@ -1,99 +1,35 @@
 import uuid
 import json
-import hmac
-import hashlib
-import base64
 import time
-import queue
 import asyncio
 import traceback
 from asyncio import Task
 import websockets
 import os
-from datetime import datetime
-from urllib import parse
 from core.providers.tts.base import TTSProviderBase
+from core.utils.runtime import runtime, WorkloadType
 from core.providers.tts.dto.dto import SentenceType, ContentType, InterfaceType
 from core.utils.tts import MarkdownCleaner
-from core.utils import opus_encoder_utils, textUtils
+from core.utils import textUtils
+from core.utils.opus_encoder_utils import opus_encoder_pool
+from core.utils.ws_pool import ws_pool
+from core.utils.token_manager import AliyunTokenMixin
 from config.logger import setup_logging
 
 TAG = __name__
 logger = setup_logging()
 
 
-class AccessToken:
-    @staticmethod
-    def _encode_text(text):
-        encoded_text = parse.quote_plus(text)
-        return encoded_text.replace("+", "%20").replace("*", "%2A").replace("%7E", "~")
-
-    @staticmethod
-    def _encode_dict(dic):
-        keys = dic.keys()
-        dic_sorted = [(key, dic[key]) for key in sorted(keys)]
-        encoded_text = parse.urlencode(dic_sorted)
-        return encoded_text.replace("+", "%20").replace("*", "%2A").replace("%7E", "~")
-
-    @staticmethod
-    def create_token(access_key_id, access_key_secret):
-        parameters = {
-            "AccessKeyId": access_key_id,
-            "Action": "CreateToken",
-            "Format": "JSON",
-            "RegionId": "cn-shanghai",  # 使用上海地域进行Token获取
-            "SignatureMethod": "HMAC-SHA1",
-            "SignatureNonce": str(uuid.uuid1()),
-            "SignatureVersion": "1.0",
-            "Timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
-            "Version": "2019-02-28",
-        }
-
-        query_string = AccessToken._encode_dict(parameters)
-        string_to_sign = (
-            "GET"
-            + "&"
-            + AccessToken._encode_text("/")
-            + "&"
-            + AccessToken._encode_text(query_string)
-        )
-
-        secreted_string = hmac.new(
-            bytes(access_key_secret + "&", encoding="utf-8"),
-            bytes(string_to_sign, encoding="utf-8"),
-            hashlib.sha1,
-        ).digest()
-        signature = base64.b64encode(secreted_string)
-        signature = AccessToken._encode_text(signature)
-
-        full_url = "http://nls-meta.cn-shanghai.aliyuncs.com/?Signature=%s&%s" % (
-            signature,
-            query_string,
-        )
-
-        import requests
-
-        response = requests.get(full_url)
-        if response.ok:
-            root_obj = response.json()
-            key = "Token"
-            if key in root_obj:
-                token = root_obj[key]["Id"]
-                expire_time = root_obj[key]["ExpireTime"]
-                return token, expire_time
-        return None, None
-
-
-class TTSProvider(TTSProviderBase):
+class TTSProvider(AliyunTokenMixin, TTSProviderBase):
     def __init__(self, config, delete_audio_file):
         super().__init__(config, delete_audio_file)
 
         # 设置为流式接口类型
         self.interface_type = InterfaceType.DUAL_STREAM
+        self.blocking_io = False
 
         # 基础配置
-        self.access_key_id = config.get("access_key_id")
-        self.access_key_secret = config.get("access_key_secret")
+        self._init_token(config)
         self.appkey = config.get("appkey")
         self.format = config.get("format", "pcm")
         self.audio_file_type = config.get("format", "pcm")
@@ -129,74 +65,45 @@ class TTSProvider(TTSProviderBase):
         self.ws = None
         self._monitor_task = None
         self.last_active_time = None
+        # 相同配置的连接可在设备间复用；服务端约10秒无任务会断开空闲连接
+        self.pool_key = (
+            "aliyun_stream",
+            self.ws_url,
+            self.appkey,
+            self.access_key_id or self.token,
+        )
+        self.pool_idle_timeout = 10
 
         # 专属tts设置
         self.message_id = ""
 
-        # 创建Opus编码器
-        self.opus_encoder = opus_encoder_utils.OpusEncoderUtils(
-            sample_rate=16000, channels=1, frame_size_ms=60
+    async def _connect(self):
+        """建立新的上游WebSocket连接"""
+        logger.bind(tag=TAG).info("开始建立新连接...")
+        ws = await websockets.connect(
+            self.ws_url,
+            additional_headers={"X-NLS-Token": await self._get_token()},
+            ping_interval=30,
+            ping_timeout=10,
+            close_timeout=10,
         )
-
-        # Token管理
-        if self.access_key_id and self.access_key_secret:
-            self._refresh_token()
-        else:
-            self.token = config.get("token")
-            self.expire_time = None
-
-    def _refresh_token(self):
-        """刷新Token并记录过期时间"""
-        if self.access_key_id and self.access_key_secret:
-            self.token, expire_time_str = AccessToken.create_token(
-                self.access_key_id, self.access_key_secret
-            )
-            if not expire_time_str:
-                raise ValueError("无法获取有效的Token过期时间")
-
-            expire_str = str(expire_time_str).strip()
-
-            try:
-                if expire_str.isdigit():
-                    expire_time = datetime.fromtimestamp(int(expire_str))
-                else:
-                    expire_time = datetime.strptime(expire_str, "%Y-%m-%dT%H:%M:%SZ")
-                self.expire_time = expire_time.timestamp() - 60
-            except Exception as e:
-                raise ValueError(f"无效的过期时间格式: {expire_str}") from e
-        else:
-            self.expire_time = None
-
-        if not self.token:
-            raise ValueError("无法获取有效的访问Token")
-
-    def _is_token_expired(self):
-        """检查Token是否过期"""
-        if not self.expire_time:
-            return False
-        return time.time() > self.expire_time
+        logger.bind(tag=TAG).info("WebSocket连接建立成功")
+        return ws
 
     async def _ensure_connection(self):
         """确保WebSocket连接可用"""
         try:
-            if self._is_token_expired():
-                logger.bind(tag=TAG).warning("Token已过期，正在自动刷新...")
-                self._refresh_token()
             current_time = time.time()
             if self.ws and current_time - self.last_active_time < 10:
                 # 10秒内才可以复用链接进行连续对话
                 logger.bind(tag=TAG).info(f"使用已有链接...")
                 return self.ws
-            logger.bind(tag=TAG).info("开始建立新连接...")
-
-            self.ws = await websockets.connect(
-                self.ws_url,
-                additional_headers={"X-NLS-Token": self.token},
-                ping_interval=30,
-                ping_timeout=10,
-                close_timeout=10,
+            if self.ws:
+                ws_pool.discard(self.ws)
+            # 优先使用连接池中已建立的连接
+            self.ws = await ws_pool.acquire(
+                self.pool_key, self._connect, self.pool_idle_timeout
             )
-            logger.bind(tag=TAG).info("WebSocket连接建立成功")
             self.last_active_time = time.time()
             return self.ws
         except Exception as e:
@@ -205,11 +112,11 @@ class TTSProvider(TTSProviderBase):
             self.last_active_time = None
             raise
 
-    def tts_text_priority_thread(self):
-        """流式文本处理线程"""
+    async def tts_text_priority_task(self):
+        """流式文本处理任务"""
         while not self.conn.stop_event.is_set():
             try:
-                message = self.tts_text_queue.get(timeout=1)
+                message = await self.tts_text_queue.get()
                 logger.bind(tag=TAG).debug(
                     f"收到TTS任务｜{message.sentence_type.name} ｜ {message.content_type.name} | 会话ID: {self.conn.sentence_id}"
                 )
@@ -218,7 +125,7 @@ class TTSProvider(TTSProviderBase):
                     self.conn.client_abort = False
 
                 if self.conn.client_abort:
-                    logger.bind(tag=TAG).info("收到打断信息，终止TTS文本处理线程")
+                    logger.bind(tag=TAG).info("收到打断信息，终止TTS文本处理任务")
                     continue
 
                 if message.sentence_type == SentenceType.FIRST:
@@ -234,11 +141,7 @@ class TTSProvider(TTSProviderBase):
                         self.message_id = str(uuid.uuid4().hex)
 
                         logger.bind(tag=TAG).info("开始启动TTS会话...")
-                        future = asyncio.run_coroutine_threadsafe(
-                            self.start_session(self.conn.sentence_id),
-                            loop=self.conn.loop,
-                        )
-                        future.result()
+                        await self.start_session(self.conn.sentence_id)
                         self.before_stop_play_files.clear()
                         logger.bind(tag=TAG).info("TTS会话启动成功")
 
@@ -252,11 +155,7 @@ class TTSProvider(TTSProviderBase):
                             logger.bind(tag=TAG).debug(
                                 f"开始发送TTS文本: {message.content_detail}"
                             )
-                            future = asyncio.run_coroutine_threadsafe(
-                                self.text_to_speak(message.content_detail, None),
-                                loop=self.conn.loop,
-                            )
-                            future.result()
+                            await self.text_to_speak(message.content_detail, None)
                             logger.bind(tag=TAG).debug("TTS文本发送成功")
                         except Exception as e:
                             logger.bind(tag=TAG).error(f"发送TTS文本失败: {str(e)}")
@@ -268,7 +167,11 @@ class TTSProvider(TTSProviderBase):
                     )
                     if message.content_file and os.path.exists(message.content_file):
                         # 先处理文件音频数据
-                        file_audio = self._process_audio_file(message.content_file)
+                        file_audio = await runtime.run(
+                            WorkloadType.AUDIO,
+                            self._process_audio_file,
+                            message.content_file,
+                        )
                         self.before_stop_play_files.append(
                             (file_audio, message.content_detail)
                         )
@@ -276,17 +179,13 @@ class TTSProvider(TTSProviderBase):
                 if message.sentence_type == SentenceType.LAST:
                     try:
                         logger.bind(tag=TAG).info("开始结束TTS会话...")
-                        future = asyncio.run_coroutine_threadsafe(
-                            self.finish_session(self.conn.sentence_id),
-                            loop=self.conn.loop,
-                        )
-                        future.result()
+                        await self.finish_session(self.conn.sentence_id)
                     except Exception as e:
                         logger.bind(tag=TAG).error(f"结束TTS会话失败: {str(e)}")
                         continue
 
-            except queue.Empty:
-                continue
+            except asyncio.CancelledError:
+                break
             except Exception as e:
                 logger.bind(tag=TAG).error(
                     f"处理TTS文本失败: {str(e)}, 类型: {type(e).__name__}, 堆栈: {traceback.format_exc()}"
@@ -394,6 +293,12 @@ class TTSProvider(TTSProviderBase):
                         )
                     finally:
                         self._monitor_task = None
+
+                # 会话正常结束后连接仍可用，归还连接池供下一次会话使用
+                if self.ws:
+                    ws_pool.release(self.pool_key, self.ws, self.pool_idle_timeout)
+                    self.ws = None
+                    self.last_active_time = None
         except Exception as e:
             logger.bind(tag=TAG).error(f"关闭会话失败: {str(e)}")
             # 确保清理资源
@@ -425,6 +330,8 @@ class TTSProvider(TTSProviderBase):
         opus_datas_cache = []
         is_first_sentence = True
         first_sentence_segment_count = 0  # 添加计数器
+        # 每个会话从编码器池取一个编码器，会话结束后放回
+        opus_encoder = opus_encoder_pool.acquire()
         try:
             session_finished = False  # 标记会话是否正常结束
             while not self.conn.stop_event.is_set():
@@ -477,7 +384,7 @@ class TTSProvider(TTSProviderBase):
                     # 二进制消息（音频数据）
                     elif isinstance(msg, (bytes, bytearray)):
                         logger.bind(tag=TAG).debug(f"推送数据到队列里面～～")
-                        opus_datas = self.opus_encoder.encode_pcm_to_opus(msg, False)
+                        opus_datas = opus_encoder.encode_pcm_to_opus(msg, False)
                         logger.bind(tag=TAG).debug(
                             f"推送数据到队列里面帧数～～{len(opus_datas)}"
                         )
@@ -510,6 +417,7 @@ class TTSProvider(TTSProviderBase):
                 self.ws = None
         # 监听任务退出时清理引用
         finally:
+            opus_encoder_pool.release(opus_encoder)
             self._monitor_task = None
 
     def to_tts(self, text: str) -> list:
@@ -525,14 +433,10 @@ class TTSProvider(TTSProviderBase):
             audio_data = []
 
             async def _generate_audio():
-                # 刷新Token（如果需要）
-                if self._is_token_expired():
-                    self._refresh_token()
-
                 # 建立WebSocket连接
                 ws = await websockets.connect(
                     self.ws_url,
-                    additional_headers={"X-NLS-Token": self.token},
+                    additional_headers={"X-NLS-Token": await self._get_token()},
                     ping_interval=30,
                     ping_timeout=10,
                     close_timeout=10,
@@ -616,7 +520,7 @@ class TTSProvider(TTSProviderBase):
                         msg = await ws.recv()
                         if isinstance(msg, (bytes, bytearray)):
                             # 编码为Opus并收集
-                            opus_frames = self.opus_encoder.encode_pcm_to_opus(
+                            opus_frames = opus_encoder.encode_pcm_to_opus(
                                 msg, False
                             )
                             audio_data.extend(opus_frames)
@@ -644,7 +548,8 @@ class TTSProvider(TTSProviderBase):
                     except:
                         pass
 
-            loop.run_until_complete(_generate_audio())
+            with opus_encoder_pool.encoder() as opus_encoder:
+                loop.run_until_complete(_generate_audio())
             loop.close()
 
             return audio_data
@@ -1,22 +1,45 @@
+import os
+import re
+import json
+import uuid
 import asyncio
+import traceback
+from datetime import datetime
 from config.logger import setup_logging
-import os
 from abc import ABC, abstractmethod
+from core.utils import p3, textUtils
 from core.utils.tts import MarkdownCleaner
 from core.utils.util import audio_to_data
+from core.utils.audio_decoder import AudioStreamDecoder, decode_audio_bytes
+from core.utils.audio_stream import AudioFileStream
+from core.utils.output_counter import add_device_output
+from core.utils.runtime import runtime, LoopQueue, WorkloadType
+from core.utils.sentence_segmenter import SentenceSegmenter
+from core.utils.cache.tts_phrase import tts_phrase_cache
+from core.handle.reportHandle import enqueue_tts_report
+from core.handle.sendAudioHandle import sendAudioMessage
+from core.providers.tts.dto.dto import (
+    TTSMessageDTO,
+    SentenceType,
+    ContentType,
+    InterfaceType,
+)
 
 TAG = __name__
 logger = setup_logging()
 
 
 class TTSProviderBase(ABC):
+    # 使用共享异步HTTP客户端（core.utils.http_client）合成的子类置为True
+    uses_http_client = False
+
     def __init__(self, config, delete_audio_file):
         self.delete_audio_file = delete_audio_file
         self.output_file = config.get("output_dir")
 
-        self.tts_text_buff = []
         self.punctuations = (
             "。",
+            ".",
             "？",
             "?",
             "！",
@@ -40,10 +63,135 @@ class TTSProviderBase(ABC):
             "；",
             ";",
             "：",
+            ".",
+        )
+        # LLM输出的增量文本在这里切分为合成分段
+        self.segmenter = SentenceSegmenter(
+            self.punctuations, self.first_sentence_punctuations
+        )
+        self.tts_audio_first_sentence = True
+        self.interface_type = InterfaceType.NON_STREAM
+        # text_to_speak 内部使用阻塞SDK（如requests）时为True，合成会放到网络线程池执行；
+        # 完全异步实现的子类可置为False，直接在事件循环中等待
+        self.blocking_io = not self.uses_http_client
+        # 共享HTTP客户端按配置中的超时等参数创建
+        self.http_config = config if self.uses_http_client else None
+        # text_to_speak 不传输出文件时返回的音频格式，作为内存解码的格式提示
+        self.audio_file_type = "wav"
+
+        self.conn = None
+        self.tts_timeout = 10
+        # 流水线队列在打开语音合成通道时绑定到连接的事件循环
+        self.tts_text_queue = None
+        self.tts_audio_queue = None
+        self._tts_synthesis_queue = None
+        self._tts_encode_queue = None
+        self._pipeline_tasks = []
+        # 非流式合成时同时进行合成的分段数，结果仍按文本顺序播放
+        self.synthesis_window = 3
+        self._synthesis_slots = None
+        self._synthesis_jobs = set()
+        # 配置中影响合成结果的参数（接口地址、参考音频、自定义请求参数等），作为缓存键的一部分
+        self._config_identity = self._config_cache_identity(config)
+
+    # 不参与缓存键计算的配置项（密钥等），按名称中包含的关键字过滤，更换密钥不影响缓存
+    CACHE_IGNORED_CONFIG_KEYWORDS = (
+        "key",
+        "token",
+        "secret",
+        "password",
+        "authorization",
+        "output_dir",
+    )
+
+    # 参与缓存键计算的音色相关属性，影响合成结果的参数都应在此列出
+    CACHE_IDENTITY_ATTRS = (
+        "voice",
+        "voice_id",
+        "spk_id",
+        "speaker",
+        "voice_type",
+        "reference_id",
+        "model",
+        "speed",
+        "speed_ratio",
+        "speech_rate",
+        "speed_factor",
+        "pitch",
+        "pitch_ratio",
+        "pitch_rate",
+        "pitch_factor",
+        "volume",
+        "emotion",
+        "format",
+        "sample_rate",
+        "audio_file_type",
+        "voice_setting",
+        "timber_weights",
+    )
+
+    @classmethod
+    def _filter_cache_config(cls, value):
+        """去掉配置中的密钥项，嵌套的字典（如自定义请求参数、请求头）同样过滤"""
+        if isinstance(value, dict):
+            return {
+                k: cls._filter_cache_config(v)
+                for k, v in value.items()
+                if not any(
+                    word in str(k).lower() for word in cls.CACHE_IGNORED_CONFIG_KEYWORDS
+                )
+            }
+        if isinstance(value, (list, tuple)):
+            return [cls._filter_cache_config(v) for v in value]
+        return value
+
+    @classmethod
+    def _config_cache_identity(cls, config):
+        return json.dumps(
+            cls._filter_cache_config(dict(config)),
+            sort_keys=True,
+            ensure_ascii=False,
+            default=str,
+        )
+
+    def cache_identity(self):
+        """返回影响合成结果的音色参数和配置，作为短句缓存键的一部分，子类可按需重写
+
+        同一Provider的不同配置（如不同的参考音频或接口地址）不会共用缓存
+        """
+        return repr(
+            [
+                (name, getattr(self, name))
+                for name in self.CACHE_IDENTITY_ATTRS
+                if getattr(self, name, None) is not None
+            ]
+            + [("config", self._config_identity)]
+        )
+
+    def get_cache_key(self, text, audio_format):
+        """计算短句缓存键，文本过长或缓存未开启时返回None"""
+        return tts_phrase_cache.make_key(
+            type(self).__module__,
+            self.cache_identity(),
+            MarkdownCleaner.clean_markdown(text),
+            audio_format,
         )
-        self.tts_stop_request = False
-        self.processed_chars = 0
-        self.is_first_sentence = True
+
+    def get_cached_audio(self, text, audio_format):
+        """查询短句缓存，未命中返回None"""
+        cache_key = self.get_cache_key(text, audio_format)
+        if not cache_key:
+            return None
+        cached = tts_phrase_cache.get(cache_key)
+        return list(cached) if cached is not None else None
+
+    def cache_audio(self, text, audio_format, audio_datas):
+        """写入短句缓存，只有Opus音频落盘"""
+        cache_key = self.get_cache_key(text, audio_format)
+        if cache_key:
+            tts_phrase_cache.put(
+                cache_key, audio_datas, persist=audio_format != "pcm"
+            )
 
     def generate_filename(self, extension=".wav"):
         return os.path.join(
@@ -52,13 +200,28 @@ class TTSProviderBase(ABC):
         )
 
     def to_tts(self, text):
+        """同步生成语音文件，供线程池中的调用方使用"""
+        return runtime.run_sync(self.to_tts_async, text, offload=False)
+
+    async def to_tts_async(self, text, offload=True):
+        """生成语音文件
+
+        Args:
+            text: 要合成的文本
+            offload: text_to_speak 有阻塞调用时是否放到网络线程池执行
+        """
         tmp_file = self.generate_filename()
         try:
             max_repeat_time = 5
             text = MarkdownCleaner.clean_markdown(text)
             while not os.path.exists(tmp_file) and max_repeat_time > 0:
                 try:
-                    asyncio.run(self.text_to_speak(text, tmp_file))
+                    if offload and self.blocking_io:
+                        await runtime.run_coroutine(
+                            WorkloadType.NETWORK, self.text_to_speak, text, tmp_file
+                        )
+                    else:
+                        await self.text_to_speak(text, tmp_file)
                 except Exception as e:
                     logger.bind(tag=TAG).warning(
                         f"语音生成失败{5 - max_repeat_time + 1}次: {text}，错误: {e}"
@@ -82,6 +245,34 @@ class TTSProviderBase(ABC):
             logger.bind(tag=TAG).error(f"Failed to generate TTS file: {e}")
             return None
 
+    async def text_to_audio_async(self, text):
+        """合成语音并直接返回音频数据，不写临时文件
+
+        Returns:
+            bytes或异步字节流（由 text_to_speak 在不传输出文件时返回），失败时为None
+        """
+        text = MarkdownCleaner.clean_markdown(text)
+        max_repeat_time = 5
+        for attempt in range(1, max_repeat_time + 1):
+            try:
+                if self.blocking_io:
+                    audio = await runtime.run_coroutine(
+                        WorkloadType.NETWORK, self.text_to_speak, text, None
+                    )
+                else:
+                    audio = await self.text_to_speak(text, None)
+                if audio:
+                    return audio
+                logger.bind(tag=TAG).warning(
+                    f"语音生成失败{attempt}次: {text}，未返回音频数据"
+                )
+            except Exception as e:
+                logger.bind(tag=TAG).warning(
+                    f"语音生成失败{attempt}次: {text}，错误: {e}"
+                )
+        logger.bind(tag=TAG).error(f"语音生成失败: {text}，请检查网络或服务是否正常")
+        return None
+
     @abstractmethod
     async def text_to_speak(self, text, output_file):
         pass
@@ -92,7 +283,7 @@ class TTSProviderBase(ABC):
 
     def audio_to_opus_data(self, audio_file_path):
         """音频文件转换为Opus编码"""
-        return audio_to_data(audio_file_path, is_opus=True)
+        return audio_to_data(audio_file_path, is_opus=True, speech=True)
 
     def tts_one_sentence(
         self,
@@ -123,101 +314,226 @@ class TTSProviderBase(ABC):
             )
 
     async def open_audio_channels(self, conn):
-        self.conn = conn
-        self.tts_timeout = conn.config.get("tts_timeout", 10)
-        # tts 消化线程
-        self.tts_priority_thread = threading.Thread(
-            target=self.tts_text_priority_thread, daemon=True
-        )
-        self.tts_priority_thread.start()
+        """启动语音合成流水线
 
-        # 音频播放 消化线程
-        self.audio_play_priority_thread = threading.Thread(
-            target=self._audio_play_priority_thread, daemon=True
-        )
-        self.audio_play_priority_thread.start()
+        文本分段 -> 语音合成 -> 音频编码 -> 发送，各阶段是事件循环中的asyncio任务，
+        通过队列衔接；阻塞的合成与编码显式放到共享线程池执行
+        """
+        self.conn = conn
+        self.tts_timeout = int(conn.config.get("tts_timeout", 10))
+        self.tts_text_queue = LoopQueue(conn.loop)
+        self.tts_audio_queue = LoopQueue(conn.loop)
+        self._tts_synthesis_queue = asyncio.Queue()
+        self._tts_encode_queue = asyncio.Queue()
+        window = conn.config.get("tts_synthesis_window", "3")
+        self.synthesis_window = max(1, int(window) if window else 3)
+        self._synthesis_slots = asyncio.Semaphore(self.synthesis_window)
+        self._pipeline_tasks = [
+            conn.loop.create_task(self.tts_text_priority_task()),
+            conn.loop.create_task(self._tts_synthesis_task()),
+            conn.loop.create_task(self._tts_encode_task()),
+            conn.loop.create_task(self._audio_play_priority_task()),
+        ]
+
+    async def close_audio_channels(self):
+        """停止语音合成流水线"""
+        self.cancel_synthesis()
+        for task in self._pipeline_tasks:
+            if not task.done():
+                task.cancel()
+        self._pipeline_tasks = []
+
+    def cancel_synthesis(self):
+        """打断时丢弃排队的分段并取消正在进行的合成"""
+        for pending in (self._tts_synthesis_queue, self._tts_encode_queue):
+            while pending is not None and not pending.empty():
+                item = pending.get_nowait()
+                if isinstance(item, asyncio.Future):
+                    item.cancel()
+                elif isinstance(item[1], AudioFileStream):
+                    item[1].close()
+        for job in list(self._synthesis_jobs):
+            job.cancel()
 
     # 这里默认是非流式的处理方式
     # 流式处理方式请在子类中重写
-    def tts_text_priority_thread(self):
+    async def tts_text_priority_task(self):
+        """文本分段阶段：按标点切分文本，交给合成阶段"""
         while not self.conn.stop_event.is_set():
             try:
-                message = self.tts_text_queue.get(timeout=1)
+                message = await self.tts_text_queue.get()
                 if message.sentence_type == SentenceType.FIRST:
                     self.conn.client_abort = False
                 if self.conn.client_abort:
-                    logger.bind(tag=TAG).info("收到打断信息，终止TTS文本处理线程")
+                    logger.bind(tag=TAG).info("收到打断信息，终止TTS文本处理任务")
                     continue
                 if message.sentence_type == SentenceType.FIRST:
                     # 初始化参数
-                    self.tts_stop_request = False
-                    self.processed_chars = 0
-                    self.tts_text_buff = []
-                    self.is_first_sentence = True
+                    self.segmenter.reset()
                     self.tts_audio_first_sentence = True
                 elif ContentType.TEXT == message.content_type:
-                    self.tts_text_buff.append(message.content_detail)
-                    segment_text = self._get_segment_text()
-                    if segment_text:
-                        if self.delete_audio_file:
-                            audio_datas = self.to_tts(segment_text)
-                            if audio_datas:
-                                self.tts_audio_queue.put(
-                                    (message.sentence_type, audio_datas, segment_text)
-                                )
-                        else:
-                            tts_file = self.to_tts(segment_text)
-                            if tts_file:
-                                audio_datas = self._process_audio_file(tts_file)
-                                self.tts_audio_queue.put(
-                                    (message.sentence_type, audio_datas, segment_text)
-                                )
+                    for segment_text in self._split_segments(message.content_detail):
+                        await self._tts_synthesis_queue.put(
+                            (message.sentence_type, segment_text, None)
+                        )
                 elif ContentType.FILE == message.content_type:
-                    self._process_remaining_text()
+                    await self._process_remaining_text()
                     tts_file = message.content_file
                     if tts_file and os.path.exists(tts_file):
-                        audio_datas = self._process_audio_file(tts_file)
-                        self.tts_audio_queue.put(
-                            (message.sentence_type, audio_datas, message.content_detail)
+                        await self._tts_synthesis_queue.put(
+                            (message.sentence_type, message.content_detail, tts_file)
                         )
 
                 if message.sentence_type == SentenceType.LAST:
-                    self._process_remaining_text()
-                    self.tts_audio_queue.put(
-                        (message.sentence_type, [], message.content_detail)
+                    await self._process_remaining_text()
+                    await self._tts_synthesis_queue.put(
+                        (message.sentence_type, message.content_detail, None)
                     )
 
-            except queue.Empty:
-                continue
+            except asyncio.CancelledError:
+                break
             except Exception as e:
                 logger.bind(tag=TAG).error(
                     f"处理TTS文本失败: {str(e)}, 类型: {type(e).__name__}, 堆栈: {traceback.format_exc()}"
                 )
                 continue
 
-    def _audio_play_priority_thread(self):
+    async def _tts_synthesis_task(self):
+        """语音合成阶段：文本合成为音频数据，已有的音频文件直接透传
+
+        最多同时合成 synthesis_window 个分段，合成任务按文本顺序进入编码队列，
+        前一句还在播放时后面的分段已经在合成
+        """
         while not self.conn.stop_event.is_set():
-            text = None
             try:
-                try:
-                    sentence_type, audio_datas, text = self.tts_audio_queue.get(
-                        timeout=1
+                sentence_type, text, audio = await self._tts_synthesis_queue.get()
+                if self.conn.client_abort:
+                    continue
+                if audio is None and text and sentence_type != SentenceType.LAST:
+                    # 窗口已满时等待前面的分段合成完成
+                    await self._synthesis_slots.acquire()
+                    if self.conn.client_abort:
+                        self._synthesis_slots.release()
+                        continue
+                    job = asyncio.ensure_future(
+                        self._synthesize_segment(sentence_type, text)
                     )
-                except queue.Empty:
-                    if self.conn.stop_event.is_set():
-                        break
+                    self._synthesis_jobs.add(job)
+                    job.add_done_callback(self._on_synthesis_done)
+                    await self._tts_encode_queue.put(job)
                     continue
-                future = asyncio.run_coroutine_threadsafe(
-                    sendAudioMessage(self.conn, sentence_type, audio_datas, text),
-                    self.conn.loop,
+                if isinstance(audio, str):
+                    # 音乐等现成的音频文件在播放时按批解码，不整体载入内存
+                    audio = AudioFileStream(
+                        audio, is_opus=self.conn.audio_format != "pcm"
+                    )
+                await self._tts_encode_queue.put((sentence_type, audio, text, None))
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.bind(tag=TAG).error(f"TTS合成任务处理错误: {e}")
+
+    async def _synthesize_segment(self, sentence_type, text):
+        """合成一个分段，返回编码阶段的输入，失败时返回None"""
+        try:
+            # 常用短句先查缓存，命中时直接使用已编码的音频
+            cached = await runtime.run(
+                WorkloadType.AUDIO,
+                self.get_cached_audio,
+                text,
+                self.conn.audio_format,
+            )
+            if cached is not None:
+                return sentence_type, cached, text, None
+            if self.delete_audio_file:
+                # 音频数据留在内存中，不写临时文件
+                audio = await self.text_to_audio_async(text)
+            else:
+                # 需要保留音频文件时仍写到output_dir
+                audio = await self.to_tts_async(text)
+            if audio is None:
+                return None
+            return sentence_type, audio, text, text
+        except Exception as e:
+            logger.bind(tag=TAG).error(f"TTS分段合成失败: {text} {e}")
+            return None
+
+    def _on_synthesis_done(self, job):
+        self._synthesis_jobs.discard(job)
+        self._synthesis_slots.release()
+
+    async def _tts_encode_task(self):
+        """音频编码阶段：音频编码为设备需要的格式后进入播放队列"""
+        while not self.conn.stop_event.is_set():
+            try:
+                item = await self._tts_encode_queue.get()
+                if isinstance(item, asyncio.Future):
+                    # 按文本顺序等待合成结果，后面的分段可能已经提前完成
+                    if self.conn.client_abort:
+                        item.cancel()
+                        continue
+                    await asyncio.wait((item,))
+                    if item.cancelled() or item.result() is None:
+                        continue
+                    item = item.result()
+                sentence_type, audio, text, cache_text = item
+                if self.conn.client_abort:
+                    if isinstance(audio, AudioFileStream):
+                        audio.close()
+                    continue
+                if isinstance(audio, AudioFileStream):
+                    # 文件源直接交给发送阶段，由发送节奏拉动解码
+                    self.tts_audio_queue.put((sentence_type, audio, text))
+                    continue
+                if hasattr(audio, "__aiter__"):
+                    await self._process_audio_stream(
+                        sentence_type, audio, text, cache_text
+                    )
+                    continue
+                audio_datas = []
+                if isinstance(audio, list):
+                    # 缓存命中的音频已经编码完成
+                    audio_datas = audio
+                elif isinstance(audio, str):
+                    audio_datas = await runtime.run(
+                        WorkloadType.AUDIO, self._process_audio_file, audio
+                    )
+                elif audio:
+                    audio_datas = await runtime.run(
+                        WorkloadType.AUDIO, self._process_audio_bytes, audio
+                    )
+                if cache_text and audio_datas:
+                    await runtime.run(
+                        WorkloadType.AUDIO,
+                        self.cache_audio,
+                        cache_text,
+                        self.conn.audio_format,
+                        audio_datas,
+                    )
+                self.tts_audio_queue.put((sentence_type, audio_datas, text))
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.bind(tag=TAG).error(f"TTS编码任务处理错误: {e}")
+
+    async def _audio_play_priority_task(self):
+        """发送阶段：按顺序把音频发送给设备"""
+        while not self.conn.stop_event.is_set():
+            text = None
+            try:
+                sentence_type, audio_datas, text = await self.tts_audio_queue.get()
+                await sendAudioMessage(
+                    self.conn, audio_datas, text, sentence_type=sentence_type
                 )
-                future.result()
                 if self.conn.max_output_size > 0 and text:
                     add_device_output(self.conn.headers.get("device-id"), len(text))
-                enqueue_tts_report(self.conn, text, audio_datas)
+                if not isinstance(audio_datas, AudioFileStream):
+                    enqueue_tts_report(self.conn, text, audio_datas)
+            except asyncio.CancelledError:
+                break
             except Exception as e:
                 logger.bind(tag=TAG).error(
-                    f"audio_play_priority priority_thread: {text} {e}"
+                    f"audio_play_priority priority_task: {text} {e}"
                 )
 
     async def start_session(self, session_id):
@@ -231,44 +547,73 @@ class TTSProviderBase(ABC):
         if hasattr(self, "ws") and self.ws:
             await self.ws.close()
 
-    def _get_segment_text(self):
-        # 合并当前全部文本并处理未分割部分
-        full_text = "".join(self.tts_text_buff)
-        current_text = full_text[self.processed_chars :]  # 从未处理的位置开始
-        last_punct_pos = -1
-
-        # 根据是否是第一句话选择不同的标点符号集合
-        punctuations_to_use = (
-            self.first_sentence_punctuations
-            if self.is_first_sentence
-            else self.punctuations
-        )
+    def create_text_segmenter(self):
+        """为大模型的流式输出创建分段器，调用方按分段而不是按token投递文本
 
-        for punct in punctuations_to_use:
-            pos = current_text.rfind(punct)
-            if (pos != -1 and last_punct_pos == -1) or (
-                pos != -1 and pos < last_punct_pos
-            ):
-                last_punct_pos = pos
+        双流式TTS需要逐token发送给上游，返回None表示不需要分段
+        """
+        if self.interface_type == InterfaceType.DUAL_STREAM:
+            return None
+        return SentenceSegmenter(self.punctuations, self.first_sentence_punctuations)
 
-        if last_punct_pos != -1:
-            segment_text_raw = current_text[: last_punct_pos + 1]
+    def _split_segments(self, text):
+        """送入增量文本，返回新完成的、已去除首尾标点的分段"""
+        segments = []
+        for segment_text_raw in self.segmenter.feed(text):
             segment_text = textUtils.get_string_no_punctuation_or_emoji(
                 segment_text_raw
             )
-            self.processed_chars += len(segment_text_raw)  # 更新已处理字符位置
-
-            # 如果是第一句话，在找到第一个逗号后，将标志设置为False
-            if self.is_first_sentence:
-                self.is_first_sentence = False
+            if segment_text:
+                segments.append(segment_text)
+        return segments
+
+    def _take_remaining_text(self):
+        """取出分段器中剩余的文本，已去除首尾标点"""
+        return textUtils.get_string_no_punctuation_or_emoji(self.segmenter.flush())
+
+    def _process_audio_bytes(self, audio_bytes):
+        """在内存中把合成的音频数据转换为指定格式"""
+        audio_datas, _ = decode_audio_bytes(
+            audio_bytes,
+            self.audio_file_type,
+            is_opus=self.conn.audio_format != "pcm",
+        )
+        return audio_datas
 
-            return segment_text
-        elif self.tts_stop_request and current_text:
-            segment_text = current_text
-            self.is_first_sentence = True  # 重置标志
-            return segment_text
-        else:
-            return None
+    async def _process_audio_stream(
+        self, sentence_type, audio_stream, text, cache_text=None
+    ):
+        """边接收边解码异步字节流，凑满的帧立即进入播放队列"""
+        decoder = AudioStreamDecoder(
+            self.audio_file_type, is_opus=self.conn.audio_format != "pcm"
+        )
+        all_audio_datas = []
+        try:
+            async for chunk in audio_stream:
+                if self.conn.client_abort:
+                    return
+                audio_datas = await runtime.run(
+                    WorkloadType.AUDIO, decoder.feed, chunk
+                )
+                if audio_datas:
+                    all_audio_datas.extend(audio_datas)
+                    # 只在第一批音频中携带文本，作为这一句的开始
+                    self.tts_audio_queue.put((sentence_type, audio_datas, text))
+                    text = None
+            audio_datas = await runtime.run(WorkloadType.AUDIO, decoder.flush)
+        finally:
+            decoder.close()
+        all_audio_datas.extend(audio_datas)
+        if cache_text and all_audio_datas:
+            await runtime.run(
+                WorkloadType.AUDIO,
+                self.cache_audio,
+                cache_text,
+                self.conn.audio_format,
+                all_audio_datas,
+            )
+        if audio_datas or text:
+            self.tts_audio_queue.put((sentence_type, audio_datas, text))
 
     def _process_audio_file(self, tts_file):
         """处理音频文件并转换为指定格式
@@ -302,29 +647,14 @@ class TTSProviderBase(ABC):
         self.before_stop_play_files.clear()
         self.tts_audio_queue.put((SentenceType.LAST, [], None))
 
-    def _process_remaining_text(self):
-        """处理剩余的文本并生成语音
+    async def _process_remaining_text(self):
+        """把剩余的文本交给合成阶段
 
         Returns:
-            bool: 是否成功处理了文本
+            bool: 是否有剩余文本需要合成
         """
-        full_text = "".join(self.tts_text_buff)
-        remaining_text = full_text[self.processed_chars :]
-        if remaining_text:
-            segment_text = textUtils.get_string_no_punctuation_or_emoji(remaining_text)
-            if segment_text:
-                if self.delete_audio_file:
-                    audio_datas = self.to_tts(segment_text)
-                    if audio_datas:
-                        self.tts_audio_queue.put(
-                            (SentenceType.MIDDLE, audio_datas, segment_text)
-                        )
-                else:
-                    tts_file = self.to_tts(segment_text)
-                    audio_datas = self._process_audio_file(tts_file)
-                    self.tts_audio_queue.put(
-                        (SentenceType.MIDDLE, audio_datas, segment_text)
-                    )
-                self.processed_chars += len(full_text)
-                return True
+        segment_text = self._take_remaining_text()
+        if segment_text:
+            await self._tts_synthesis_queue.put((SentenceType.MIDDLE, segment_text, None))
+            return True
         return False
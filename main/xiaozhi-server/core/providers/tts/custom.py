@@ -1,20 +1,23 @@
 import os
 import uuid
-import requests
 from config.logger import setup_logging
 from datetime import datetime
 from core.providers.tts.base import TTSProviderBase
+from core.utils.http_client import http_client
 
 TAG = __name__
 logger = setup_logging()
 
 class TTSProvider(TTSProviderBase):
+    uses_http_client = True
+
     def __init__(self, config, delete_audio_file):
         super().__init__(config, delete_audio_file)
         self.url = config.get("url")
         self.headers = config.get("headers", {})
         self.params = config.get("params")
         self.format = config.get("format", "wav")
+        self.audio_file_type = self.format
         self.output_file = config.get("output_dir", "tmp/")
 
     def generate_filename(self):
@@ -27,8 +30,11 @@ class TTSProvider(TTSProviderBase):
                 v = v.replace("{prompt_text}", text)
             request_params[k] = v
 
-        resp = requests.get(self.url, params=request_params, headers=self.headers)
+        client = http_client.get(self.url, self.http_config)
+        resp = await client.get(self.url, params=request_params, headers=self.headers)
         if resp.status_code == 200:
+            if not output_file:
+                return resp.content
             with open(output_file, "wb") as file:
                 file.write(resp.content)
         else:
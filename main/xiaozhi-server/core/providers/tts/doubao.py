@@ -2,9 +2,9 @@ import os
 import uuid
 import json
 import base64
-import requests
 from datetime import datetime
 from core.utils.util import check_model_key
+from core.utils.http_client import http_client
 from core.providers.tts.base import TTSProviderBase
 from config.logger import setup_logging
 
@@ -13,6 +13,8 @@ logger = setup_logging()
 
 
 class TTSProvider(TTSProviderBase):
+    uses_http_client = True
+
     def __init__(self, config, delete_audio_file):
         super().__init__(config, delete_audio_file)
         if config.get("appid"):
@@ -73,13 +75,18 @@ class TTSProvider(TTSProviderBase):
         }
 
         try:
-            resp = requests.post(
-                self.api_url, json.dumps(request_json), headers=self.header
+            client = http_client.get(self.api_url, self.http_config)
+            resp = await client.post(
+                self.api_url, content=json.dumps(request_json), headers=self.header
             )
-            if "data" in resp.json():
-                data = resp.json()["data"]
-                file_to_save = open(output_file, "wb")
-                file_to_save.write(base64.b64decode(data))
+            resp_json = resp.json()
+            if "data" in resp_json:
+                data = resp_json["data"]
+                audio_bytes = base64.b64decode(data)
+                if not output_file:
+                    return audio_bytes
+                with open(output_file, "wb") as file_to_save:
+                    file_to_save.write(audio_bytes)
             else:
                 raise Exception(
                     f"{__name__} status_code: {resp.status_code} response: {resp.content}"
@@ -8,6 +8,9 @@ from core.providers.tts.base import TTSProviderBase
 class TTSProvider(TTSProviderBase):
     def __init__(self, config, delete_audio_file):
         super().__init__(config, delete_audio_file)
+        # 合成使用异步接口，直接在事件循环中执行
+        self.blocking_io = False
+        self.audio_file_type = "mp3"
         if config.get("private_voice"):
             self.voice = config.get("private_voice")
         else:
@@ -22,6 +25,9 @@ class TTSProvider(TTSProviderBase):
     async def text_to_speak(self, text, output_file):
         try:
             communicate = edge_tts.Communicate(text, voice=self.voice)
+            if not output_file:
+                # 不写文件时返回异步音频流，由调用方边接收边解码
+                return self._audio_stream(communicate)
             # 确保目录存在并创建空文件
             os.makedirs(os.path.dirname(output_file), exist_ok=True)
             with open(output_file, "wb") as f:
@@ -34,4 +40,9 @@ class TTSProvider(TTSProviderBase):
                         f.write(chunk["data"])
         except Exception as e:
             error_msg = f"Edge TTS请求失败: {e}"
-            raise Exception(error_msg)  # 抛出异常，让调用方捕获
\ No newline at end of file
+            raise Exception(error_msg)  # 抛出异常，让调用方捕获
+
+    async def _audio_stream(self, communicate):
+        async for chunk in communicate.stream():
+            if chunk["type"] == "audio":  # 只处理音频数据块
+                yield chunk["data"]
\ No newline at end of file
@@ -1,7 +1,6 @@
 import base64
 import os
 import uuid
-import requests
 import ormsgpack
 from pathlib import Path
 from pydantic import BaseModel, Field, conint, model_validator
@@ -10,6 +9,7 @@ from datetime import datetime
 from typing import Literal
 from core.utils.util import check_model_key, parse_string_to_list
 from core.providers.tts.base import TTSProviderBase
+from core.utils.http_client import http_client
 from config.logger import setup_logging
 
 TAG = __name__
@@ -81,6 +81,7 @@ def read_ref_text(ref_text):
 
 
 class TTSProvider(TTSProviderBase):
+    uses_http_client = True
 
     def __init__(self, config, delete_audio_file):
         super().__init__(config, delete_audio_file)
@@ -90,7 +91,16 @@ class TTSProvider(TTSProviderBase):
         )
         self.reference_audio = parse_string_to_list(config.get("reference_audio"))
         self.reference_text = parse_string_to_list(config.get("reference_text"))
+        # 参考音频和文本启动时读取一次，合成时不再访问磁盘
+        self.references = [
+            ServeReferenceAudio(audio=audio if audio else b"", text=text)
+            for text, audio in zip(
+                [read_ref_text(ref_text) for ref_text in self.reference_text],
+                [audio_to_bytes(ref_audio) for ref_audio in self.reference_audio],
+            )
+        ]
         self.format = config.get("response_format", "wav")
+        self.audio_file_type = self.format
 
         self.api_key = config.get("api_key", "YOUR_API_KEY")
         have_key = check_model_key("FishSpeech TTS", self.api_key)
@@ -140,16 +150,9 @@ class TTSProvider(TTSProviderBase):
         )
 
     async def text_to_speak(self, text, output_file):
-        # Prepare reference data
-        byte_audios = [audio_to_bytes(ref_audio) for ref_audio in self.reference_audio]
-        ref_texts = [read_ref_text(ref_text) for ref_text in self.reference_text]
-
         data = {
             "text": text,
-            "references": [
-                ServeReferenceAudio(audio=audio if audio else b"", text=text)
-                for text, audio in zip(ref_texts, byte_audios)
-            ],
+            "references": self.references,
             "reference_id": self.reference_id,
             "normalize": self.normalize,
             "format": self.format,
@@ -165,9 +168,10 @@ class TTSProvider(TTSProviderBase):
 
         pydantic_data = ServeTTSRequest(**data)
 
-        response = requests.post(
+        client = http_client.get(self.api_url, self.http_config)
+        response = await client.post(
             self.api_url,
-            data=ormsgpack.packb(
+            content=ormsgpack.packb(
                 pydantic_data, option=ormsgpack.OPT_SERIALIZE_PYDANTIC
             ),
             headers={
@@ -178,6 +182,8 @@ class TTSProvider(TTSProviderBase):
 
         if response.status_code == 200:
             audio_content = response.content
+            if not output_file:
+                return audio_content
 
             with open(output_file, "wb") as audio_file:
                 audio_file.write(audio_content)
@@ -1,9 +1,9 @@
 import os
 import uuid
-import requests
 from config.logger import setup_logging
 from datetime import datetime
 from core.providers.tts.base import TTSProviderBase
+from core.utils.http_client import http_client
 from core.utils.util import parse_string_to_list
 
 TAG = __name__
@@ -11,6 +11,8 @@ logger = setup_logging()
 
 
 class TTSProvider(TTSProviderBase):
+    uses_http_client = True
+
     def __init__(self, config, delete_audio_file):
         super().__init__(config, delete_audio_file)
         self.url = config.get("url")
@@ -59,8 +61,11 @@ class TTSProvider(TTSProviderBase):
             "if_sr": self.if_sr,
         }
 
-        resp = requests.get(self.url, params=request_params)
+        client = http_client.get(self.url, self.http_config)
+        resp = await client.get(self.url, params=request_params)
         if resp.status_code == 200:
+            if not output_file:
+                return resp.content
             with open(output_file, "wb") as file:
                 file.write(resp.content)
         else:
@@ -1,15 +1,16 @@
 import os
 import uuid
 import json
-import queue
 import asyncio
 import traceback
 import websockets
 from core.utils.tts import MarkdownCleaner
 from config.logger import setup_logging
-from core.utils import opus_encoder_utils
+from core.utils.opus_encoder_utils import opus_encoder_pool
 from core.utils.util import check_model_key
 from core.providers.tts.base import TTSProviderBase
+from core.utils.runtime import runtime, WorkloadType
+from core.utils.ws_pool import ws_pool
 from core.providers.tts.dto.dto import SentenceType, ContentType, InterfaceType
 from asyncio import Task
 
@@ -143,6 +144,7 @@ class TTSProvider(TTSProviderBase):
         super().__init__(config, delete_audio_file)
         self.ws = None
         self.interface_type = InterfaceType.DUAL_STREAM
+        self.blocking_io = False
         self._monitor_task = None  # 监听任务引用
         self.appId = config.get("appid")
         self.access_token = config.get("access_token")
@@ -159,13 +161,20 @@ class TTSProvider(TTSProviderBase):
         self.loudness_rate = int(loudness_rate) if loudness_rate else 0
         self.pitch = int(pitch) if pitch else 0
         self.ws_url = config.get("ws_url")
+        # 相同配置的连接可在设备间复用
+        self.pool_key = (
+            "huoshan_double_stream",
+            self.ws_url,
+            self.appId,
+            self.access_token,
+            self.resource_id,
+        )
+        pool_idle_timeout = config.get("pool_idle_timeout", "60")
+        self.pool_idle_timeout = float(pool_idle_timeout) if pool_idle_timeout else 60
         self.authorization = config.get("authorization")
         self.header = {"Authorization": f"{self.authorization}{self.access_token}"}
         self.enable_two_way = True
         self.tts_text = ""
-        self.opus_encoder = opus_encoder_utils.OpusEncoderUtils(
-            sample_rate=16000, channels=1, frame_size_ms=60
-        )
         model_key_msg = check_model_key("TTS", self.access_token)
         if model_key_msg:
             logger.bind(tag=TAG).error(model_key_msg)
@@ -178,34 +187,41 @@ class TTSProvider(TTSProviderBase):
             self.ws = None
             raise
 
+    async def _connect(self):
+        """建立新的上游WebSocket连接"""
+        logger.bind(tag=TAG).info("开始建立新连接...")
+        ws_header = {
+            "X-Api-App-Key": self.appId,
+            "X-Api-Access-Key": self.access_token,
+            "X-Api-Resource-Id": self.resource_id,
+            "X-Api-Connect-Id": uuid.uuid4(),
+        }
+        ws = await websockets.connect(
+            self.ws_url, additional_headers=ws_header, max_size=1000000000
+        )
+        logger.bind(tag=TAG).info("WebSocket连接建立成功")
+        return ws
+
     async def _ensure_connection(self):
-        """建立新的WebSocket连接"""
+        """获取WebSocket连接，优先使用连接池中已建立的连接"""
         try:
             if self.ws:
                 logger.bind(tag=TAG).info(f"使用已有链接...")
                 return self.ws
-            logger.bind(tag=TAG).info("开始建立新连接...")
-            ws_header = {
-                "X-Api-App-Key": self.appId,
-                "X-Api-Access-Key": self.access_token,
-                "X-Api-Resource-Id": self.resource_id,
-                "X-Api-Connect-Id": uuid.uuid4(),
-            }
-            self.ws = await websockets.connect(
-                self.ws_url, additional_headers=ws_header, max_size=1000000000
+            self.ws = await ws_pool.acquire(
+                self.pool_key, self._connect, self.pool_idle_timeout
             )
-            logger.bind(tag=TAG).info("WebSocket连接建立成功")
             return self.ws
         except Exception as e:
             logger.bind(tag=TAG).error(f"建立连接失败: {str(e)}")
             self.ws = None
             raise
 
-    def tts_text_priority_thread(self):
-        """火山引擎双流式TTS的文本处理线程"""
+    async def tts_text_priority_task(self):
+        """火山引擎双流式TTS的文本处理任务"""
         while not self.conn.stop_event.is_set():
             try:
-                message = self.tts_text_queue.get(timeout=1)
+                message = await self.tts_text_queue.get()
                 logger.bind(tag=TAG).debug(
                     f"收到TTS任务｜{message.sentence_type.name} ｜ {message.content_type.name} | 会话ID: {self.conn.sentence_id}"
                 )
@@ -215,11 +231,8 @@ class TTSProvider(TTSProviderBase):
 
                 if self.conn.client_abort:
                     try:
-                        logger.bind(tag=TAG).info("收到打断信息，终止TTS文本处理线程")
-                        asyncio.run_coroutine_threadsafe(
-                            self.cancel_session(self.conn.sentence_id),
-                            loop=self.conn.loop,
-                        )
+                        logger.bind(tag=TAG).info("收到打断信息，终止TTS文本处理任务")
+                        await self.cancel_session(self.conn.sentence_id)
                         continue
                     except Exception as e:
                         logger.bind(tag=TAG).error(f"取消TTS会话失败: {str(e)}")
@@ -233,11 +246,7 @@ class TTSProvider(TTSProviderBase):
                             logger.bind(tag=TAG).info(f"自动生成新的 会话ID: {self.conn.sentence_id}")
 
                         logger.bind(tag=TAG).info("开始启动TTS会话...")
-                        future = asyncio.run_coroutine_threadsafe(
-                            self.start_session(self.conn.sentence_id),
-                            loop=self.conn.loop,
-                        )
-                        future.result()
+                        await self.start_session(self.conn.sentence_id)
                         self.before_stop_play_files.clear()
                         logger.bind(tag=TAG).info("TTS会话启动成功")
                     except Exception as e:
@@ -250,11 +259,7 @@ class TTSProvider(TTSProviderBase):
                             logger.bind(tag=TAG).debug(
                                 f"开始发送TTS文本: {message.content_detail}"
                             )
-                            future = asyncio.run_coroutine_threadsafe(
-                                self.text_to_speak(message.content_detail, None),
-                                loop=self.conn.loop,
-                            )
-                            future.result()
+                            await self.text_to_speak(message.content_detail, None)
                             logger.bind(tag=TAG).debug("TTS文本发送成功")
                         except Exception as e:
                             logger.bind(tag=TAG).error(f"发送TTS文本失败: {str(e)}")
@@ -266,7 +271,11 @@ class TTSProvider(TTSProviderBase):
                     )
                     if message.content_file and os.path.exists(message.content_file):
                         # 先处理文件音频数据
-                        file_audio = self._process_audio_file(message.content_file)
+                        file_audio = await runtime.run(
+                            WorkloadType.AUDIO,
+                            self._process_audio_file,
+                            message.content_file,
+                        )
                         self.before_stop_play_files.append(
                             (file_audio, message.content_detail)
                         )
@@ -274,17 +283,13 @@ class TTSProvider(TTSProviderBase):
                 if message.sentence_type == SentenceType.LAST:
                     try:
                         logger.bind(tag=TAG).info("开始结束TTS会话...")
-                        future = asyncio.run_coroutine_threadsafe(
-                            self.finish_session(self.conn.sentence_id),
-                            loop=self.conn.loop,
-                        )
-                        future.result()
+                        await self.finish_session(self.conn.sentence_id)
                     except Exception as e:
                         logger.bind(tag=TAG).error(f"结束TTS会话失败: {str(e)}")
                         continue
 
-            except queue.Empty:
-                continue
+            except asyncio.CancelledError:
+                break
             except Exception as e:
                 logger.bind(tag=TAG).error(
                     f"处理TTS文本失败: {str(e)}, 类型: {type(e).__name__}, 堆栈: {traceback.format_exc()}"
@@ -379,6 +384,11 @@ class TTSProvider(TTSProviderBase):
                     finally:
                         self._monitor_task = None
 
+                # 会话正常结束后连接仍可用，归还连接池供下一次会话使用
+                if self.ws:
+                    ws_pool.release(self.pool_key, self.ws, self.pool_idle_timeout)
+                    self.ws = None
+
         except Exception as e:
             logger.bind(tag=TAG).error(f"关闭会话失败: {str(e)}")
             # 确保清理资源
@@ -431,6 +441,8 @@ class TTSProvider(TTSProviderBase):
         opus_datas_cache = []
         is_first_sentence = True
         first_sentence_segment_count = 0  # 添加计数器
+        # 每个会话从编码器池取一个编码器，会话结束后放回
+        opus_encoder = opus_encoder_pool.acquire()
         try:
             session_finished = False  # 标记会话是否正常结束
             while not self.conn.stop_event.is_set():
@@ -458,7 +470,9 @@ class TTSProvider(TTSProviderBase):
                         and res.header.message_type == AUDIO_ONLY_RESPONSE
                     ):
                         logger.bind(tag=TAG).debug(f"推送数据到队列里面～～")
-                        opus_datas = self.wav_to_opus_data_audio_raw(res.payload)
+                        opus_datas = opus_encoder.encode_pcm_to_opus(
+                            res.payload, False
+                        )
                         logger.bind(tag=TAG).debug(
                             f"推送数据到队列里面帧数～～{len(opus_datas)}"
                         )
@@ -505,6 +519,7 @@ class TTSProvider(TTSProviderBase):
                 self.ws = None
         # 监听任务退出时清理引用
         finally:
+            opus_encoder_pool.release(opus_encoder)
             self._monitor_task = None
 
     async def send_event(
@@ -655,10 +670,6 @@ class TTSProvider(TTSProviderBase):
             )
         )
 
-    def wav_to_opus_data_audio_raw(self, raw_data_var, is_end=False):
-        opus_datas = self.opus_encoder.encode_pcm_to_opus(raw_data_var, is_end)
-        return opus_datas
-
     def to_tts(self, text: str) -> list:
         """非流式生成音频数据，用于生成音频及测试场景
 
@@ -741,7 +752,9 @@ class TTSProvider(TTSProviderBase):
                             res.optional.event == EVENT_TTSResponse
                             and res.header.message_type == AUDIO_ONLY_RESPONSE
                         ):
-                            opus_datas = self.wav_to_opus_data_audio_raw(res.payload)
+                            opus_datas = opus_encoder.encode_pcm_to_opus(
+                                res.payload, False
+                            )
                             audio_data.extend(opus_datas)
                         elif res.optional.event == EVENT_SessionFinished:
                             break
@@ -754,7 +767,8 @@ class TTSProvider(TTSProviderBase):
                         pass
 
             # 运行异步任务
-            loop.run_until_complete(_generate_audio())
+            with opus_encoder_pool.encoder() as opus_encoder:
+                loop.run_until_complete(_generate_audio())
             loop.close()
 
             return audio_data
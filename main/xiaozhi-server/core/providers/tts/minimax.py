@@ -1,13 +1,15 @@
 import os
 import uuid
 import json
-import requests
 from datetime import datetime
 from core.providers.tts.base import TTSProviderBase
+from core.utils.http_client import http_client
 from core.utils.util import parse_string_to_list
 
 
 class TTSProvider(TTSProviderBase):
+    uses_http_client = True
+
     def __init__(self, config, delete_audio_file):
         super().__init__(config, delete_audio_file)
         self.group_id = config.get("group_id")
@@ -41,6 +43,7 @@ class TTSProvider(TTSProviderBase):
             **config.get("pronunciation_dict", {}),
         }
         self.audio_setting = {**defult_audio_setting, **config.get("audio_setting", {})}
+        self.audio_file_type = self.audio_setting.get("format", "mp3")
         self.timber_weights = parse_string_to_list(config.get("timber_weights"))
 
         if self.voice_id:
@@ -74,14 +77,19 @@ class TTSProvider(TTSProviderBase):
             request_json["voice_setting"]["voice_id"] = ""
 
         try:
-            resp = requests.post(
-                self.api_url, json.dumps(request_json), headers=self.header
+            client = http_client.get(self.api_url, self.http_config)
+            resp = await client.post(
+                self.api_url, content=json.dumps(request_json), headers=self.header
             )
+            resp_json = resp.json()
             # 检查返回请求数据的status_code是否为0
-            if resp.json()["base_resp"]["status_code"] == 0:
-                data = resp.json()["data"]["audio"]
-                file_to_save = open(output_file, "wb")
-                file_to_save.write(bytes.fromhex(data))
+            if resp_json["base_resp"]["status_code"] == 0:
+                data = resp_json["data"]["audio"]
+                audio_bytes = bytes.fromhex(data)
+                if not output_file:
+                    return audio_bytes
+                with open(output_file, "wb") as file_to_save:
+                    file_to_save.write(audio_bytes)
             else:
                 raise Exception(
                     f"{__name__} status_code: {resp.status_code} response: {resp.content}"
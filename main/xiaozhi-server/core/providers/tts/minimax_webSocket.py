@@ -7,11 +7,14 @@ import ssl
 from datetime import datetime
 from core.providers.tts.base import TTSProviderBase
 from core.utils.util import parse_string_to_list
+from core.utils.ws_pool import ws_pool
 
 
 class TTSProvider(TTSProviderBase):
     def __init__(self, config, delete_audio_file):
         super().__init__(config, delete_audio_file)
+        # 合成使用异步接口，直接在事件循环中执行
+        self.blocking_io = False
         self.group_id = config.get("group_id")
         self.api_key = config.get("api_key")
         self.model = config.get("model")
@@ -60,6 +63,16 @@ class TTSProvider(TTSProviderBase):
             "GroupId": self.group_id
         }
         self.audio_file_type = self.audio_setting.get("format", "mp3")
+        # 连接池中的连接已完成鉴权并启动了任务，相同配置的设备之间可以复用
+        self.pool_key = (
+            "minimax_webSocket",
+            self.ws_url,
+            self.group_id,
+            self.api_key,
+            json.dumps(self._task_start_message(), sort_keys=True),
+        )
+        pool_idle_timeout = config.get("pool_idle_timeout", "60")
+        self.pool_idle_timeout = float(pool_idle_timeout) if pool_idle_timeout else 60
 
     def generate_filename(self, extension=".mp3"):
         """生成唯一的音频文件名"""
@@ -89,12 +102,11 @@ class TTSProvider(TTSProviderBase):
             print(f"连接失败: {e}")
             return None
 
-    async def _start_task(self, websocket):
-        """发送任务开始请求"""
+    def _task_start_message(self):
         start_msg = {
             "event": "task_start",
             "model": self.model,
-            "voice_setting": self.voice_setting,
+            "voice_setting": dict(self.voice_setting),
             "pronunciation_dict": self.pronunciation_dict,
             "audio_setting": self.audio_setting
         }
@@ -102,11 +114,27 @@ class TTSProvider(TTSProviderBase):
         if self.timber_weights and len(self.timber_weights) > 0:
             start_msg["timber_weights"] = self.timber_weights
             start_msg["voice_setting"]["voice_id"] = ""
+        return start_msg
 
-        await websocket.send(json.dumps(start_msg))
+    async def _start_task(self, websocket):
+        """发送任务开始请求"""
+        await websocket.send(json.dumps(self._task_start_message()))
         response = json.loads(await websocket.recv())
         return response.get("event") == "task_started"
 
+    async def _open_task(self):
+        """建立连接并启动任务，返回可以直接发送文本的连接"""
+        ws = await self._establish_connection()
+        if not ws:
+            raise Exception("无法建立WebSocket连接")
+        try:
+            if not await self._start_task(ws):
+                raise Exception("任务启动失败")
+        except Exception:
+            ws_pool.discard(ws)
+            raise
+        return ws
+
     async def _continue_task(self, websocket, text):
         """发送继续请求并收集音频数据"""
         await websocket.send(json.dumps({
@@ -132,29 +160,28 @@ class TTSProvider(TTSProviderBase):
 
     async def text_to_speak(self, text, output_file=None):
         """主方法：文本转语音"""
-        ws = await self._establish_connection()
-        if not ws:
-            raise Exception("无法建立WebSocket连接")
-
+        # 从连接池借出已启动任务的连接，省去握手、鉴权和启动任务的往返
+        ws = await ws_pool.acquire(
+            self.pool_key, self._open_task, self.pool_idle_timeout
+        )
         try:
-            if not await self._start_task(ws):
-                raise Exception("任务启动失败")
-
             hex_audio = await self._continue_task(ws, text)
-            audio_bytes = bytes.fromhex(hex_audio)
-
-            # 保存到文件或返回二进制数据
-            if output_file:
-                with open(output_file, "wb") as f:
-                    f.write(audio_bytes)
-                print(f"音频已保存为{output_file}")
-                return output_file
-            else:
-                # 返回音频二进制数据（不播放）
-                return audio_bytes
-
-        finally:
-            await self._close_connection(ws)
+        except Exception:
+            ws_pool.discard(ws)
+            raise
+        # 本段文本的音频已完整收到，连接可供下一句使用
+        ws_pool.release(self.pool_key, ws, self.pool_idle_timeout)
+
+        audio_bytes = bytes.fromhex(hex_audio)
+        # 保存到文件或返回二进制数据
+        if output_file:
+            with open(output_file, "wb") as f:
+                f.write(audio_bytes)
+            print(f"音频已保存为{output_file}")
+            return output_file
+        else:
+            # 返回音频二进制数据（不播放）
+            return audio_bytes
 
 
 async def main():
@@ -1,8 +1,8 @@
 import os
 import uuid
-import requests
 from datetime import datetime
 from core.utils.util import check_model_key
+from core.utils.http_client import http_client
 from core.providers.tts.base import TTSProviderBase
 from config.logger import setup_logging
 
@@ -11,6 +11,8 @@ logger = setup_logging()
 
 
 class TTSProvider(TTSProviderBase):
+    uses_http_client = True
+
     def __init__(self, config, delete_audio_file):
         super().__init__(config, delete_audio_file)
         self.api_key = config.get("api_key")
@@ -47,8 +49,11 @@ class TTSProvider(TTSProviderBase):
             "response_format": "wav",
             "speed": self.speed,
         }
-        response = requests.post(self.api_url, json=data, headers=headers)
+        client = http_client.get(self.api_url, self.http_config)
+        response = await client.post(self.api_url, json=data, headers=headers)
         if response.status_code == 200:
+            if not output_file:
+                return response.content
             with open(output_file, "wb") as audio_file:
                 audio_file.write(response.content)
         else:
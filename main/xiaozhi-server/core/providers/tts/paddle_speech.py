@@ -16,6 +16,8 @@ logger = setup_logging()
 class TTSProvider(TTSProviderBase):
     def __init__(self, config, delete_audio_file):
         super().__init__(config, delete_audio_file)
+        # 合成使用异步接口，直接在事件循环中执行
+        self.blocking_io = False
         self.url = config.get("url", "ws://192.168.1.10:8092/paddlespeech/tts/streaming")
         self.protocol = config.get("protocol", "websocket")
         if config.get("private_voice"):
@@ -15,6 +15,7 @@ class TTSProvider(TTSProviderBase):
         else:
             self.voice = config.get("voice")
         self.response_format = config.get("response_format")
+        self.audio_file_type = self.response_format or "wav"
         self.sample_rate = config.get("sample_rate")
         self.speed = float(config.get("speed", 1.0))
         self.gain = config.get("gain")
@@ -44,7 +45,9 @@ class TTSProvider(TTSProviderBase):
                 "POST", self.api_url, json=request_json, headers=headers
             )
             data = response.content
-            file_to_save = open(output_file, "wb")
-            file_to_save.write(data)
+            if not output_file:
+                return data
+            with open(output_file, "wb") as file_to_save:
+                file_to_save.write(data)
         except Exception as e:
             raise Exception(f"{__name__} error: {e}")
\ No newline at end of file
@@ -5,12 +5,14 @@ import time
 import uuid
 import json
 import base64
-import requests
 from datetime import datetime, timezone
 from core.providers.tts.base import TTSProviderBase
+from core.utils.http_client import http_client
 
 
 class TTSProvider(TTSProviderBase):
+    uses_http_client = True
+
     def __init__(self, config, delete_audio_file):
         super().__init__(config, delete_audio_file)
         self.appid = config.get("appid")
@@ -140,8 +142,9 @@ class TTSProvider(TTSProviderBase):
             headers = self._get_auth_headers(request_json)
 
             # 发送请求
-            resp = requests.post(
-                self.api_url, json.dumps(request_json), headers=headers
+            client = http_client.get(self.api_url, self.http_config)
+            resp = await client.post(
+                self.api_url, content=json.dumps(request_json), headers=headers
             )
 
             # 检查响应
@@ -159,8 +162,11 @@ class TTSProvider(TTSProviderBase):
                 audio_data = response_data["Response"].get("Audio")
                 if audio_data:
                     # 解码Base64音频数据并保存
+                    audio_bytes = base64.b64decode(audio_data)
+                    if not output_file:
+                        return audio_bytes
                     with open(output_file, "wb") as f:
-                        f.write(base64.b64decode(audio_data))
+                        f.write(audio_bytes)
                 else:
                     raise Exception(f"{__name__}: 没有返回音频数据: {response_data}")
             else:
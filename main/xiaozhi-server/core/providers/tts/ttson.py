@@ -1,10 +1,10 @@
 import os
 import uuid
 import json
-import requests
 import shutil
 from datetime import datetime
 from core.providers.tts.base import TTSProviderBase
+from core.utils.http_client import http_client
 from config.logger import setup_logging
 
 TAG = __name__
@@ -12,6 +12,8 @@ logger = setup_logging()
 
 
 class TTSProvider(TTSProviderBase):
+    uses_http_client = True
+
     def __init__(self, config, delete_audio_file):
         super().__init__(config, delete_audio_file)
         self.url = config.get(
@@ -30,6 +32,7 @@ class TTSProvider(TTSProviderBase):
         self.output_file = config.get("output_dir")
         self.pitch_factor = int(config.get("pitch_factor", 0))
         self.format = config.get("format", "mp3")
+        self.audio_file_type = self.format
         self.emotion = int(config.get("emotion", 1))
         self.header = {"Content-Type": "application/json"}
 
@@ -56,7 +59,8 @@ class TTSProvider(TTSProviderBase):
             }
         )
 
-        resp = requests.request("POST", url, data=payload)
+        client = http_client.get(url, self.http_config)
+        resp = await client.post(url, content=payload)
         if resp.status_code != 200:
             logger.bind(tag=TAG).error(f"TTSON 请求失败: {resp.text}")
             raise Exception(f"{__name__}: TTS请求失败")
@@ -72,7 +76,10 @@ class TTSProvider(TTSProviderBase):
                 + resp_json["voice_path"]
             )
 
-            audio_content = requests.get(result)
+            file_client = http_client.get(result, self.http_config)
+            audio_content = await file_client.get(result)
+            if not output_file:
+                return audio_content.content
             with open(output_file, "wb") as f:
                 f.write(audio_content.content)
                 return True
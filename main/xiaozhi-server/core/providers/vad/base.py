@@ -1,5 +1,19 @@
+import time
+import numpy as np
+import opuslib_next
 from abc import ABC, abstractmethod
 from typing import Optional
+from config.logger import setup_logging
+from core.utils.vad_engine import (
+    BatchVADEngine,
+    VADPreGate,
+    VADStreamState,
+    CONTEXT_SIZE_SAMPLES,
+    WINDOW_SIZE_SAMPLES,
+)
+
+TAG = __name__
+logger = setup_logging()
 
 
 class VADProviderBase(ABC):
@@ -7,3 +21,167 @@ class VADProviderBase(ABC):
     def is_vad(self, conn, data) -> bool:
         """检测音频数据中的语音活动"""
         pass
+
+    async def is_vad_async(self, conn, data) -> bool:
+        """在事件循环中检测语音活动，支持批量推理的实现可重写此方法"""
+        return self.is_vad(conn, data)
+
+
+class SileroVADProviderBase(VADProviderBase):
+    """Silero系列VAD的公共逻辑：解码、批量推理与双阈值判断，子类只需提供推理后端"""
+
+    def __init__(self, config, backend):
+        # 所有连接共享一个批量推理引擎，每个连接维护自己的模型状态
+        max_batch_size = config.get("max_batch_size", "64")
+        batch_wait_ms = config.get("batch_wait_ms", "2")
+        self.engine = BatchVADEngine(
+            backend,
+            max_batch_size=int(max_batch_size) if max_batch_size else 64,
+            batch_wait_ms=float(batch_wait_ms) if batch_wait_ms else 2,
+        )
+
+        # 能量/过零率预判，明显静音的窗口不进入模型推理
+        self.pre_gate = None
+        if str(config.get("pre_gate_enable", False)).lower() in ("true", "1", "yes"):
+            energy_threshold = config.get("pre_gate_energy_threshold", "0.003")
+            zcr_threshold = config.get("pre_gate_zcr_threshold", "0.35")
+            self.pre_gate = VADPreGate(
+                energy_threshold=(
+                    float(energy_threshold) if energy_threshold else 0.003
+                ),
+                zcr_threshold=float(zcr_threshold) if zcr_threshold else 0.35,
+            )
+
+        # 处理空字符串的情况
+        threshold = config.get("threshold", "0.5")
+        threshold_low = config.get("threshold_low", "0.2")
+        min_silence_duration_ms = config.get("min_silence_duration_ms", "1000")
+
+        self.vad_threshold = float(threshold) if threshold else 0.5
+        self.vad_threshold_low = float(threshold_low) if threshold_low else 0.2
+
+        self.silence_threshold_ms = (
+            int(min_silence_duration_ms) if min_silence_duration_ms else 1000
+        )
+
+        # 至少要多少帧才算有语音
+        self.frame_window_threshold = 1
+
+    def _get_stream(self, conn) -> VADStreamState:
+        if conn.vad_stream is None:
+            conn.vad_stream = VADStreamState()
+        return conn.vad_stream
+
+    def _decode_windows(self, conn, opus_packet) -> np.ndarray:
+        """解码一个Opus包，取出缓冲区中所有完整的512采样点窗口"""
+        stream = self._get_stream(conn)
+        pcm_frame = stream.decoder.decode(opus_packet, 960)
+        conn.client_audio_buffer.write(pcm_frame)  # 将新数据加入缓冲区
+
+        window_bytes = WINDOW_SIZE_SAMPLES * 2
+        num_windows = len(conn.client_audio_buffer) // window_bytes
+        if num_windows == 0:
+            return np.empty((0, WINDOW_SIZE_SAMPLES), dtype=np.float32)
+
+        # 直接在缓冲区内存上转换为模型需要的格式，不再切片拷贝
+        chunk = conn.client_audio_buffer.peek(num_windows * window_bytes)
+        audio_float32 = np.frombuffer(chunk, dtype=np.int16).astype(np.float32)
+        audio_float32 /= 32768.0
+        conn.client_audio_buffer.consume(num_windows * window_bytes)
+        return audio_float32.reshape(num_windows, WINDOW_SIZE_SAMPLES)
+
+    def _gate_windows(self, conn, windows: np.ndarray):
+        """预判静音窗口，返回(需要推理的掩码, 预置的语音概率)"""
+        speech_probs = np.zeros(len(windows), dtype=np.float32)
+        if self.pre_gate is None:
+            return np.ones(len(windows), dtype=bool), speech_probs
+        return self.pre_gate.filter(windows), speech_probs
+
+    @staticmethod
+    def _model_runs(need_model: np.ndarray):
+        """需要推理的窗口按连续段切分，返回[(起始下标, 结束下标)]"""
+        runs = []
+        start = None
+        for i, keep in enumerate(need_model):
+            if keep and start is None:
+                start = i
+            elif not keep and start is not None:
+                runs.append((start, i))
+                start = None
+        if start is not None:
+            runs.append((start, len(need_model)))
+        return runs
+
+    @staticmethod
+    def _carry_context(
+        stream, windows: np.ndarray, need_model: np.ndarray, index: int
+    ):
+        """第index个窗口的前一个窗口被跳过时，用它的末尾作为上下文，
+        保证每段推理看到的音频与不跳过时一致"""
+        if index > 0 and not need_model[index - 1]:
+            stream.context = windows[index - 1 : index, -CONTEXT_SIZE_SAMPLES:].copy()
+
+    def _update_voice_state(self, conn, speech_probs) -> bool:
+        client_have_voice = False
+        for speech_prob in speech_probs:
+            # 双阈值判断
+            if speech_prob >= self.vad_threshold:
+                is_voice = True
+            elif speech_prob <= self.vad_threshold_low:
+                is_voice = False
+            else:
+                is_voice = conn.last_is_voice
+
+            # 声音没低于最低值则延续前一个状态，判断为有声音
+            conn.last_is_voice = is_voice
+
+            # 更新滑动窗口
+            conn.client_voice_window.append(is_voice)
+            client_have_voice = (
+                conn.client_voice_window.count(True) >= self.frame_window_threshold
+            )
+
+            # 如果之前有声音，但本次没有声音，且与上次有声音的时间差已经超过了静默阈值，则认为已经说完一句话
+            if conn.client_have_voice and not client_have_voice:
+                stop_duration = time.time() * 1000 - conn.client_have_voice_last_time
+                if stop_duration >= self.silence_threshold_ms:
+                    conn.client_voice_stop = True
+            if client_have_voice:
+                conn.client_have_voice = True
+                conn.client_have_voice_last_time = time.time() * 1000
+
+        return client_have_voice
+
+    def is_vad(self, conn, opus_packet):
+        try:
+            windows = self._decode_windows(conn, opus_packet)
+            need_model, speech_probs = self._gate_windows(conn, windows)
+            stream = self._get_stream(conn)
+            for start, end in self._model_runs(need_model):
+                self._carry_context(stream, windows, need_model, start)
+                speech_probs[start:end] = self.engine.infer_sync(
+                    stream, windows[start:end]
+                )
+            self._carry_context(stream, windows, need_model, len(windows))
+            return self._update_voice_state(conn, speech_probs)
+        except opuslib_next.OpusError as e:
+            logger.bind(tag=TAG).info(f"解码错误: {e}")
+        except Exception as e:
+            logger.bind(tag=TAG).error(f"Error processing audio packet: {e}")
+
+    async def is_vad_async(self, conn, opus_packet):
+        try:
+            windows = self._decode_windows(conn, opus_packet)
+            need_model, speech_probs = self._gate_windows(conn, windows)
+            stream = self._get_stream(conn)
+            for start, end in self._model_runs(need_model):
+                self._carry_context(stream, windows, need_model, start)
+                speech_probs[start:end] = await self.engine.infer(
+                    stream, windows[start:end]
+                )
+            self._carry_context(stream, windows, need_model, len(windows))
+            return self._update_voice_state(conn, speech_probs)
+        except opuslib_next.OpusError as e:
+            logger.bind(tag=TAG).info(f"解码错误: {e}")
+        except Exception as e:
+            logger.bind(tag=TAG).error(f"Error processing audio packet: {e}")
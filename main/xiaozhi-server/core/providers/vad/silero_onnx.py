@@ -0,0 +1,34 @@
+import os
+from config.logger import setup_logging
+from core.providers.vad.base import SileroVADProviderBase
+from core.utils.vad_engine import SileroOnnxBackend
+
+TAG = __name__
+logger = setup_logging()
+
+
+class VADProvider(SileroVADProviderBase):
+    """使用onnxruntime运行Silero模型，进程中不需要加载torch"""
+
+    def __init__(self, config):
+        logger.bind(tag=TAG).info("SileroVAD(onnx)", config)
+        model_file = config.get("model_file") or "silero_vad.onnx"
+        model_path = os.path.join(
+            config["model_dir"], "src", "silero_vad", "data", model_file
+        )
+        if not os.path.exists(model_path):
+            raise ValueError(f"Silero ONNX模型文件不存在: {model_path}")
+
+        intra_op_num_threads = config.get("intra_op_num_threads", "1")
+        inter_op_num_threads = config.get("inter_op_num_threads", "1")
+        backend = SileroOnnxBackend(
+            model_path,
+            intra_op_num_threads=(
+                int(intra_op_num_threads) if intra_op_num_threads else 1
+            ),
+            inter_op_num_threads=(
+                int(inter_op_num_threads) if inter_op_num_threads else 1
+            ),
+        )
+
+        super().__init__(config, backend)
@@ -0,0 +1,96 @@
+"""
+内置提示音资源库
+启动时把 config/assets 下的提示音（绑定码数字、超额提示、结束提示音、唤醒词回复等）一次性转为Opus包，
+运行时直接返回共享的只读帧序列，不再每次调用都解码、编码
+"""
+
+import os
+import threading
+from typing import Dict, Optional, Tuple
+from config.logger import setup_logging
+from core.utils import p3
+from core.utils.audio_decoder import decode_audio_bytes
+
+TAG = __name__
+logger = setup_logging()
+
+ASSETS_DIR = "config/assets"
+AUDIO_EXTENSIONS = (".p3", ".wav", ".mp3", ".ogg", ".flac", ".pcm")
+
+
+class AudioAssetBank:
+    """提示音资源库，按文件路径缓存编码好的Opus包"""
+
+    def __init__(self):
+        # 路径 -> (文件修改时间, Opus包元组)
+        self._assets: Dict[str, Tuple[float, Tuple[bytes, ...]]] = {}
+        self._lock = threading.Lock()
+
+    def preload(self, assets_dir: str = ASSETS_DIR) -> None:
+        """预加载目录下的全部音频文件"""
+        if not os.path.isdir(assets_dir):
+            return
+        count = 0
+        for root, _, files in os.walk(assets_dir):
+            for file in files:
+                if not file.lower().endswith(AUDIO_EXTENSIONS):
+                    continue
+                if self.get(os.path.join(root, file)) is not None:
+                    count += 1
+        logger.bind(tag=TAG).info(f"已预加载{count}个提示音: {assets_dir}")
+
+    def get(self, file_path: str) -> Optional[Tuple[bytes, ...]]:
+        """获取音频文件的Opus包，文件更新后自动重新加载，加载失败返回None
+
+        返回的元组由所有连接共享，调用方不能修改
+        """
+        key = os.path.normpath(file_path)
+        source = self._resolve_source(key)
+        try:
+            mtime = os.path.getmtime(source)
+        except OSError:
+            logger.bind(tag=TAG).error(f"提示音文件不存在: {file_path}")
+            return None
+
+        entry = self._assets.get(key)
+        if entry is not None and entry[0] == mtime:
+            return entry[1]
+
+        try:
+            opus_datas = self._load(source)
+        except Exception as e:
+            logger.bind(tag=TAG).error(f"加载提示音失败: {source}, {e}")
+            return None
+        with self._lock:
+            self._assets[key] = (mtime, opus_datas)
+        return opus_datas
+
+    def invalidate(self, file_path: str) -> None:
+        """移除缓存的音频，文件被删除或替换时调用"""
+        with self._lock:
+            self._assets.pop(os.path.normpath(file_path), None)
+
+    @staticmethod
+    def _resolve_source(file_path: str) -> str:
+        """同名的.p3文件是预先编码好的版本，存在时优先使用"""
+        if file_path.endswith(".p3"):
+            return file_path
+        prebuilt = os.path.splitext(file_path)[0] + ".p3"
+        return prebuilt if os.path.exists(prebuilt) else file_path
+
+    @staticmethod
+    def _load(file_path: str) -> Tuple[bytes, ...]:
+        if file_path.endswith(".p3"):
+            opus_datas, _ = p3.decode_opus_from_file(file_path)
+        else:
+            with open(file_path, "rb") as f:
+                audio_bytes = f.read()
+            audio_format = os.path.splitext(file_path)[1].lstrip(".")
+            opus_datas, _ = decode_audio_bytes(
+                audio_bytes, audio_format, is_opus=True, speech=False
+            )
+        return tuple(opus_datas)
+
+
+# 创建全局提示音资源库实例
+asset_bank = AudioAssetBank()
@@ -0,0 +1,92 @@
+"""
+录音归档
+ASR只使用内存中的音频，需要保留录音时（delete_audio: false）由后台线程批量写入WAV文件，
+文件的创建和写入不在识别的关键路径上
+"""
+
+import os
+import queue
+import threading
+from config.logger import setup_logging
+from core.utils.utterance import build_wav
+
+TAG = __name__
+logger = setup_logging()
+
+# 每批最多写入的文件数
+BATCH_SIZE = 32
+# 待写入文件数上限，磁盘跟不上时丢弃新的录音而不是占满内存
+MAX_PENDING = 512
+
+
+class AudioArchiveWriter:
+    """后台批量写入录音文件"""
+
+    def __init__(self, batch_size: int = BATCH_SIZE, max_pending: int = MAX_PENDING):
+        self.batch_size = batch_size
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._thread = None
+        self._lock = threading.Lock()
+        self.dropped = 0
+
+    def write_wav(self, file_path: str, pcm_data: bytes, sample_rate: int = 16000) -> bool:
+        """提交一个16位单声道PCM录音，立即返回；队列已满时丢弃并返回False"""
+        self._ensure_thread()
+        try:
+            self._queue.put_nowait((file_path, pcm_data, sample_rate))
+            return True
+        except queue.Full:
+            self.dropped += 1
+            logger.bind(tag=TAG).warning(
+                f"录音归档队列已满，丢弃录音: {file_path}（累计丢弃{self.dropped}个）"
+            )
+            return False
+
+    def flush(self, timeout: float = None) -> None:
+        """等待已提交的录音全部写入"""
+        if self._thread is not None:
+            done = threading.Event()
+            self._queue.put((None, done, None))
+            done.wait(timeout)
+
+    def _ensure_thread(self) -> None:
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="audio-archive", daemon=True
+                )
+                self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            # 一次取出已积压的录音，减少线程唤醒次数
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            self._write_batch(batch)
+
+    def _write_batch(self, batch) -> None:
+        created_dirs = set()
+        for file_path, pcm_data, sample_rate in batch:
+            if file_path is None:
+                # flush 标记
+                pcm_data.set()
+                continue
+            try:
+                directory = os.path.dirname(file_path)
+                if directory and directory not in created_dirs:
+                    os.makedirs(directory, exist_ok=True)
+                    created_dirs.add(directory)
+                with open(file_path, "wb") as f:
+                    f.write(build_wav(pcm_data, sample_rate))
+            except Exception as e:
+                logger.bind(tag=TAG).error(f"写入录音文件失败: {file_path} | 错误: {e}")
+
+
+# 创建全局录音归档实例
+audio_archive = AudioArchiveWriter()
@@ -0,0 +1,67 @@
+"""
+连接级音频缓冲区
+为上行PCM数据提供预分配的缓冲区，按窗口读取时返回memoryview，避免每帧重新分配内存
+"""
+
+
+class PCMRingBuffer:
+    """预分配的PCM缓冲区
+
+    写入时追加到尾部，读取时通过 peek 拿到指向内部内存的 memoryview，consume 只移动读指针。
+    缓冲区读空时读写指针归零；尾部空间不足时把剩余的少量数据（不足一个窗口）搬回头部复用内存，
+    只有单次写入超过总容量时才会重新分配。
+    """
+
+    def __init__(self, capacity: int = 16 * 1024):
+        self._buf = bytearray(capacity)
+        self._view = memoryview(self._buf)
+        self._head = 0
+        self._tail = 0
+
+    def __len__(self) -> int:
+        return self._tail - self._head
+
+    @property
+    def capacity(self) -> int:
+        return len(self._buf)
+
+    def write(self, data) -> None:
+        """追加PCM数据"""
+        size = len(data)
+        if self._tail + size > len(self._buf):
+            self._compact()
+            if self._tail + size > len(self._buf):
+                self._grow(self._tail + size)
+        self._view[self._tail : self._tail + size] = data
+        self._tail += size
+
+    def peek(self, size: int) -> memoryview:
+        """返回从读指针开始、长度为size的只读视图，不拷贝数据"""
+        size = min(size, len(self))
+        return self._view[self._head : self._head + size].toreadonly()
+
+    def consume(self, size: int) -> None:
+        """丢弃已处理的数据"""
+        self._head = min(self._head + size, self._tail)
+        if self._head == self._tail:
+            self._head = self._tail = 0
+
+    def clear(self) -> None:
+        self._head = self._tail = 0
+
+    def _compact(self) -> None:
+        size = len(self)
+        if size and self._head:
+            self._buf[:size] = self._buf[self._head : self._tail]
+        self._head = 0
+        self._tail = size
+
+    def _grow(self, min_capacity: int) -> None:
+        # 新建缓冲区而不是原地扩容，避免外部仍持有视图时bytearray无法调整大小
+        capacity = len(self._buf)
+        while capacity < min_capacity:
+            capacity *= 2
+        new_buf = bytearray(capacity)
+        new_buf[: self._tail] = self._buf[: self._tail]
+        self._buf = new_buf
+        self._view = memoryview(self._buf)
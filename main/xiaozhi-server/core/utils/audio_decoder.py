@@ -0,0 +1,421 @@
+"""
+进程内音频解码
+把TTS返回的WAV/PCM/MP3数据直接在内存中转换为16kHz单声道PCM，并按60ms切帧编码为Opus，
+不经过临时文件和ffmpeg子进程；WAV/PCM支持边接收边解码，MP3/FLAC在安装了miniaudio时也支持
+"""
+
+import io
+import struct
+import numpy as np
+from typing import List, Optional, Tuple
+from config.logger import setup_logging
+from core.utils.opus_encoder_utils import opus_encoder_pool
+
+TAG = __name__
+logger = setup_logging()
+
+TARGET_SAMPLE_RATE = 16000
+FRAME_DURATION_MS = 60
+FRAME_SAMPLES = TARGET_SAMPLE_RATE * FRAME_DURATION_MS // 1000
+FRAME_BYTES = FRAME_SAMPLES * 2
+# 判断格式所需的文件头长度，首批数据不足时先缓存
+HEADER_BYTES = 12
+# 边接收边解码压缩格式时，缓冲区中至少保留这么多未读数据才继续解码，
+# 避免解码器读空缓冲区后误认为数据已结束
+STREAM_DECODE_MARGIN = 16 * 1024
+# 已解码的数据超过这个长度时从缓冲区中删除
+STREAM_COMPACT_SIZE = 256 * 1024
+
+
+def detect_audio_format(data: bytes, default: str = "wav") -> str:
+    """根据文件头判断音频格式，无法判断时使用default"""
+    head = bytes(data[:12])
+    if head[:4] == b"RIFF" and head[8:12] == b"WAVE":
+        return "wav"
+    if head[:3] == b"ID3" or (len(head) > 1 and head[0] == 0xFF and head[1] & 0xE0 == 0xE0):
+        return "mp3"
+    if head[:4] == b"OggS":
+        return "ogg"
+    if head[:4] == b"fLaC":
+        return "flac"
+    default = (default or "wav").lower().lstrip(".")
+    # 声明为WAV却没有RIFF头的数据按裸PCM处理
+    return "pcm" if default == "wav" else default
+
+
+class LinearResampler:
+    """线性插值重采样，跨数据块保持相位连续"""
+
+    def __init__(self, src_rate: int, dst_rate: int = TARGET_SAMPLE_RATE):
+        self.step = src_rate / dst_rate
+        self.pos = 0.0
+        self.tail = np.empty(0, dtype=np.float32)
+
+    def process(self, samples: np.ndarray) -> np.ndarray:
+        if self.step == 1:
+            return samples.astype(np.int16, copy=False)
+        buf = np.concatenate((self.tail, samples.astype(np.float32)))
+        if len(buf) < 2:
+            self.tail = buf
+            return np.empty(0, dtype=np.int16)
+        count = int(np.floor((len(buf) - 1 - self.pos) / self.step)) + 1
+        if count <= 0:
+            self.tail = buf
+            return np.empty(0, dtype=np.int16)
+        positions = self.pos + np.arange(count) * self.step
+        out = np.interp(positions, np.arange(len(buf)), buf)
+        next_pos = self.pos + count * self.step
+        keep_from = min(int(np.floor(next_pos)), len(buf))
+        self.tail = buf[keep_from:]
+        self.pos = next_pos - keep_from
+        return np.clip(np.round(out), -32768, 32767).astype(np.int16)
+
+
+class CompressedStream:
+    """用miniaudio边接收边解码MP3/FLAC，输出16kHz单声道16位PCM
+
+    miniaudio从缓冲区中拉取数据，读空即认为数据结束，因此数据未结束时只在缓冲区中
+    还有足够的未读数据时才继续解码
+    """
+
+    def __init__(self, miniaudio, file_format):
+        self._miniaudio = miniaudio
+        self._file_format = file_format
+        self._data = bytearray()
+        # 解码器已读取的位置，以及解码器看到的数据起点（跳过ID3标签后）
+        self._offset = 0
+        self._origin = 0
+        self._final = False
+        self._samples = None
+        self._finished = False
+        # 已经输出过PCM，此后出错无法再整体重新解码
+        self.started = False
+
+    @classmethod
+    def create(cls, audio_format: str) -> Optional["CompressedStream"]:
+        """不支持流式解码的格式或未安装miniaudio时返回None"""
+        try:
+            import miniaudio
+        except ImportError:
+            return None
+        file_format = {
+            "mp3": miniaudio.FileFormat.MP3,
+            "flac": miniaudio.FileFormat.FLAC,
+        }.get(audio_format)
+        if file_format is None:
+            return None
+        return cls(miniaudio, file_format)
+
+    @property
+    def data(self) -> bytes:
+        """收到的全部数据，未输出过PCM时用于整体重新解码"""
+        return bytes(self._data)
+
+    def decode(self, chunk: bytes, final: bool) -> bytes:
+        """追加数据并解码尽可能多的PCM，final为True时解码全部剩余数据"""
+        self._data.extend(chunk)
+        self._final = self._final or final
+        pcm = bytearray()
+        while not self._finished and (
+            self._final or len(self._data) - self._offset >= STREAM_DECODE_MARGIN
+        ):
+            if self._samples is None and not self._open():
+                break
+            try:
+                samples = next(self._samples)
+            except StopIteration:
+                self._finished = True
+                break
+            pcm.extend(samples.tobytes())
+        if pcm:
+            self.started = True
+            if self._offset - self._origin > STREAM_COMPACT_SIZE:
+                # 已解码的数据不再需要，保留到数据起点的相对位置
+                del self._data[self._origin : self._offset]
+                self._offset = self._origin
+        return bytes(pcm)
+
+    def close(self) -> None:
+        samples, self._samples = self._samples, None
+        if samples is not None:
+            samples.close()
+
+    def _read(self, num_bytes: int) -> bytes:
+        chunk = bytes(self._data[self._offset : self._offset + num_bytes])
+        self._offset += len(chunk)
+        return chunk
+
+    def _seek(self, offset: int, from_start: bool) -> bool:
+        """解码器初始化后会回到数据起点，只支持在已收到的数据范围内跳转"""
+        position = (self._origin if from_start else self._offset) + offset
+        if not self._origin <= position <= len(self._data):
+            return False
+        self._offset = position
+        return True
+
+    def _open(self) -> bool:
+        """创建解码器，开头的ID3标签完整收到后再开始，返回是否已创建"""
+        if self._data[:3] == b"ID3":
+            if len(self._data) < 10:
+                return self._final and self._open_decoder()
+            size = 10 + (
+                (self._data[6] & 0x7F) << 21
+                | (self._data[7] & 0x7F) << 14
+                | (self._data[8] & 0x7F) << 7
+                | (self._data[9] & 0x7F)
+            )
+            if self._data[5] & 0x10:
+                size += 10
+            if not self._final and len(self._data) < size + STREAM_DECODE_MARGIN:
+                return False
+            self._offset = min(size, len(self._data))
+        return self._open_decoder()
+
+    def _open_decoder(self) -> bool:
+        self._origin = self._offset
+        reader, seeker = self._read, self._seek
+        seek_start = self._miniaudio.SeekOrigin.START
+
+        class Source(self._miniaudio.StreamableSource):
+            def read(self, num_bytes):
+                return reader(num_bytes)
+
+            def seek(self, offset, origin):
+                return seeker(offset, origin == seek_start)
+
+        self._samples = self._miniaudio.stream_any(
+            Source(),
+            source_format=self._file_format,
+            output_format=self._miniaudio.SampleFormat.SIGNED16,
+            nchannels=1,
+            sample_rate=TARGET_SAMPLE_RATE,
+            frames_to_read=FRAME_SAMPLES,
+        )
+        return True
+
+
+class AudioStreamDecoder:
+    """边接收边解码的音频解码器
+
+    feed 传入任意长度的数据块，返回已经凑满的帧（Opus包或60ms的PCM）；
+    flush 在数据结束时补齐最后一帧。WAV/PCM按块解码，MP3/FLAC用miniaudio按块解码，
+    其他压缩格式（或未安装miniaudio时）在flush时整体解码。
+    speech为False时（音乐、提示音）使用Opus默认的编码参数，不按语音降低码率
+    """
+
+    def __init__(
+        self,
+        audio_format: str = "wav",
+        is_opus: bool = True,
+        sample_rate: int = TARGET_SAMPLE_RATE,
+        channels: int = 1,
+        speech: bool = True,
+    ):
+        self.audio_format = (audio_format or "wav").lower().lstrip(".")
+        self.is_opus = is_opus
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.sample_width = 2
+        self._format_detected = self.audio_format == "pcm"
+        self._header_parsed = self.audio_format == "pcm"
+        self._pending = bytearray()
+        self._stream = None
+        self._stream_checked = False
+        self._resampler = None
+        self._pcm = bytearray()
+        self._total_samples = 0
+        self._encoder = (
+            opus_encoder_pool.acquire(
+                sample_rate=TARGET_SAMPLE_RATE,
+                channels=1,
+                frame_size_ms=FRAME_DURATION_MS,
+                speech=speech,
+            )
+            if is_opus
+            else None
+        )
+
+    @property
+    def duration(self) -> float:
+        """已输出音频的时长（秒）"""
+        return self._total_samples / TARGET_SAMPLE_RATE
+
+    def feed(self, chunk: bytes) -> List[bytes]:
+        if not chunk:
+            return []
+        self._pending.extend(chunk)
+        if not self._format_detected:
+            if len(self._pending) < HEADER_BYTES:
+                # 文件头还不完整，凑够后再判断格式，避免把WAV误判为裸PCM
+                return []
+            self._detect_format()
+        if self.audio_format not in ("wav", "pcm"):
+            return self._decode_compressed(final=False)
+        if not self._header_parsed and not self._parse_wav_header():
+            return []
+        return self._decode_pending(final=False)
+
+    def flush(self) -> List[bytes]:
+        if not self._format_detected:
+            self._detect_format()
+        if self.audio_format not in ("wav", "pcm"):
+            return self._decode_compressed(final=True)
+        if not self._header_parsed:
+            # 数据不足一个WAV头，按裸PCM处理
+            self._header_parsed = True
+        return self._decode_pending(final=True)
+
+    def close(self) -> None:
+        """把编码器放回编码器池，可重复调用"""
+        encoder, self._encoder = self._encoder, None
+        opus_encoder_pool.release(encoder)
+        stream, self._stream = self._stream, None
+        if stream is not None:
+            stream.close()
+
+    def _detect_format(self) -> None:
+        self.audio_format = detect_audio_format(self._pending, self.audio_format)
+        self._format_detected = True
+        self._header_parsed = self.audio_format == "pcm"
+
+    def _decode_compressed(self, final: bool) -> List[bytes]:
+        """压缩格式能流式解码时按块解码，否则在数据结束时整体解码"""
+        if not self._stream_checked:
+            self._stream_checked = True
+            self._stream = CompressedStream.create(self.audio_format)
+        if self._stream is not None:
+            data = bytes(self._pending)
+            self._pending.clear()
+            try:
+                pcm = self._stream.decode(data, final)
+            except Exception as e:
+                stream, self._stream = self._stream, None
+                stream.close()
+                if stream.started:
+                    logger.bind(tag=TAG).error(f"音频流解码失败: {e}")
+                    return self._take_frames(final)
+                # 还没有输出过音频，退回整体解码
+                logger.bind(tag=TAG).warning(f"音频流解码失败，改为整体解码: {e}")
+                self._pending.extend(stream.data)
+            else:
+                self._total_samples += len(pcm) // 2
+                self._pcm.extend(pcm)
+                return self._take_frames(final)
+        if not final:
+            return []
+        pcm, sample_rate, channels = decode_compressed(
+            bytes(self._pending), self.audio_format
+        )
+        self._pending.clear()
+        self.sample_rate, self.channels, self.sample_width = sample_rate, channels, 2
+        self._pending.extend(pcm)
+        return self._decode_pending(final=True)
+
+    def _parse_wav_header(self) -> bool:
+        """解析WAV头，定位到data块后把剩余数据作为PCM，数据不够时返回False"""
+        data = self._pending
+        offset = 12
+        while offset + 8 <= len(data):
+            chunk_id = bytes(data[offset : offset + 4])
+            chunk_size = struct.unpack_from("<I", data, offset + 4)[0]
+            body = offset + 8
+            if chunk_id == b"fmt ":
+                if body + 16 > len(data):
+                    return False
+                fmt_tag, channels, sample_rate = struct.unpack_from("<HHI", data, body)
+                bits = struct.unpack_from("<H", data, body + 14)[0]
+                if fmt_tag not in (1, 0xFFFE) or bits not in (8, 16, 32):
+                    raise ValueError(f"不支持的WAV编码: format={fmt_tag}, bits={bits}")
+                self.channels, self.sample_rate = channels, sample_rate
+                self.sample_width = bits // 8
+            elif chunk_id == b"data":
+                del data[:body]
+                self._header_parsed = True
+                return True
+            offset = body + chunk_size + (chunk_size & 1)
+        return False
+
+    def _decode_pending(self, final: bool) -> List[bytes]:
+        frame_bytes = self.sample_width * self.channels
+        usable = len(self._pending) - len(self._pending) % frame_bytes
+        if usable:
+            samples = self._to_mono_int16(bytes(self._pending[:usable]))
+            del self._pending[:usable]
+            if self._resampler is None:
+                self._resampler = LinearResampler(self.sample_rate)
+            samples = self._resampler.process(samples)
+            self._total_samples += len(samples)
+            self._pcm.extend(samples.tobytes())
+        return self._take_frames(final)
+
+    def _to_mono_int16(self, raw: bytes) -> np.ndarray:
+        if self.sample_width == 1:
+            samples = (np.frombuffer(raw, dtype=np.uint8).astype(np.int16) - 128) << 8
+        elif self.sample_width == 4:
+            samples = (np.frombuffer(raw, dtype="<i4") >> 16).astype(np.int16)
+        else:
+            samples = np.frombuffer(raw, dtype="<i2")
+        if self.channels > 1:
+            samples = (
+                samples.reshape(-1, self.channels).mean(axis=1).astype(np.int16)
+            )
+        return samples
+
+    def _take_frames(self, final: bool) -> List[bytes]:
+        usable = len(self._pcm) - len(self._pcm) % FRAME_BYTES
+        if final and len(self._pcm) > usable:
+            # 最后一帧补零
+            self._pcm.extend(b"\x00" * (FRAME_BYTES - (len(self._pcm) - usable)))
+            usable = len(self._pcm)
+        if not usable:
+            return []
+        pcm = bytes(self._pcm[:usable])
+        del self._pcm[:usable]
+        if self.is_opus:
+            return self._encoder.encode_pcm_to_opus(pcm, end_of_stream=final)
+        return [pcm[i : i + FRAME_BYTES] for i in range(0, usable, FRAME_BYTES)]
+
+
+def decode_compressed(data: bytes, audio_format: str) -> Tuple[bytes, int, int]:
+    """解码MP3等压缩格式，返回(16位PCM, 采样率, 声道数)
+
+    优先使用进程内的miniaudio解码，未安装时退回pydub（依赖ffmpeg）
+    """
+    try:
+        import miniaudio
+
+        decoded = miniaudio.decode(
+            data,
+            output_format=miniaudio.SampleFormat.SIGNED16,
+            nchannels=1,
+            sample_rate=TARGET_SAMPLE_RATE,
+        )
+        return decoded.samples.tobytes(), TARGET_SAMPLE_RATE, 1
+    except ImportError:
+        logger.bind(tag=TAG).debug("未安装miniaudio，使用pydub解码")
+    except Exception as e:
+        logger.bind(tag=TAG).warning(f"miniaudio解码失败，使用pydub解码: {e}")
+
+    from pydub import AudioSegment
+
+    audio = AudioSegment.from_file(
+        io.BytesIO(data), format=audio_format, parameters=["-nostdin"]
+    )
+    audio = audio.set_channels(1).set_frame_rate(TARGET_SAMPLE_RATE).set_sample_width(2)
+    return audio.raw_data, TARGET_SAMPLE_RATE, 1
+
+
+def decode_audio_bytes(
+    data: bytes,
+    audio_format: Optional[str] = None,
+    is_opus: bool = True,
+    speech: bool = True,
+) -> Tuple[List[bytes], float]:
+    """把完整的音频数据转换为Opus包或PCM帧列表，返回(帧列表, 时长秒)"""
+    decoder = AudioStreamDecoder(audio_format or "wav", is_opus=is_opus, speech=speech)
+    try:
+        frames = decoder.feed(data)
+        frames.extend(decoder.flush())
+        return frames, decoder.duration
+    finally:
+        decoder.close()
@@ -0,0 +1,145 @@
+"""
+按需解码的音频文件源
+音乐等较长的音频在播放时每次只解码、编码一小批帧，单个收听者的内存占用与文件长度无关；
+p3文件通过内存映射逐帧读取，其他格式优先使用miniaudio流式解码
+"""
+
+import os
+import itertools
+import threading
+from typing import Iterator, List
+from config.logger import setup_logging
+from core.utils import p3
+from core.utils.runtime import runtime, WorkloadType
+from core.utils.audio_decoder import (
+    AudioStreamDecoder,
+    FRAME_DURATION_MS,
+    TARGET_SAMPLE_RATE,
+)
+
+TAG = __name__
+logger = setup_logging()
+
+FRAME_SAMPLES = TARGET_SAMPLE_RATE * FRAME_DURATION_MS // 1000
+# 每批解码的帧数（约1.2秒）
+BATCH_FRAMES = 20
+READ_CHUNK_SIZE = 64 * 1024
+
+
+class AudioFileStream:
+    """按批次异步产出Opus包（或PCM帧）的音频文件源，支持跳转和中止"""
+
+    def __init__(
+        self,
+        file_path: str,
+        is_opus: bool = True,
+        start_seconds: float = 0,
+        batch_frames: int = BATCH_FRAMES,
+    ):
+        self.file_path = file_path
+        self.is_opus = is_opus
+        self.batch_frames = batch_frames
+        self.closed = False
+        self._position = self._to_frame(start_seconds)
+        self._reader = None
+        self._lock = threading.Lock()
+
+    @property
+    def position(self) -> float:
+        """下一帧的播放位置（秒）"""
+        return self._position * FRAME_DURATION_MS / 1000
+
+    def seek(self, seconds: float) -> None:
+        """跳转到指定位置，下一批从该位置开始解码"""
+        with self._lock:
+            self._close_reader()
+            self._position = self._to_frame(seconds)
+
+    def close(self) -> None:
+        """中止播放并释放文件"""
+        with self._lock:
+            self.closed = True
+            self._close_reader()
+
+    def read_batch(self) -> List[bytes]:
+        """解码下一批帧，读完或已关闭时返回空列表"""
+        with self._lock:
+            if self.closed:
+                return []
+            if self._reader is None:
+                self._reader = self._open(self._position)
+            frames = list(itertools.islice(self._reader, self.batch_frames))
+            self._position += len(frames)
+            if not frames:
+                self._close_reader()
+            return frames
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> List[bytes]:
+        frames = await runtime.run(WorkloadType.AUDIO, self.read_batch)
+        if not frames:
+            raise StopAsyncIteration
+        return frames
+
+    @staticmethod
+    def _to_frame(seconds: float) -> int:
+        return max(0, int(seconds * 1000 // FRAME_DURATION_MS))
+
+    def _close_reader(self) -> None:
+        if self._reader is not None:
+            self._reader.close()
+            self._reader = None
+
+    def _open(self, start_frame: int) -> Iterator[bytes]:
+        if self.file_path.endswith(".p3"):
+            return p3.iter_opus_from_file(self.file_path, start_frame)
+        return self._decode_frames(start_frame)
+
+    def _decode_frames(self, start_frame: int) -> Iterator[bytes]:
+        try:
+            import miniaudio
+        except ImportError:
+            miniaudio = None
+
+        if miniaudio is not None:
+            # 流式解码为16kHz单声道PCM，直接从目标位置开始
+            decoder = AudioStreamDecoder("pcm", is_opus=self.is_opus, speech=False)
+            stream = miniaudio.stream_file(
+                self.file_path,
+                output_format=miniaudio.SampleFormat.SIGNED16,
+                nchannels=1,
+                sample_rate=TARGET_SAMPLE_RATE,
+                frames_to_read=FRAME_SAMPLES * self.batch_frames,
+                seek_frame=start_frame * FRAME_SAMPLES,
+            )
+            try:
+                for samples in stream:
+                    yield from decoder.feed(samples.tobytes())
+                yield from decoder.flush()
+            finally:
+                stream.close()
+                decoder.close()
+            return
+
+        # 未安装miniaudio时按块读取文件，WAV可边读边解码，压缩格式在读完后整体解码
+        audio_format = os.path.splitext(self.file_path)[1].lstrip(".")
+        decoder = AudioStreamDecoder(
+            audio_format, is_opus=self.is_opus, speech=False
+        )
+        skip = start_frame
+        try:
+            with open(self.file_path, "rb") as f:
+                while True:
+                    chunk = f.read(READ_CHUNK_SIZE)
+                    frames = decoder.feed(chunk) if chunk else decoder.flush()
+                    for frame in frames:
+                        if skip:
+                            skip -= 1
+                            continue
+                        yield frame
+                    if not chunk:
+                        break
+        finally:
+            decoder.close()
@@ -19,6 +19,7 @@ class CacheType(Enum):
     CONFIG = "config"
     DEVICE_PROMPT = "device_prompt"
     VOICEPRINT_HEALTH = "voiceprint_health"  # 声纹识别健康检查
+    TTS_PHRASE = "tts_phrase"  # TTS短句音频
 
 
 @dataclass
@@ -58,5 +59,8 @@ class CacheConfig:
             CacheType.VOICEPRINT_HEALTH: cls(
                 strategy=CacheStrategy.TTL, ttl=600, max_size=100  # 10分钟过期
             ),
+            CacheType.TTS_PHRASE: cls(
+                strategy=CacheStrategy.LRU, ttl=None, max_size=2000  # 按使用频率淘汰
+            ),
         }
         return configs.get(cache_type, cls())
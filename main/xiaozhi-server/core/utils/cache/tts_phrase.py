@@ -0,0 +1,141 @@
+"""
+TTS短句音频缓存
+按 TTS类型、音色参数和规范化后的文本做内容寻址，缓存可以直接发送的音频帧列表。
+内存层使用全局缓存管理器的LRU空间，Opus音频另外以p3格式落盘，重启后和其他进程仍可复用
+"""
+
+import os
+import re
+import hashlib
+import threading
+from typing import List, Optional
+from core.utils import p3
+from .manager import cache_manager
+from .config import CacheType
+
+
+class TTSPhraseCache:
+    """TTS短句音频缓存"""
+
+    def __init__(self):
+        self._logger = None
+        self.enabled = True
+        self.max_text_length = 30
+        self.disk_dir = None
+        self.report_interval = 500
+        self._lock = threading.Lock()
+        self._stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "stores": 0}
+
+    @property
+    def logger(self):
+        """延迟初始化 logger 以避免循环导入"""
+        if self._logger is None:
+            from config.logger import setup_logging
+
+            self._logger = setup_logging()
+        return self._logger
+
+    def configure(self, config: dict) -> None:
+        """根据配置中的tts_cache段设置缓存"""
+        cache_config = config.get("tts_cache") or {}
+        self.enabled = str(cache_config.get("enable", True)).lower() in (
+            "true",
+            "1",
+            "yes",
+        )
+        max_text_length = cache_config.get("max_text_length", "30")
+        self.max_text_length = int(max_text_length) if max_text_length else 30
+        self.disk_dir = cache_config.get("disk_dir") or None
+        if self.enabled and self.disk_dir:
+            os.makedirs(self.disk_dir, exist_ok=True)
+
+    @staticmethod
+    def normalize_text(text: str) -> str:
+        """规范化文本：合并空白、去掉首尾空白"""
+        return re.sub(r"\s+", " ", text or "").strip()
+
+    def make_key(
+        self, provider: str, identity: str, text: str, audio_format: str
+    ) -> Optional[str]:
+        """生成缓存键，不适合缓存的文本返回None"""
+        if not self.enabled:
+            return None
+        text = self.normalize_text(text)
+        if not text or len(text) > self.max_text_length:
+            return None
+        raw = "\x1f".join((provider, identity, audio_format, text))
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[List[bytes]]:
+        """查询缓存，先查内存再查磁盘"""
+        audio_datas = cache_manager.get(CacheType.TTS_PHRASE, key)
+        if audio_datas is not None:
+            self._record("memory_hits")
+            return audio_datas
+
+        disk_file = self._disk_file(key)
+        if disk_file and os.path.exists(disk_file):
+            try:
+                audio_datas, _ = p3.decode_opus_from_file(disk_file)
+                audio_datas = tuple(audio_datas)
+                cache_manager.set(CacheType.TTS_PHRASE, key, audio_datas)
+                self._record("disk_hits")
+                return audio_datas
+            except Exception as e:
+                self.logger.warning(f"读取TTS磁盘缓存失败: {disk_file}, {e}")
+
+        self._record("misses")
+        return None
+
+    def put(self, key: str, audio_datas: List[bytes], persist: bool = True) -> None:
+        """写入缓存，persist为True时同时写入磁盘（仅用于Opus音频）"""
+        if not key or not audio_datas:
+            return
+        # 多个连接共享同一份音频，存为不可变的元组
+        audio_datas = tuple(audio_datas)
+        cache_manager.set(CacheType.TTS_PHRASE, key, audio_datas)
+        self._record("stores")
+
+        disk_file = self._disk_file(key) if persist else None
+        if disk_file and not os.path.exists(disk_file):
+            tmp_file = f"{disk_file}.{threading.get_ident()}.tmp"
+            try:
+                p3.encode_opus_to_file(audio_datas, tmp_file)
+                os.replace(tmp_file, disk_file)
+            except Exception as e:
+                self.logger.warning(f"写入TTS磁盘缓存失败: {disk_file}, {e}")
+                if os.path.exists(tmp_file):
+                    os.remove(tmp_file)
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+        lookups = stats["memory_hits"] + stats["disk_hits"] + stats["misses"]
+        hits = stats["memory_hits"] + stats["disk_hits"]
+        stats["hit_ratio"] = hits / lookups if lookups else 0.0
+        return stats
+
+    def _disk_file(self, key: str) -> Optional[str]:
+        if not self.disk_dir:
+            return None
+        return os.path.join(self.disk_dir, f"{key}.p3")
+
+    def _record(self, name: str) -> None:
+        with self._lock:
+            self._stats[name] += 1
+            lookups = (
+                self._stats["memory_hits"]
+                + self._stats["disk_hits"]
+                + self._stats["misses"]
+            )
+        if name != "stores" and lookups % self.report_interval == 0:
+            stats = self.stats()
+            self.logger.info(
+                f"TTS缓存统计: 内存命中{stats['memory_hits']}次, "
+                f"磁盘命中{stats['disk_hits']}次, 未命中{stats['misses']}次, "
+                f"命中率{stats['hit_ratio']:.1%}"
+            )
+
+
+# 创建全局TTS短句缓存实例
+tts_phrase_cache = TTSPhraseCache()
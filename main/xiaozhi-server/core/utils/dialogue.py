@@ -1,7 +1,36 @@
+import json
 import uuid
-import re
 from typing import List, Dict
 from datetime import datetime
+from core.utils.textUtils import estimate_tokens
+from core.utils.prompt_layout import build_volatile_message, insert_volatile_message
+
+# 每条消息除内容外的固定开销（角色、分隔符等）
+MESSAGE_TOKEN_OVERHEAD = 4
+# 超出预算时淘汰旧消息，直到窗口降到预算的这个比例，避免每轮都淘汰导致前缀缓存频繁失效
+WINDOW_LOW_WATERMARK = 0.75
+
+SUMMARY_PROMPT = (
+    "你负责压缩一段语音助手与用户的历史对话。请结合已有摘要和新移出的对话，"
+    "用简洁的中文写出新的对话摘要，保留用户的称呼、偏好、提到的重要事实和未完成的事项，"
+    "不要编造内容，不超过200字，直接输出摘要正文。"
+)
+
+
+def format_summary_input(messages, previous_summary: str = None) -> str:
+    """把已有摘要和移出窗口的消息拼接为摘要请求的输入"""
+    lines = []
+    if previous_summary:
+        lines.append(f"已有摘要：\n{previous_summary}\n")
+    lines.append("新移出的对话：")
+    for m in messages:
+        if m.role == "user":
+            lines.append(f"用户：{m.content}")
+        elif m.role == "assistant" and m.content:
+            lines.append(f"助手：{m.content}")
+        elif m.role == "tool" and m.content:
+            lines.append(f"工具结果：{m.content}")
+    return "\n".join(lines)
 
 
 class Message:
@@ -13,37 +42,101 @@ class Message:
         tool_calls=None,
         tool_call_id=None,
     ):
-        self.uniq_id = uniq_id if uniq_id is not None else str(uuid.uuid4())
+        self._uniq_id = uniq_id
         self.role = role
         self.content = content
         self.tool_calls = tool_calls
         self.tool_call_id = tool_call_id
+        # 是否已移出对话窗口（仍保留在完整的对话记录中）
+        self.evicted = False
+        self._dict = None
+        self._tokens = None
+
+    @property
+    def uniq_id(self) -> str:
+        """首次访问时才生成ID"""
+        if self._uniq_id is None:
+            self._uniq_id = str(uuid.uuid4())
+        return self._uniq_id
+
+    def to_dict(self) -> Dict:
+        """转换为请求大模型的消息格式，结果缓存，每轮请求不再重复构建"""
+        if self._dict is None:
+            if self.tool_calls is not None:
+                self._dict = {"role": self.role, "tool_calls": self.tool_calls}
+            elif self.role == "tool":
+                if self.tool_call_id is None:
+                    # 只生成一次，多轮请求中保持不变
+                    self.tool_call_id = str(uuid.uuid4())
+                self._dict = {
+                    "role": self.role,
+                    "tool_call_id": self.tool_call_id,
+                    "content": self.content,
+                }
+            else:
+                self._dict = {"role": self.role, "content": self.content}
+        return self._dict
+
+    @property
+    def tokens(self) -> int:
+        """本地估算的token数"""
+        if self._tokens is None:
+            tokens = estimate_tokens(self.content) + MESSAGE_TOKEN_OVERHEAD
+            if self.tool_calls is not None:
+                tokens += estimate_tokens(
+                    json.dumps(self.tool_calls, ensure_ascii=False)
+                )
+            self._tokens = tokens
+        return self._tokens
 
 
 class Dialogue:
-    def __init__(self):
-        self.dialogue: List[Message] = []
+    def __init__(self, static_prefix: bool = True, max_tokens: int = 0):
+        # 完整的对话记录，用于保存记忆和意图识别
+        self._dialogue: List[Message] = []
+        # 为True时实时上下文和记忆放在最后一条用户消息之前单独的消息中，系统提示词保持不变以命中前缀缓存；
+        # 为False时拼接在系统提示词末尾
+        self.static_prefix = static_prefix
+        # 请求大模型的对话窗口的token预算（本地估算），0表示不限制
+        self.max_tokens = max_tokens
+        # 移出窗口的历史对话的滚动摘要
+        self.summary = None
+        # 窗口内的非系统消息、对应的消息字典和估算的token数
+        self._window: List[Message] = []
+        self._window_dicts: List[Dict] = []
+        self._window_tokens = 0
+        # 已移出窗口、尚未生成摘要的消息
+        self._evicted: List[Message] = []
         # 获取当前时间
         self.current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
+    @property
+    def dialogue(self) -> List[Message]:
+        return self._dialogue
+
+    @dialogue.setter
+    def dialogue(self, messages: List[Message]):
+        """替换对话记录（如清理工具消息），按新的记录重建窗口"""
+        self._dialogue = list(messages)
+        self._window = []
+        self._window_dicts = []
+        self._window_tokens = 0
+        for m in self._dialogue:
+            if m.role != "system" and not m.evicted:
+                self._append_window(m)
+
     def put(self, message: Message):
-        self.dialogue.append(message)
+        self._dialogue.append(message)
+        if message.role != "system":
+            self._append_window(message)
+
+    def _append_window(self, message: Message):
+        self._window.append(message)
+        self._window_dicts.append(message.to_dict())
+        self._window_tokens += message.tokens
 
     def getMessages(self, m, dialogue):
-        if m.tool_calls is not None:
-            dialogue.append({"role": m.role, "tool_calls": m.tool_calls})
-        elif m.role == "tool":
-            dialogue.append(
-                {
-                    "role": m.role,
-                    "tool_call_id": (
-                        str(uuid.uuid4()) if m.tool_call_id is None else m.tool_call_id
-                    ),
-                    "content": m.content,
-                }
-            )
-        else:
-            dialogue.append({"role": m.role, "content": m.content})
+        dialogue.append(m.to_dict())
 
     def get_llm_dialogue(self) -> List[Dict[str, str]]:
         # 直接调用get_llm_dialogue_with_memory，传入None作为memory_str
@@ -53,30 +146,79 @@ class Dialogue:
     def update_system_message(self, new_content: str):
         """更新或添加系统消息"""
         # 查找第一个系统消息
-        system_msg = next((msg for msg in self.dialogue if msg.role == "system"), None)
+        system_msg = next((msg for msg in self._dialogue if msg.role == "system"), None)
         if system_msg:
             system_msg.content = new_content
+            system_msg._tokens = None
         else:
             self.put(Message(role="system", content=new_content))
 
+    def take_evicted(self) -> List[Message]:
+        """取出已移出窗口、尚未生成摘要的消息"""
+        evicted, self._evicted = self._evicted, []
+        return evicted
+
+    def _fit_window(self, reserved_tokens: int):
+        """超出预算时按整轮对话淘汰最早的消息
+
+        从用户消息处切分，工具调用和工具结果总在同一轮中一起淘汰；
+        当前一轮（最后一条用户消息及之后）不会被淘汰
+        """
+        if self.max_tokens <= 0:
+            return
+        if reserved_tokens + self._window_tokens <= self.max_tokens:
+            return
+        target = self.max_tokens * WINDOW_LOW_WATERMARK - reserved_tokens
+        last_user = next(
+            (
+                i
+                for i in range(len(self._window) - 1, -1, -1)
+                if self._window[i].role == "user"
+            ),
+            0,
+        )
+        cut = 0
+        tokens = self._window_tokens
+        while cut < last_user and tokens > target:
+            # 移出一整轮：到下一条用户消息为止
+            end = cut + 1
+            while end < last_user and self._window[end].role != "user":
+                end += 1
+            tokens -= sum(m.tokens for m in self._window[cut:end])
+            cut = end
+        if cut == 0:
+            return
+        for m in self._window[:cut]:
+            m.evicted = True
+        self._evicted.extend(self._window[:cut])
+        del self._window[:cut]
+        del self._window_dicts[:cut]
+        self._window_tokens = tokens
+
     def get_llm_dialogue_with_memory(
-        self, memory_str: str = None, voiceprint_config: dict = None
+        self,
+        memory_str: str = None,
+        voiceprint_config: dict = None,
+        context: str = None,
     ) -> List[Dict[str, str]]:
+        """构建请求大模型的对话，context为本轮的实时上下文（时间、天气、位置等）"""
         # 构建对话
         dialogue = []
+        volatile = build_volatile_message(context, memory_str)
 
-        # 添加系统提示和记忆
+        # 添加系统提示
         system_message = next(
-            (msg for msg in self.dialogue if msg.role == "system"), None
+            (msg for msg in self._dialogue if msg.role == "system"), None
         )
 
         if system_message:
             # 基础系统提示
             enhanced_system_prompt = system_message.content
-            # 替换时间占位符
-            enhanced_system_prompt = enhanced_system_prompt.replace(
-                "{{current_time}}", datetime.now().strftime("%H:%M")
-            )
+            # 替换时间占位符，自定义提示词中可能仍然使用，会使前缀缓存失效
+            if "{{current_time}}" in enhanced_system_prompt:
+                enhanced_system_prompt = enhanced_system_prompt.replace(
+                    "{{current_time}}", datetime.now().strftime("%H:%M")
+                )
 
             # 添加说话人个性化描述
             try:
@@ -100,19 +242,26 @@ class Dialogue:
                 # 配置读取失败时忽略错误，不影响其他功能
                 pass
 
-            # 使用正则表达式匹配 <memory> 标签，不管中间有什么内容
-            if memory_str is not None:
-                enhanced_system_prompt = re.sub(
-                    r"<memory>.*?</memory>",
-                    f"<memory>\n{memory_str}\n</memory>",
-                    enhanced_system_prompt,
-                    flags=re.DOTALL,
-                )
+            if volatile and not self.static_prefix:
+                enhanced_system_prompt += "\n\n" + volatile
+                volatile = None
             dialogue.append({"role": "system", "content": enhanced_system_prompt})
 
-        # 添加用户和助手的对话
-        for m in self.dialogue:
-            if m.role != "system":  # 跳过原始的系统消息
-                self.getMessages(m, dialogue)
+        # 移出窗口的历史对话以摘要的形式紧跟在系统提示词之后
+        if self.summary:
+            dialogue.append(
+                {"role": "system", "content": f"<summary>\n{self.summary}\n</summary>"}
+            )
+
+        # 系统提示词、摘要和实时上下文始终保留，剩余预算留给历史对话
+        reserved_tokens = sum(
+            estimate_tokens(m["content"]) + MESSAGE_TOKEN_OVERHEAD for m in dialogue
+        ) + estimate_tokens(volatile)
+        self._fit_window(reserved_tokens)
+
+        # 添加用户和助手的对话，消息字典已缓存，只需拼接列表
+        dialogue.extend(self._window_dicts)
 
+        # 每轮变化的内容放在最后一条用户消息之前，前面的系统提示词和历史对话保持不变
+        insert_volatile_message(dialogue, volatile)
         return dialogue
@@ -0,0 +1,126 @@
+"""
+上游HTTP客户端
+基于HTTP的TTS、ASR和LLM服务共用进程级的httpx客户端：按服务地址（协议+主机+端口）保持长连接池，
+可选HTTP/2，超时和并发上限可在各Provider的配置中单独设置（timeout、max_concurrency），
+大响应和SSE流通过 client.stream 边收边处理。相同服务的请求不再每次重新做DNS、TCP和TLS握手
+"""
+
+import asyncio
+import threading
+import weakref
+import importlib.util
+from urllib.parse import urlsplit
+
+import httpx
+
+from config.logger import setup_logging
+
+TAG = __name__
+logger = setup_logging()
+
+
+def _parse_float(value, default):
+    return float(value) if value else default
+
+
+def _parse_int(value, default):
+    return int(value) if value else default
+
+
+class HttpClientManager:
+    """按服务地址和Provider参数缓存httpx客户端
+
+    异步客户端与事件循环绑定，每个事件循环（主循环或线程池中的常驻循环）各自持有一份；
+    同步客户端线程安全，整个进程共用
+    """
+
+    def __init__(self):
+        self.http2 = False
+        # 每个客户端的连接数上限和保持的空闲连接数
+        self.max_connections = 100
+        self.max_keepalive = 20
+        # 空闲连接保持时间（秒）
+        self.keepalive_expiry = 30.0
+        # 默认超时（秒），Provider配置了timeout时以Provider为准
+        self.timeout = 60.0
+        self.connect_timeout = 5.0
+        # 事件循环 -> {客户端键: AsyncClient}
+        self._async_clients = weakref.WeakKeyDictionary()
+        self._sync_clients = {}
+        self._lock = threading.Lock()
+
+    def configure(self, config: dict) -> None:
+        """根据配置中的http_client段设置客户端参数"""
+        client_config = config.get("http_client") or {}
+        http2 = str(client_config.get("http2", False)).lower() in ("true", "1", "yes")
+        if http2 and importlib.util.find_spec("h2") is None:
+            logger.bind(tag=TAG).warning("未安装h2，HTTP/2不可用，使用HTTP/1.1")
+            http2 = False
+        self.http2 = http2
+        self.max_connections = _parse_int(client_config.get("max_connections"), 100)
+        self.max_keepalive = _parse_int(client_config.get("max_keepalive"), 20)
+        self.keepalive_expiry = _parse_float(
+            client_config.get("keepalive_expiry"), 30.0
+        )
+        self.timeout = _parse_float(client_config.get("timeout"), 60.0)
+        self.connect_timeout = _parse_float(client_config.get("connect_timeout"), 5.0)
+
+    def get(self, url: str, config: dict = None) -> httpx.AsyncClient:
+        """返回当前事件循环中url所在服务的异步客户端，config为Provider配置"""
+        loop = asyncio.get_running_loop()
+        key = self._client_key(url, config)
+        with self._lock:
+            clients = self._async_clients.get(loop)
+            if clients is None:
+                clients = self._async_clients[loop] = {}
+            client = clients.get(key)
+            if client is None or client.is_closed:
+                client = clients[key] = httpx.AsyncClient(**self._client_options(key))
+            return client
+
+    def get_sync(self, url: str, config: dict = None) -> httpx.Client:
+        """返回url所在服务的同步客户端，供线程中的同步代码（如LLM生成器）使用"""
+        key = self._client_key(url, config)
+        with self._lock:
+            client = self._sync_clients.get(key)
+            if client is None or client.is_closed:
+                client = self._sync_clients[key] = httpx.Client(
+                    **self._client_options(key)
+                )
+            return client
+
+    def close(self) -> None:
+        """关闭同步客户端，异步客户端随所属事件循环释放"""
+        with self._lock:
+            clients = list(self._sync_clients.values())
+            self._sync_clients.clear()
+        for client in clients:
+            client.close()
+
+    def _client_key(self, url: str, config: dict = None):
+        parts = urlsplit(url)
+        config = config or {}
+        timeout = _parse_float(config.get("timeout"), self.timeout)
+        max_concurrency = _parse_int(config.get("max_concurrency"), 0)
+        return (parts.scheme, parts.netloc, timeout, max_concurrency)
+
+    def _client_options(self, key) -> dict:
+        _, _, timeout, max_concurrency = key
+        # 并发上限通过连接数限制实现，超出的请求排队等待空闲连接；
+        # HTTP/2会在一个连接上并发多个请求，设置了并发上限的客户端只用HTTP/1.1
+        max_connections = max_concurrency or self.max_connections
+        return {
+            "http2": self.http2 and not max_concurrency,
+            "timeout": httpx.Timeout(
+                timeout, connect=min(self.connect_timeout, timeout)
+            ),
+            "limits": httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=min(self.max_keepalive, max_connections),
+                keepalive_expiry=self.keepalive_expiry,
+            ),
+        }
+
+
+# 创建全局HTTP客户端实例
+http_client = HttpClientManager()
@@ -0,0 +1,272 @@
+"""
+本地意图快速识别
+在请求意图识别大模型之前，先用关键词/正则规则（以及可选的fastText分类模型）识别明确的意图：
+明显的闲聊、退出、调节音量亮度、播放音乐等直接在本地决定，只有不确定的输入才交给大模型，
+大多数轮次可以省去一次大模型往返
+"""
+
+import re
+import json
+import threading
+import importlib.util
+from typing import Optional, Set
+from core.utils.music_catalog import MusicCatalog
+from config.logger import setup_logging
+
+TAG = __name__
+logger = setup_logging()
+
+# 去掉标点和空白后再匹配规则
+_PUNCTUATION = re.compile(r"[\s，。！？、,.!?~～…；;：:\"'“”‘’]+")
+
+# 出现这些词时可能需要调用工具（天气、新闻、时间、智能家居、角色切换等），闲聊规则不做判断
+TOOL_KEYWORDS = re.compile(
+    r"天气|气温|下雨|新闻|几点|时间|日期|星期|农历|阴历|黄历|节气|打开|关闭|关掉|开灯|关灯|"
+    r"空调|灯|窗帘|温度|湿度|音量|声音|亮度|屏幕|音乐|歌|播放|切换|角色|插件|提醒|闹钟|再见|拜拜|退出"
+)
+
+# 明确的闲聊
+CHAT_PATTERNS = [
+    re.compile(
+        r"^(你好|您好|嗨|哈喽|哈啰|hello|hi|早上好|早安|中午好|下午好|晚上好|晚安)"
+        r"(呀|啊|哇|吖|小智)?$",
+        re.IGNORECASE,
+    ),
+    re.compile(r"^(你|您)(是谁|叫什么名字?|几岁了?|多大了?|是男生还是女生|喜欢什么)(呀|啊|呢)?$"),
+    re.compile(r"^(给我|跟我|和我)?(讲|说)(一?个|一段)(故事|笑话|谜语|绕口令)(吧|呀|啊)?$"),
+    re.compile(r"^(谢谢|谢谢你|多谢|好的|好吧|嗯嗯?|哈哈+|真棒|你真棒|你真聪明)(呀|啊|了|小智)?$"),
+    re.compile(r"^我(今天)?(好|很|有点|特别|非常)?(开心|高兴|难过|伤心|无聊|累|困|饿|生气)(了|啊|呀)?$"),
+]
+
+# 退出
+EXIT_PATTERN = re.compile(
+    r"^(好了?|那|那就)?(再见|拜拜|bye|byebye|退下吧?|我(要)?走了|不聊了|先这样吧?|结束对话)"
+    r"(了|吧|啦|啊|小智)?$",
+    re.IGNORECASE,
+)
+
+# 音量/亮度：设备类型, 正则, 动作
+DEVICE_RULES = [
+    ("Speaker", re.compile(r"^(请|帮我)?(把)?(音量|声音)(调|开|放|设置?)(到|为|成)(?P<value>\d{1,3})(%|的)?$"), "set"),
+    ("Screen", re.compile(r"^(请|帮我)?(把)?(屏幕)?亮度(调|开|设置?)(到|为|成)(?P<value>\d{1,3})(%|的)?$"), "set"),
+    (
+        "Speaker",
+        re.compile(r"^(请|帮我)?(把)?(音量|声音)(调|开|放)?(大|高)(一)?(点|些)(儿)?(吧)?$|^大声(一)?点(儿)?(吧)?$"),
+        "raise",
+    ),
+    (
+        "Speaker",
+        re.compile(r"^(请|帮我)?(把)?(音量|声音)(调|开|放)?(小|低)(一)?(点|些)(儿)?(吧)?$|^小声(一)?点(儿)?(吧)?$"),
+        "lower",
+    ),
+    ("Screen", re.compile(r"^(请|帮我)?(把)?(屏幕)?亮度(调)?(高|大|亮)(一)?(点|些)(儿)?(吧)?$"), "raise"),
+    ("Screen", re.compile(r"^(请|帮我)?(把)?(屏幕)?亮度(调)?(低|小|暗)(一)?(点|些)(儿)?(吧)?$"), "lower"),
+    ("Speaker", re.compile(r"^(现在)?(音量|声音)(是)?多(少|大)(了)?$"), "get"),
+    ("Screen", re.compile(r"^(现在)?(屏幕)?亮度(是)?多(少|大)(了)?$"), "get"),
+]
+
+# 播放音乐：未指定歌名 / 指定歌名
+MUSIC_RANDOM_PATTERN = re.compile(
+    r"^(请|帮我|给我)?(播放|放|来|唱)(一)?(首|个|段|点)?(音乐|歌|歌曲|儿歌)(吧|啊|呀|听听?)?$"
+)
+MUSIC_SONG_PATTERN = re.compile(
+    r"^(请|帮我|给我)?(播放音乐|播放一首|播放|放一首|来一首|唱一首)(歌曲|歌)?"
+    r"(?P<song>.{1,20}?)(这首歌|的歌|吧|啊)?$"
+)
+# 播放的不是音乐（新闻、故事、电台等）时交给大模型
+NOT_MUSIC_KEYWORDS = re.compile(r"新闻|天气|故事|广播|电台|视频|节目|相声|评书")
+# 指定歌名时，只有在音乐目录中找到足够相似的歌曲才在本地决定，比播放时的模糊匹配更严格，
+# 避免“播放暂停”“来一首唐诗”等被当作歌名
+SONG_MATCH_RATIO = 0.75
+
+# 规则的置信度，阈值以下的交给大模型
+CONFIDENCE = {
+    "handle_exit_intent": 0.95,
+    "handle_device": 0.95,
+    "play_music_random": 0.95,
+    "play_music_song": 0.85,
+    "continue_chat": 0.9,
+}
+
+# 不在当前函数列表中也可以执行的意图，play_music在执行前按需注册
+ALWAYS_AVAILABLE = {"continue_chat", "play_music"}
+
+# 可以只根据标签确定参数的意图，模型识别到其他标签时仍交给大模型
+MODEL_LABELS = {"continue_chat", "handle_exit_intent", "play_music"}
+
+
+class LocalIntentClassifier:
+    """本地意图分类器，只给出高置信度的结果，其余交给大模型"""
+
+    def __init__(self):
+        self.enabled = True
+        # 置信度阈值，低于阈值的交给大模型
+        self.threshold = 0.8
+        self.model_path = None
+        self.report_interval = 200
+        self._model = None
+        self._lock = threading.Lock()
+        self._stats = {"total": 0, "rule": 0, "model": 0, "fallthrough": 0}
+        self._labels = {}
+
+    def configure(self, config: dict) -> None:
+        """根据配置中的local_intent段设置分类器"""
+        intent_config = config.get("local_intent") or {}
+        self.enabled = str(intent_config.get("enable", True)).lower() in (
+            "true",
+            "1",
+            "yes",
+        )
+        threshold = intent_config.get("threshold", "0.8")
+        self.threshold = float(threshold) if threshold else 0.8
+        report_interval = intent_config.get("report_interval", "200")
+        self.report_interval = int(report_interval) if report_interval else 200
+        self.model_path = intent_config.get("model_path") or None
+        self._model = None
+        if self.enabled and self.model_path:
+            self._model = self._load_model(self.model_path)
+        logger.bind(tag=TAG).info(
+            f"本地意图识别: {'开启' if self.enabled else '关闭'}, 阈值: {self.threshold}, "
+            f"模型: {self.model_path if self._model is not None else '无（仅规则）'}"
+        )
+
+    @staticmethod
+    def _load_model(model_path: str):
+        """加载可选的fastText分类模型，未安装fasttext或加载失败时只使用规则"""
+        if importlib.util.find_spec("fasttext") is None:
+            logger.bind(tag=TAG).warning("未安装fasttext，本地意图识别只使用规则")
+            return None
+        try:
+            import fasttext
+
+            return fasttext.load_model(model_path)
+        except Exception as e:
+            logger.bind(tag=TAG).error(f"加载本地意图模型失败: {model_path}, {e}")
+            return None
+
+    def classify(
+        self,
+        text: str,
+        functions: Set[str],
+        catalog: Optional[MusicCatalog] = None,
+    ) -> Optional[str]:
+        """识别明确的意图，返回与意图识别大模型相同格式的JSON字符串；不确定时返回None
+
+        functions为当前可用的函数名，不可用的意图交给大模型；
+        catalog为已加载的音乐目录，指定的歌名不在目录中（或目录未加载）时交给大模型
+        """
+        if not self.enabled:
+            return None
+        clean_text = _PUNCTUATION.sub("", text or "")
+        if not clean_text:
+            return None
+
+        source = "rule"
+        decision = self._match_rules(clean_text, catalog)
+        if decision is None and self._model is not None:
+            source = "model"
+            decision = self._predict(clean_text)
+
+        if decision is not None:
+            name, arguments, confidence = decision
+            if confidence < self.threshold or (
+                name not in ALWAYS_AVAILABLE and name not in functions
+            ):
+                decision = None
+
+        self._record(source if decision is not None else "fallthrough", decision)
+        if decision is None:
+            return None
+        name, arguments, confidence = decision
+        logger.bind(tag=TAG).debug(
+            f"本地识别到意图: {name}, 参数: {arguments}, 置信度: {confidence}, 来源: {source}"
+        )
+        function_call = {"name": name}
+        if arguments:
+            function_call["arguments"] = arguments
+        return json.dumps({"function_call": function_call}, ensure_ascii=False)
+
+    def _match_rules(self, text: str, catalog: Optional[MusicCatalog] = None):
+        """按规则匹配，返回(函数名, 参数, 置信度)"""
+        if EXIT_PATTERN.match(text):
+            return "handle_exit_intent", {}, CONFIDENCE["handle_exit_intent"]
+
+        for device_type, pattern, action in DEVICE_RULES:
+            match = pattern.match(text)
+            if match:
+                arguments = {"device_type": device_type, "action": action}
+                if action == "set":
+                    arguments["value"] = min(100, int(match.group("value")))
+                return "handle_device", arguments, CONFIDENCE["handle_device"]
+
+        if MUSIC_RANDOM_PATTERN.match(text):
+            return (
+                "play_music",
+                {"song_name": "random"},
+                CONFIDENCE["play_music_random"],
+            )
+        match = MUSIC_SONG_PATTERN.match(text)
+        if (
+            match
+            and catalog is not None
+            and not NOT_MUSIC_KEYWORDS.search(match.group("song"))
+            and catalog.search(match.group("song"), min_ratio=SONG_MATCH_RATIO)
+        ):
+            return (
+                "play_music",
+                {"song_name": match.group("song")},
+                CONFIDENCE["play_music_song"],
+            )
+
+        if not TOOL_KEYWORDS.search(text):
+            for pattern in CHAT_PATTERNS:
+                if pattern.match(text):
+                    return "continue_chat", {}, CONFIDENCE["continue_chat"]
+        return None
+
+    def _predict(self, text: str):
+        """用分类模型预测，标签格式为__label__函数名"""
+        try:
+            labels, probs = self._model.predict(text)
+        except Exception as e:
+            logger.bind(tag=TAG).error(f"本地意图模型预测失败: {e}")
+            return None
+        if not labels:
+            return None
+        name = labels[0].replace("__label__", "")
+        if name not in MODEL_LABELS:
+            return None
+        # 带参数的工具（如调节音量）需要大模型提取参数
+        if name == "continue_chat" and TOOL_KEYWORDS.search(text):
+            return None
+        arguments = {"song_name": "random"} if name == "play_music" else {}
+        return name, arguments, float(probs[0])
+
+    def _record(self, source: str, decision) -> None:
+        with self._lock:
+            self._stats["total"] += 1
+            self._stats[source] += 1
+            if decision is not None:
+                self._labels[decision[0]] = self._labels.get(decision[0], 0) + 1
+            total = self._stats["total"]
+        if self.report_interval and total % self.report_interval == 0:
+            stats = self.stats()
+            logger.bind(tag=TAG).info(
+                f"本地意图识别统计: 共{stats['total']}次, 规则{stats['rule']}次, "
+                f"模型{stats['model']}次, 交给大模型{stats['fallthrough']}次, "
+                f"交给大模型比例{stats['fallthrough_rate']:.2%}, 阈值{stats['threshold']}, "
+                f"各意图: {stats['labels']}"
+            )
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["labels"] = dict(self._labels)
+        total = stats["total"]
+        stats["fallthrough_rate"] = stats["fallthrough"] / total if total else 0.0
+        stats["threshold"] = self.threshold
+        return stats
+
+
+# 创建全局本地意图分类器实例
+intent_classifier = LocalIntentClassifier()
@@ -0,0 +1,274 @@
+"""
+本地音乐目录索引
+歌曲列表持久化在SQLite中，按目录修改时间增量更新，只重新扫描发生变化的目录；
+内存中维护字符二元组（以及可选的拼音）倒排索引，模糊查找时只对少量候选计算相似度
+"""
+
+import os
+import re
+import time
+import random
+import sqlite3
+import difflib
+import threading
+from collections import defaultdict
+from typing import Dict, List, Optional, Set, Tuple
+from config.logger import setup_logging
+
+try:
+    from pypinyin import lazy_pinyin
+except ImportError:  # 可选依赖，未安装时只使用字符索引
+    lazy_pinyin = None
+
+TAG = __name__
+logger = setup_logging()
+
+# 进入相似度精排的候选数量
+RERANK_SIZE = 50
+# 与原逐个比较方式一致的最低相似度
+MIN_MATCH_RATIO = 0.4
+
+
+def normalize_name(text: str) -> str:
+    """统一大小写并去掉标点和空白"""
+    return re.sub(r"[\W_]+", "", text or "").lower()
+
+
+def _to_pinyin(text: str) -> List[str]:
+    if lazy_pinyin is None or not text:
+        return []
+    return [p for p in lazy_pinyin(text) if p]
+
+
+def _grams(name: str) -> Set[str]:
+    """字符二元组，单字名称使用自身"""
+    if len(name) < 2:
+        return {name} if name else set()
+    return {name[i : i + 2] for i in range(len(name) - 1)}
+
+
+def _pinyin_grams(syllables: List[str]) -> Set[str]:
+    if len(syllables) < 2:
+        return {f"py:{s}" for s in syllables}
+    return {
+        f"py:{syllables[i]} {syllables[i + 1]}" for i in range(len(syllables) - 1)
+    }
+
+
+class MusicCatalog:
+    """本地音乐目录"""
+
+    def __init__(
+        self,
+        music_dir: str,
+        music_ext,
+        catalog_file: str = "data/.music_catalog.db",
+        refresh_time: float = 60,
+    ):
+        self.music_dir = os.path.abspath(music_dir)
+        self.music_ext = tuple(ext.lower() for ext in music_ext)
+        self.catalog_file = catalog_file
+        self.refresh_time = refresh_time
+        self.scan_time = 0.0
+        self._refresh_lock = threading.Lock()
+        # 内存索引整体替换，查找时无需加锁
+        self._songs: List[str] = []
+        self._names: List[str] = []
+        self._pinyins: List[str] = []
+        self._index: Dict[str, List[int]] = {}
+
+        catalog_dir = os.path.dirname(self.catalog_file)
+        if catalog_dir:
+            os.makedirs(catalog_dir, exist_ok=True)
+        with self._connect() as db:
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS dirs ("
+                "root TEXT, path TEXT, parent TEXT, mtime REAL, "
+                "PRIMARY KEY (root, path))"
+            )
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS songs ("
+                "root TEXT, path TEXT, dir TEXT, "
+                "PRIMARY KEY (root, path))"
+            )
+            db.execute("CREATE INDEX IF NOT EXISTS songs_dir ON songs (root, dir)")
+
+    @property
+    def music_files(self) -> List[str]:
+        """全部歌曲的相对路径"""
+        return self._songs
+
+    def __len__(self) -> int:
+        return len(self._songs)
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.catalog_file, timeout=10)
+
+    def refresh_if_stale(self) -> None:
+        """距离上次扫描超过刷新间隔时增量更新"""
+        if time.time() - self.scan_time > self.refresh_time:
+            self.refresh()
+
+    def refresh(self) -> None:
+        """增量扫描音乐目录：目录修改时间未变时沿用已记录的文件和子目录"""
+        if not self._refresh_lock.acquire(blocking=False):
+            # 其他线程正在刷新，直接使用当前索引
+            return
+        try:
+            start_time = time.time()
+            rescanned = 0
+            with self._connect() as db:
+                known = {
+                    path: (parent, mtime)
+                    for path, parent, mtime in db.execute(
+                        "SELECT path, parent, mtime FROM dirs WHERE root = ?",
+                        (self.music_dir,),
+                    )
+                }
+                children = defaultdict(list)
+                for path, (parent, _) in known.items():
+                    children[parent].append(path)
+
+                visited = set()
+                stack = ["."] if os.path.isdir(self.music_dir) else []
+                while stack:
+                    rel_dir = stack.pop()
+                    visited.add(rel_dir)
+                    abs_dir = os.path.join(self.music_dir, rel_dir)
+                    try:
+                        mtime = os.stat(abs_dir).st_mtime
+                    except OSError:
+                        continue
+                    if rel_dir in known and known[rel_dir][1] == mtime:
+                        stack.extend(children[rel_dir])
+                        continue
+                    subdirs = self._scan_dir(db, rel_dir)
+                    rescanned += 1
+                    if rel_dir == ".":
+                        parent = ""
+                    else:
+                        parent = os.path.dirname(rel_dir) or "."
+                    db.execute(
+                        "INSERT OR REPLACE INTO dirs VALUES (?, ?, ?, ?)",
+                        (self.music_dir, rel_dir, parent, mtime),
+                    )
+                    stack.extend(subdirs)
+
+                # 删除已不存在的目录及其中的歌曲
+                for rel_dir in set(known) - visited:
+                    db.execute(
+                        "DELETE FROM dirs WHERE root = ? AND path = ?",
+                        (self.music_dir, rel_dir),
+                    )
+                    db.execute(
+                        "DELETE FROM songs WHERE root = ? AND dir = ?",
+                        (self.music_dir, rel_dir),
+                    )
+
+                if rescanned or not self._songs:
+                    songs = [
+                        row[0]
+                        for row in db.execute(
+                            "SELECT path FROM songs WHERE root = ? ORDER BY path",
+                            (self.music_dir,),
+                        )
+                    ]
+                    self._build_index(songs)
+            self.scan_time = time.time()
+            if rescanned:
+                logger.bind(tag=TAG).info(
+                    f"音乐目录已更新: 重新扫描{rescanned}个目录，共{len(self._songs)}首，"
+                    f"耗时{self.scan_time - start_time:.3f}秒"
+                )
+        except Exception as e:
+            logger.bind(tag=TAG).error(f"刷新音乐目录失败: {e}")
+        finally:
+            self._refresh_lock.release()
+
+    def _scan_dir(self, db: sqlite3.Connection, rel_dir: str) -> List[str]:
+        """重新扫描一个目录，更新其中的歌曲，返回子目录列表"""
+        abs_dir = os.path.join(self.music_dir, rel_dir)
+        subdirs, songs = [], []
+        with os.scandir(abs_dir) as entries:
+            for entry in entries:
+                rel_path = os.path.normpath(os.path.join(rel_dir, entry.name))
+                if entry.is_dir():
+                    subdirs.append(rel_path)
+                elif entry.is_file() and entry.name.lower().endswith(self.music_ext):
+                    songs.append(rel_path)
+        db.execute(
+            "DELETE FROM songs WHERE root = ? AND dir = ?", (self.music_dir, rel_dir)
+        )
+        db.executemany(
+            "INSERT OR REPLACE INTO songs VALUES (?, ?, ?)",
+            [(self.music_dir, song, rel_dir) for song in songs],
+        )
+        return subdirs
+
+    def _build_index(self, songs: List[str]) -> None:
+        names, pinyins = [], []
+        index = defaultdict(list)
+        for song_id, song in enumerate(songs):
+            name = normalize_name(os.path.splitext(os.path.basename(song))[0])
+            syllables = _to_pinyin(name)
+            names.append(name)
+            pinyins.append(" ".join(syllables))
+            for gram in _grams(name) | _pinyin_grams(syllables):
+                index[gram].append(song_id)
+        self._songs, self._names, self._pinyins = songs, names, pinyins
+        self._index = dict(index)
+
+    def search(
+        self, query: str, limit: int = 1, min_ratio: float = MIN_MATCH_RATIO
+    ) -> List[Tuple[str, float]]:
+        """模糊查找歌曲，返回按相似度排序的(相对路径, 相似度)"""
+        name = normalize_name(query)
+        if not name:
+            return []
+        syllables = _to_pinyin(name)
+        query_grams = _grams(name) | _pinyin_grams(syllables)
+
+        # 按命中的二元组数量粗筛
+        hits = defaultdict(int)
+        for gram in query_grams:
+            for song_id in self._index.get(gram, ()):
+                hits[song_id] += 1
+        candidates = sorted(hits, key=hits.get, reverse=True)[:RERANK_SIZE]
+
+        query_pinyin = " ".join(syllables)
+        results = []
+        for song_id in candidates:
+            ratio = difflib.SequenceMatcher(None, name, self._names[song_id]).ratio()
+            if query_pinyin and self._pinyins[song_id]:
+                ratio = max(
+                    ratio,
+                    difflib.SequenceMatcher(
+                        None, query_pinyin, self._pinyins[song_id]
+                    ).ratio(),
+                )
+            if ratio > min_ratio:
+                results.append((self._songs[song_id], ratio))
+        results.sort(key=lambda item: item[1], reverse=True)
+        return results[:limit]
+
+    def find_best_match(self, query: str) -> Optional[str]:
+        results = self.search(query, limit=1)
+        return results[0][0] if results else None
+
+    def random_song(self) -> Optional[str]:
+        songs = self._songs
+        return random.choice(songs) if songs else None
+
+    def prompt_candidates(self, query: str = None, limit: int = 20) -> List[str]:
+        """给意图识别提示词使用的候选歌名，数量有上限"""
+        names = []
+        if query:
+            names = [song for song, _ in self.search(query, limit=limit, min_ratio=0)]
+        if len(names) < limit and self._songs:
+            # 匹配不足时按路径顺序补齐，让模型知道有哪些可选；顺序固定，相同输入得到相同的提示词
+            for song in self._songs[:limit]:
+                if len(names) >= limit:
+                    break
+                if song not in names:
+                    names.append(song)
+        return [os.path.splitext(song)[0] for song in names]
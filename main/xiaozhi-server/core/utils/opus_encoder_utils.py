@@ -4,18 +4,25 @@ Opus编码工具类
 """
 
 import logging
+import threading
 import traceback
-
-import numpy as np
+from collections import defaultdict
+from contextlib import contextmanager
 from typing import List, Optional
 from opuslib_next import Encoder
 from opuslib_next import constants
 
 
 class OpusEncoderUtils:
-    """PCM到Opus的编码器"""
+    """PCM到Opus的流式编码器
+
+    不足一帧的数据保存在固定大小的缓冲区中，完整的帧直接从输入数据中切出编码，
+    长时间的流式编码内存占用恒定、每帧开销固定
+    """
 
-    def __init__(self, sample_rate: int, channels: int, frame_size_ms: int):
+    def __init__(
+        self, sample_rate: int, channels: int, frame_size_ms: int, speech: bool = True
+    ):
         """
         初始化Opus编码器
 
@@ -23,30 +30,36 @@ class OpusEncoderUtils:
             sample_rate: 采样率 (Hz)
             channels: 通道数 (1=单声道, 2=立体声)
             frame_size_ms: 帧大小 (毫秒)
+            speech: 是否为语音（TTS），音乐、提示音等使用Opus默认的码率和信号类型
         """
         self.sample_rate = sample_rate
         self.channels = channels
         self.frame_size_ms = frame_size_ms
+        self.speech = speech
         # 计算每帧样本数 = 采样率 * 帧大小(毫秒) / 1000
         self.frame_size = (sample_rate * frame_size_ms) // 1000
         # 总帧大小 = 每帧样本数 * 通道数
         self.total_frame_size = self.frame_size * channels
+        # 每帧字节数（16位PCM）
+        self.frame_bytes = self.total_frame_size * 2
 
         # 比特率和复杂度设置
         self.bitrate = 24000  # bps
         self.complexity = 10  # 最高质量
 
-        # 缓冲区初始化为空
-        self.buffer = np.array([], dtype=np.int16)
+        # 预分配一帧大小的缓冲区，保存上次调用剩余的不完整帧
+        self._pending = bytearray(self.frame_bytes)
+        self._pending_size = 0
 
         try:
             # 创建Opus编码器
             self.encoder = Encoder(
                 sample_rate, channels, constants.APPLICATION_AUDIO  # 音频优化模式
             )
-            self.encoder.bitrate = self.bitrate
-            self.encoder.complexity = self.complexity
-            self.encoder.signal = constants.SIGNAL_VOICE  # 语音信号优化
+            if speech:
+                self.encoder.bitrate = self.bitrate
+                self.encoder.complexity = self.complexity
+                self.encoder.signal = constants.SIGNAL_VOICE  # 语音信号优化
         except Exception as e:
             logging.error(f"初始化Opus编码器失败: {e}")
             raise RuntimeError("初始化失败") from e
@@ -54,83 +67,130 @@ class OpusEncoderUtils:
     def reset_state(self):
         """重置编码器状态"""
         self.encoder.reset_state()
-        self.buffer = np.array([], dtype=np.int16)
+        self._pending_size = 0
 
     def encode_pcm_to_opus(self, pcm_data: bytes, end_of_stream: bool) -> List[bytes]:
         """
         将PCM数据编码为Opus格式
 
         Args:
-            pcm_data: PCM字节数据
+            pcm_data: PCM字节数据（小端16位），也可以是bytearray、memoryview等
             end_of_stream: 是否为流的结束
 
         Returns:
             Opus数据包列表
         """
-        # 将字节数据转换为short数组
-        new_samples = self._convert_bytes_to_shorts(pcm_data)
-
-        # 校验PCM数据
-        self._validate_pcm_data(new_samples)
-
-        # 将新数据追加到缓冲区
-        self.buffer = np.append(self.buffer, new_samples)
-
+        data = memoryview(pcm_data).cast("B")
+        frame_bytes = self.frame_bytes
         opus_packets = []
         offset = 0
 
+        # 先用新数据补齐上次剩余的不完整帧
+        if self._pending_size:
+            take = min(frame_bytes - self._pending_size, len(data))
+            self._pending[self._pending_size : self._pending_size + take] = data[:take]
+            self._pending_size += take
+            offset = take
+            if self._pending_size == frame_bytes:
+                self._append(opus_packets, self._pending)
+                self._pending_size = 0
+
         # 处理所有完整帧
-        while offset <= len(self.buffer) - self.total_frame_size:
-            frame = self.buffer[offset : offset + self.total_frame_size]
-            output = self._encode(frame)
-            if output:
-                opus_packets.append(output)
-            offset += self.total_frame_size
+        while len(data) - offset >= frame_bytes:
+            self._append(opus_packets, data[offset : offset + frame_bytes])
+            offset += frame_bytes
 
-        # 保留未处理的样本
-        self.buffer = self.buffer[offset:]
+        # 保留未处理的数据
+        remaining = len(data) - offset
+        if remaining:
+            self._pending[:remaining] = data[offset:]
+            self._pending_size = remaining
 
         # 流结束时处理剩余数据
-        if end_of_stream and len(self.buffer) > 0:
-            # 创建最后一帧并用0填充
-            last_frame = np.zeros(self.total_frame_size, dtype=np.int16)
-            last_frame[: len(self.buffer)] = self.buffer
-
-            output = self._encode(last_frame)
-            if output:
-                opus_packets.append(output)
-            self.buffer = np.array([], dtype=np.int16)
+        if end_of_stream and self._pending_size:
+            # 最后一帧用0填充
+            self._pending[self._pending_size :] = bytes(
+                frame_bytes - self._pending_size
+            )
+            self._append(opus_packets, self._pending)
+            self._pending_size = 0
 
         return opus_packets
 
-    def _encode(self, frame: np.ndarray) -> Optional[bytes]:
+    def _append(self, opus_packets: List[bytes], frame) -> None:
+        output = self._encode(frame)
+        if output:
+            opus_packets.append(output)
+
+    def _encode(self, frame) -> Optional[bytes]:
         """编码一帧音频数据"""
         try:
-            # 将numpy数组转换为bytes
-            frame_bytes = frame.tobytes()
-            # opuslib要求输入字节数必须是channels*2的倍数
-            encoded = self.encoder.encode(frame_bytes, self.frame_size)
+            # opuslib只接受bytes，这里是一帧大小的固定开销
+            encoded = self.encoder.encode(bytes(frame), self.frame_size)
             return encoded
         except Exception as e:
             logging.error(f"Opus编码失败: {e}")
             traceback.print_exc()
             return None
 
-    def _convert_bytes_to_shorts(self, bytes_data: bytes) -> np.ndarray:
-        """将字节数组转换为short数组 (16位PCM)"""
-        # 假设输入是小端字节序的16位PCM
-        return np.frombuffer(bytes_data, dtype=np.int16)
-
-    def _validate_pcm_data(self, pcm_shorts: np.ndarray) -> None:
-        """验证PCM数据是否有效"""
-        # 16位PCM数据范围是 -32768 到 32767
-        if np.any((pcm_shorts < -32768) | (pcm_shorts > 32767)):
-            invalid_samples = pcm_shorts[(pcm_shorts < -32768) | (pcm_shorts > 32767)]
-            logging.warning(f"发现无效PCM样本: {invalid_samples[:5]}...")
-            # 在实际应用中可以选择裁剪而不是抛出异常
-            # np.clip(pcm_shorts, -32768, 32767, out=pcm_shorts)
-
     def close(self):
         """关闭编码器并释放资源"""
         # opuslib没有明确的关闭方法，Python的垃圾回收会处理
         pass
+
+
+class OpusEncoderPool:
+    """Opus编码器池，按(采样率, 通道数, 帧长, 是否语音)复用重置过的编码器"""
+
+    def __init__(self, max_idle: int = 32):
+        self.max_idle = max_idle
+        self._idle = defaultdict(list)
+        self._lock = threading.Lock()
+
+    def acquire(
+        self,
+        sample_rate: int = 16000,
+        channels: int = 1,
+        frame_size_ms: int = 60,
+        speech: bool = True,
+    ) -> OpusEncoderUtils:
+        """取出一个空闲编码器，没有时新建"""
+        key = (sample_rate, channels, frame_size_ms, speech)
+        with self._lock:
+            if self._idle[key]:
+                return self._idle[key].pop()
+        return OpusEncoderUtils(sample_rate, channels, frame_size_ms, speech)
+
+    def release(self, encoder: Optional[OpusEncoderUtils]) -> None:
+        """重置编码器并放回池中"""
+        if encoder is None:
+            return
+        encoder.reset_state()
+        key = (
+            encoder.sample_rate,
+            encoder.channels,
+            encoder.frame_size_ms,
+            encoder.speech,
+        )
+        with self._lock:
+            if len(self._idle[key]) < self.max_idle:
+                self._idle[key].append(encoder)
+
+    @contextmanager
+    def encoder(
+        self,
+        sample_rate: int = 16000,
+        channels: int = 1,
+        frame_size_ms: int = 60,
+        speech: bool = True,
+    ):
+        """在with块中使用一个编码器，结束后自动放回"""
+        encoder = self.acquire(sample_rate, channels, frame_size_ms, speech)
+        try:
+            yield encoder
+        finally:
+            self.release(encoder)
+
+
+# 创建全局Opus编码器池实例
+opus_encoder_pool = OpusEncoderPool()
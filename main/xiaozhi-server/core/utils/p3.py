@@ -1,3 +1,5 @@
+import os
+import mmap
 import struct
 
 def decode_opus_from_file(input_file):
@@ -30,4 +32,36 @@ def decode_opus_from_file(input_file):
 
     # 计算总时长
     total_duration = (total_frames * frame_duration_ms) / 1000.0
-    return opus_datas, total_duration
\ No newline at end of file
+    return opus_datas, total_duration
+
+
+def encode_opus_to_file(opus_datas, output_file):
+    """
+    将 Opus 数据包列表写入p3文件，每个包前加4字节头部：[1字节类型，1字节保留，2字节长度]。
+    """
+    with open(output_file, 'wb') as f:
+        for opus_data in opus_datas:
+            f.write(struct.pack('>BBH', 0, 0, len(opus_data)))
+            f.write(opus_data)
+
+
+def iter_opus_from_file(input_file, start_frame=0):
+    """
+    逐帧读取p3文件中的 Opus 数据包，文件通过内存映射访问，不会整体读入内存。
+    start_frame 为起始帧序号，用于从指定位置开始播放。
+    """
+    with open(input_file, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            offset = 0
+            frame_index = 0
+            while offset + 4 <= len(mm):
+                _, _, data_len = struct.unpack_from('>BBH', mm, offset)
+                offset += 4
+                if offset + data_len > len(mm):
+                    raise ValueError(f"Data length({len(mm) - offset}) mismatch({data_len}) in the file.")
+                if frame_index >= start_frame:
+                    yield mm[offset:offset + data_len]
+                offset += data_len
+                frame_index += 1
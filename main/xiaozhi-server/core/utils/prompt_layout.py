@@ -0,0 +1,100 @@
+"""
+提示词布局
+系统提示词只保留稳定的内容（角色设定、说话人信息），工具列表按名称排序；时间、天气、位置和记忆
+等每轮变化的内容放在最后一条用户消息之前单独的消息中。请求开头的内容在多轮对话之间保持不变，
+服务端的前缀缓存（OpenAI/DeepSeek/通义的Prompt Cache、Ollama的KV复用）可以命中
+"""
+
+import re
+import json
+import hashlib
+import threading
+from typing import Dict, List, Optional, Tuple
+
+# 提示词模板中每轮都会变化的段落，标签单独成行（正文中提到的`<context>`不算）
+VOLATILE_BLOCK_PATTERN = re.compile(
+    r"^<(context|memory)>.*?^</\1>[ \t]*$", re.DOTALL | re.MULTILINE
+)
+MEMORY_BLOCK_PATTERN = re.compile(r"<memory>.*?</memory>", re.DOTALL)
+
+
+def split_volatile_blocks(template: str) -> Tuple[str, str]:
+    """把提示词模板拆成(稳定部分, 易变部分)，易变部分为<context>和<memory>段落"""
+    volatile = "\n\n".join(m.group(0) for m in VOLATILE_BLOCK_PATTERN.finditer(template))
+    static = VOLATILE_BLOCK_PATTERN.sub("", template)
+    static = re.sub(r"\n{3,}", "\n\n", static).strip()
+    return static, volatile
+
+
+def build_volatile_message(context: str = None, memory_str: str = None) -> str:
+    """拼接本轮的实时上下文和记忆，记忆放入<memory>段落"""
+    content = context or ""
+    if memory_str:
+        memory_block = f"<memory>\n{memory_str}\n</memory>"
+        if MEMORY_BLOCK_PATTERN.search(content):
+            content = MEMORY_BLOCK_PATTERN.sub(lambda _: memory_block, content)
+        else:
+            content = f"{content}\n\n{memory_block}" if content else memory_block
+    return content.strip()
+
+
+def insert_volatile_message(dialogue: List[Dict], content: str) -> None:
+    """把易变内容作为system消息插入到最后一条用户消息之前，之前的消息构成稳定前缀"""
+    if not content:
+        return
+    message = {"role": "system", "content": content}
+    for i in range(len(dialogue) - 1, -1, -1):
+        if dialogue[i].get("role") == "user":
+            dialogue.insert(i, message)
+            return
+    dialogue.append(message)
+
+
+def sort_functions(functions: Optional[List[Dict]]) -> Optional[List[Dict]]:
+    """按函数名排序，工具注册的先后顺序不影响请求内容"""
+    if not functions:
+        return functions
+    return sorted(functions, key=lambda f: f.get("function", {}).get("name", ""))
+
+
+def prefix_hash(dialogue: List[Dict], functions: Optional[List[Dict]] = None) -> str:
+    """计算请求稳定前缀（开头的system消息和工具列表）的哈希"""
+    prefix = []
+    for message in dialogue:
+        if message.get("role") != "system":
+            break
+        prefix.append(message.get("content"))
+    payload = json.dumps(
+        {"system": prefix, "tools": functions or []},
+        ensure_ascii=False,
+        sort_keys=True,
+    )
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()[:16]
+
+
+class PrefixStabilityStats:
+    """统计同一连接相邻两次请求的前缀是否一致，前缀变化时服务端的前缀缓存无法命中"""
+
+    def __init__(self):
+        self._stats = {"requests": 0, "stable": 0, "changed": 0}
+        self._lock = threading.Lock()
+
+    def record(self, previous_hash: Optional[str], current_hash: str) -> bool:
+        """记录一次请求，返回前缀是否与上一次相同"""
+        stable = previous_hash == current_hash
+        with self._lock:
+            self._stats["requests"] += 1
+            if previous_hash is not None:
+                self._stats["stable" if stable else "changed"] += 1
+        return stable
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+        compared = stats["stable"] + stats["changed"]
+        stats["stable_ratio"] = round(stats["stable"] / compared, 4) if compared else 0.0
+        return stats
+
+
+# 创建全局前缀稳定性统计实例
+prefix_stats = PrefixStabilityStats()
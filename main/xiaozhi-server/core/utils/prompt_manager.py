@@ -8,6 +8,7 @@ import cnlunar
 from typing import Dict, Any
 from config.logger import setup_logging
 from jinja2 import Template
+from core.utils.prompt_layout import split_volatile_blocks
 
 TAG = __name__
 
@@ -53,7 +54,11 @@ class PromptManager:
         self.config = config
         self.logger = logger or setup_logging()
         self.base_prompt_template = None
+        # 模板中每轮变化的<context>、<memory>段落，每次请求单独渲染
+        self.context_template = None
         self.last_update_time = 0
+        # (日期, 当天的时间信息)，农历计算每天只做一次
+        self._time_info = None
 
         # 导入全局缓存管理器
         from core.utils.cache.manager import cache_manager, CacheType
@@ -72,7 +77,7 @@ class PromptManager:
             # 先从缓存获取
             cached_template = self.cache_manager.get(self.CacheType.CONFIG, cache_key)
             if cached_template is not None:
-                self.base_prompt_template = cached_template
+                self._set_template(cached_template)
                 self.logger.bind(tag=TAG).debug("从缓存加载基础提示词模板")
                 return
 
@@ -85,13 +90,19 @@ class PromptManager:
                 self.cache_manager.set(
                     self.CacheType.CONFIG, cache_key, template_content
                 )
-                self.base_prompt_template = template_content
+                self._set_template(template_content)
                 self.logger.bind(tag=TAG).debug("成功加载基础提示词模板并缓存")
             else:
                 self.logger.bind(tag=TAG).warning("未找到agent-base-prompt.txt文件")
         except Exception as e:
             self.logger.bind(tag=TAG).error(f"加载提示词模板失败: {e}")
 
+    def _set_template(self, template_content: str):
+        """拆分模板：稳定部分作为系统提示词，易变部分每轮请求单独渲染"""
+        static, volatile = split_volatile_blocks(template_content)
+        self.base_prompt_template = static
+        self.context_template = Template(volatile) if volatile else None
+
     def get_quick_prompt(self, user_prompt: str, device_id: str = None) -> str:
         """快速获取系统提示词（使用用户配置）"""
         device_cache_key = f"device_prompt:{device_id}"
@@ -121,6 +132,8 @@ class PromptManager:
 
         now = datetime.now()
         today_date = now.strftime("%Y-%m-%d")
+        if self._time_info is not None and self._time_info[0] == today_date:
+            return self._time_info
         today_weekday = WEEKDAY_MAP[now.strftime("%A")]
         today_lunar = cnlunar.Lunar(now, godType="8char")
         lunar_date = "%s年%s%s\n" % (
@@ -129,7 +142,26 @@ class PromptManager:
             today_lunar.lunarDayCn,
         )
 
-        return today_date, today_weekday, lunar_date
+        self._time_info = (today_date, today_weekday, lunar_date)
+        return self._time_info
+
+    def _get_cached_context(self, client_ip: str = None) -> tuple:
+        """从全局缓存获取位置和天气信息，不发起请求"""
+        local_address = ""
+        weather_info = ""
+        if client_ip:
+            # 获取位置信息（从全局缓存）
+            local_address = (
+                self.cache_manager.get(self.CacheType.LOCATION, client_ip) or ""
+            )
+
+            # 获取天气信息（从全局缓存）
+            if local_address:
+                weather_info = (
+                    self.cache_manager.get(self.CacheType.WEATHER, local_address)
+                    or ""
+                )
+        return local_address, weather_info
 
     def _get_location_info(self, client_ip: str) -> str:
         """获取位置信息"""
@@ -192,32 +224,18 @@ class PromptManager:
     def build_enhanced_prompt(
         self, user_prompt: str, device_id: str, client_ip: str = None
     ) -> str:
-        """构建增强的系统提示词"""
+        """构建增强的系统提示词，不含每轮变化的实时上下文（见build_context_prompt）"""
         if not self.base_prompt_template:
             return user_prompt
 
         try:
-            # 获取最新的时间信息（不缓存）
+            # 获取当天的时间信息
             today_date, today_weekday, lunar_date = (
                 self._get_current_time_info()
             )
 
             # 获取缓存的上下文信息
-            local_address = ""
-            weather_info = ""
-
-            if client_ip:
-                # 获取位置信息（从全局缓存）
-                local_address = (
-                    self.cache_manager.get(self.CacheType.LOCATION, client_ip) or ""
-                )
-
-                # 获取天气信息（从全局缓存）
-                if local_address:
-                    weather_info = (
-                        self.cache_manager.get(self.CacheType.WEATHER, local_address)
-                        or ""
-                    )
+            local_address, weather_info = self._get_cached_context(client_ip)
 
             # 替换模板变量
             template = Template(self.base_prompt_template)
@@ -243,3 +261,25 @@ class PromptManager:
         except Exception as e:
             self.logger.bind(tag=TAG).error(f"构建增强提示词失败: {e}")
             return user_prompt
+
+    def build_context_prompt(self, client_ip: str = None) -> str:
+        """构建本轮请求的实时上下文（时间、日期、位置、天气），没有上下文模板时返回None"""
+        if self.context_template is None:
+            return None
+        try:
+            from datetime import datetime
+
+            today_date, today_weekday, lunar_date = self._get_current_time_info()
+            local_address, weather_info = self._get_cached_context(client_ip)
+            return self.context_template.render(
+                current_time=datetime.now().strftime("%H:%M"),
+                today_date=today_date,
+                today_weekday=today_weekday,
+                lunar_date=lunar_date,
+                local_address=local_address,
+                weather_info=weather_info,
+                emojiList=EMOJI_List,
+            )
+        except Exception as e:
+            self.logger.bind(tag=TAG).error(f"构建实时上下文失败: {e}")
+            return None
@@ -0,0 +1,138 @@
+"""
+进程级共享执行运行时
+所有连接共用按负载类型划分的有界线程池，替代每个连接自建的线程池和常驻轮询线程；
+连接内的编排逻辑统一使用事件循环中的asyncio任务
+"""
+
+import os
+import asyncio
+import functools
+import threading
+from enum import Enum
+from typing import Any, Callable, Dict
+from concurrent.futures import Future, ThreadPoolExecutor
+
+
+class WorkloadType(Enum):
+    """负载类型"""
+
+    NETWORK = "network"  # 阻塞的网络调用：LLM、远程ASR/TTS、上报等
+    AUDIO = "audio"  # CPU密集的音频处理：编解码、本地模型推理
+    PLUGIN = "plugin"  # 插件、工具函数调用
+
+
+DEFAULT_MAX_WORKERS = {
+    WorkloadType.NETWORK: 64,
+    WorkloadType.AUDIO: os.cpu_count() or 4,
+    WorkloadType.PLUGIN: 16,
+}
+
+
+class ExecutionRuntime:
+    """进程级共享执行运行时"""
+
+    def __init__(self):
+        self._executors: Dict[WorkloadType, ThreadPoolExecutor] = {}
+        self._max_workers = dict(DEFAULT_MAX_WORKERS)
+        self._lock = threading.Lock()
+        self._thread_local = threading.local()
+
+    def configure(self, config: dict) -> None:
+        """根据配置中的runtime段设置各线程池大小，需在创建线程池之前调用"""
+        runtime_config = config.get("runtime") or {}
+        for workload in WorkloadType:
+            value = runtime_config.get(f"{workload.value}_workers")
+            if value:
+                self._max_workers[workload] = max(1, int(value))
+
+    def executor(self, workload: WorkloadType) -> ThreadPoolExecutor:
+        executor = self._executors.get(workload)
+        if executor is None:
+            with self._lock:
+                executor = self._executors.get(workload)
+                if executor is None:
+                    executor = ThreadPoolExecutor(
+                        max_workers=self._max_workers[workload],
+                        thread_name_prefix=f"rt-{workload.value}",
+                    )
+                    self._executors[workload] = executor
+        return executor
+
+    def submit(
+        self, workload: WorkloadType, fn: Callable, *args, **kwargs
+    ) -> Future:
+        """提交阻塞任务，可在任意线程调用"""
+        return self.executor(workload).submit(fn, *args, **kwargs)
+
+    async def run(self, workload: WorkloadType, fn: Callable, *args, **kwargs) -> Any:
+        """在事件循环中等待阻塞任务完成"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self.executor(workload), functools.partial(fn, *args, **kwargs)
+        )
+
+    def submit_coroutine(
+        self, workload: WorkloadType, coro_fn: Callable, *args, **kwargs
+    ) -> Future:
+        """在线程池中运行内部有阻塞调用的协程函数"""
+        return self.submit(workload, self._run_in_thread_loop, coro_fn, args, kwargs)
+
+    async def run_coroutine(
+        self, workload: WorkloadType, coro_fn: Callable, *args, **kwargs
+    ) -> Any:
+        """在线程池中运行内部有阻塞调用的协程函数，并在事件循环中等待结果"""
+        return await self.run(
+            workload, self._run_in_thread_loop, coro_fn, args, kwargs
+        )
+
+    def run_sync(self, coro_fn: Callable, *args, **kwargs) -> Any:
+        """在当前工作线程的常驻事件循环中运行协程函数，不能在事件循环线程中调用"""
+        return self._run_in_thread_loop(coro_fn, args, kwargs)
+
+    def _run_in_thread_loop(self, coro_fn: Callable, args, kwargs) -> Any:
+        # 每个工作线程复用一个事件循环，避免每次调用都新建、销毁事件循环
+        loop = getattr(self._thread_local, "loop", None)
+        if loop is None or loop.is_closed():
+            loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(loop)
+            self._thread_local.loop = loop
+        return loop.run_until_complete(coro_fn(*args, **kwargs))
+
+    def shutdown(self, wait: bool = False) -> None:
+        with self._lock:
+            for executor in self._executors.values():
+                executor.shutdown(wait=wait)
+            self._executors.clear()
+
+
+class LoopQueue:
+    """可在任意线程投递、在事件循环中消费的队列，消费方无需轮询线程"""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self._loop = loop
+        self._queue = asyncio.Queue()
+
+    def put(self, item) -> None:
+        try:
+            running_loop = asyncio.get_running_loop()
+        except RuntimeError:
+            running_loop = None
+        if running_loop is self._loop:
+            self._queue.put_nowait(item)
+        else:
+            self._loop.call_soon_threadsafe(self._queue.put_nowait, item)
+
+    async def get(self):
+        return await self._queue.get()
+
+    def qsize(self) -> int:
+        return self._queue.qsize()
+
+    def clear(self) -> None:
+        """清空队列，需在事件循环线程中调用"""
+        while not self._queue.empty():
+            self._queue.get_nowait()
+
+
+# 创建全局执行运行时实例
+runtime = ExecutionRuntime()
@@ -0,0 +1,146 @@
+"""
+流式文本分段
+大模型逐token输出时，按标点把文本切成适合语音合成的分段。每次只扫描新到的文本，
+已确认的分段立即切走，缓冲区只保留当前未完成的一句，单次回复的分段开销与文本长度成线性
+"""
+
+from typing import Iterable, List
+
+# 英文句点前出现这些缩写时不视为句子结束
+ABBREVIATIONS = frozenset(
+    {
+        "mr",
+        "mrs",
+        "ms",
+        "dr",
+        "prof",
+        "sr",
+        "jr",
+        "st",
+        "vs",
+        "etc",
+        "e.g",
+        "i.e",
+        "no",
+        "inc",
+        "ltd",
+        "co",
+        "approx",
+    }
+)
+
+# 两侧是数字时不作为分段点的半角标点，如 3.14、1,000、10:30
+NUMERIC_SEPARATORS = frozenset({".", ",", ":"})
+
+
+class SentenceSegmenter:
+    """有状态的流式分段器
+
+    feed 送入增量文本，返回已经完整的分段（保留原始标点）；一次送入的文本中有多个分段点时
+    合并为一段返回，减少下游的消息数量。第一段使用 first_punctuations（通常包含逗号），
+    让首句尽早开始合成，之后使用 punctuations。无法立即判断的标点（如末尾的"."可能是小数点）
+    等下一段文本到达后再判断
+    """
+
+    def __init__(
+        self,
+        punctuations: Iterable[str],
+        first_punctuations: Iterable[str] = None,
+        abbreviations=ABBREVIATIONS,
+    ):
+        self.punctuations = frozenset(punctuations)
+        self.first_punctuations = (
+            frozenset(first_punctuations)
+            if first_punctuations is not None
+            else self.punctuations
+        )
+        self.abbreviations = abbreviations
+        self.reset()
+
+    def reset(self) -> None:
+        """开始新的一轮回复"""
+        # 尚未切出的文本，从当前分段的开头开始
+        self._buffer = ""
+        # _buffer 中已经扫描过的字符数
+        self._scanned = 0
+        self._first = True
+
+    def feed(self, text: str) -> List[str]:
+        """送入增量文本，返回新完成的分段"""
+        if not text:
+            return []
+        buffer = self._buffer + text
+        segments = []
+        cut = 0
+        i = self._scanned
+        while i < len(buffer):
+            punctuations = self.first_punctuations if self._first else self.punctuations
+            if buffer[i] not in punctuations:
+                i += 1
+                continue
+            boundary = self._is_boundary(buffer, i)
+            if boundary is None:
+                # 需要后面的字符才能判断，下次从这里继续扫描
+                break
+            i += 1
+            if not boundary:
+                continue
+            if self._first:
+                # 首句遇到第一个分段点就立即切出
+                segments.append(buffer[:i])
+                buffer = buffer[i:]
+                i = 0
+                self._first = False
+            else:
+                cut = i
+        if cut:
+            segments.append(buffer[:cut])
+            buffer = buffer[cut:]
+            i -= cut
+        self._buffer = buffer
+        self._scanned = i
+        return segments
+
+    def flush(self) -> str:
+        """返回剩余的文本并开始新的一轮"""
+        remaining = self._buffer
+        self.reset()
+        return remaining
+
+    def _is_boundary(self, text: str, pos: int):
+        """判断 pos 处的标点是否是分段点，信息不足时返回None"""
+        char = text[pos]
+        if char not in NUMERIC_SEPARATORS:
+            return True
+        prev_char = text[pos - 1] if pos > 0 else ""
+        next_char = text[pos + 1] if pos + 1 < len(text) else None
+        if prev_char.isdigit():
+            if next_char is None:
+                return None
+            if next_char.isdigit():
+                return False
+        if char != ".":
+            return True
+        if next_char is None:
+            return None
+        # 网址、版本号、缩写中的点，如 example.com、e.g
+        if next_char.isascii() and next_char.isalnum():
+            return False
+        word = self._word_before(text, pos)
+        if word.lower() in self.abbreviations:
+            return False
+        # 人名首字母，如 J. K. Rowling
+        if len(word) == 1 and word.isupper():
+            return False
+        return True
+
+    @staticmethod
+    def _word_before(text: str, pos: int) -> str:
+        start = pos
+        # 缩写最多回看8个字符，保证单次判断是常数时间
+        while start > 0 and pos - start < 8:
+            char = text[start - 1]
+            if not (char.isascii() and (char.isalpha() or char == ".")):
+                break
+            start -= 1
+        return text[start:pos]
@@ -111,3 +111,17 @@ def is_emoji(char):
 def check_emoji(text):
     """去除文本中的所有emoji表情"""
     return ''.join(char for char in text if not is_emoji(char) and char != "\n")
+
+
+def estimate_tokens(text):
+    """本地粗略估算文本的token数：中日韩文字约每字1个token，其他字符约每4个1个token"""
+    if not text:
+        return 0
+    cjk = sum(
+        1
+        for char in text
+        if "\u2e80" <= char <= "\u9fff"
+        or "\uac00" <= char <= "\ud7af"
+        or "\uf900" <= char <= "\ufaff"
+    )
+    return cjk + (len(text) - cjk + 3) // 4
@@ -0,0 +1,241 @@
+"""
+云服务临时Token管理
+需要用密钥换取临时Token的服务（如阿里云智能语音）在进程内共享同一份Token：按服务和AccessKey缓存，
+在过期前提前后台刷新，同一个Key的并发刷新只发起一次请求。新建连接和Provider实例时不再需要请求Token
+"""
+
+import hmac
+import time
+import uuid
+import base64
+import hashlib
+import threading
+from datetime import datetime, timezone
+from typing import Callable, Dict, Optional, Tuple
+from urllib import parse
+
+import requests
+
+from config.logger import setup_logging
+from core.utils.runtime import runtime, WorkloadType
+
+TAG = __name__
+logger = setup_logging()
+
+# 距离过期不足该秒数时后台刷新
+REFRESH_AHEAD = 600
+# 距离过期不足该秒数时视为已过期，必须同步刷新
+EXPIRE_MARGIN = 60
+
+# 内置的Token类型
+ALIYUN_NLS = "aliyun_nls"
+
+
+def _aliyun_encode_text(text: str) -> str:
+    encoded_text = parse.quote_plus(text)
+    return encoded_text.replace("+", "%20").replace("*", "%2A").replace("%7E", "~")
+
+
+def _aliyun_encode_dict(dic: dict) -> str:
+    dic_sorted = [(key, dic[key]) for key in sorted(dic.keys())]
+    encoded_text = parse.urlencode(dic_sorted)
+    return encoded_text.replace("+", "%20").replace("*", "%2A").replace("%7E", "~")
+
+
+def parse_expire_time(expire_time) -> Optional[float]:
+    """把秒级时间戳或UTC时间字符串转换为时间戳"""
+    if expire_time is None:
+        return None
+    expire_str = str(expire_time).strip()
+    if expire_str.isdigit():
+        return float(expire_str)
+    return (
+        datetime.strptime(expire_str, "%Y-%m-%dT%H:%M:%SZ")
+        .replace(tzinfo=timezone.utc)
+        .timestamp()
+    )
+
+
+def create_aliyun_nls_token(
+    access_key_id: str, access_key_secret: str
+) -> Tuple[str, Optional[float]]:
+    """用AccessKey换取阿里云智能语音交互的临时Token，返回(Token, 过期时间戳)"""
+    parameters = {
+        "AccessKeyId": access_key_id,
+        "Action": "CreateToken",
+        "Format": "JSON",
+        "RegionId": "cn-shanghai",
+        "SignatureMethod": "HMAC-SHA1",
+        "SignatureNonce": str(uuid.uuid1()),
+        "SignatureVersion": "1.0",
+        "Timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "Version": "2019-02-28",
+    }
+    # 构造规范化的请求字符串和待签名字符串
+    query_string = _aliyun_encode_dict(parameters)
+    string_to_sign = (
+        "GET" + "&" + _aliyun_encode_text("/") + "&" + _aliyun_encode_text(query_string)
+    )
+    # 计算签名并进行URL编码
+    secreted_string = hmac.new(
+        bytes(access_key_secret + "&", encoding="utf-8"),
+        bytes(string_to_sign, encoding="utf-8"),
+        hashlib.sha1,
+    ).digest()
+    signature = _aliyun_encode_text(base64.b64encode(secreted_string))
+    full_url = "http://nls-meta.cn-shanghai.aliyuncs.com/?Signature=%s&%s" % (
+        signature,
+        query_string,
+    )
+    response = requests.get(full_url, timeout=10)
+    if response.ok:
+        root_obj = response.json()
+        if "Token" in root_obj:
+            token = root_obj["Token"]["Id"]
+            return token, parse_expire_time(root_obj["Token"]["ExpireTime"])
+    raise ValueError(f"获取阿里云Token失败: {response.status_code} {response.text}")
+
+
+class TokenManager:
+    """进程级的临时Token缓存
+
+    每种Token类型注册一个获取函数：fetcher(*credentials) -> (token, 过期时间戳或None)。
+    阻塞的获取请求在网络线程池中执行
+    """
+
+    def __init__(self):
+        self._fetchers: Dict[str, Callable] = {}
+        # (类型, 凭证) -> (token, 过期时间戳)
+        self._tokens: Dict[tuple, Tuple[str, Optional[float]]] = {}
+        self._locks: Dict[tuple, threading.Lock] = {}
+        self._refreshing = set()
+        self._lock = threading.Lock()
+
+    def register(self, kind: str, fetcher: Callable) -> None:
+        """注册一种Token的获取函数"""
+        self._fetchers[kind] = fetcher
+
+    async def get(self, kind: str, *credentials) -> str:
+        """获取有效Token，缓存可用时不发起请求"""
+        token = self._cached(kind, credentials)
+        if token is not None:
+            return token
+        return await runtime.run(WorkloadType.NETWORK, self.get_sync, kind, *credentials)
+
+    def get_sync(self, kind: str, *credentials) -> str:
+        """get 的阻塞版本，供线程中的同步代码使用"""
+        token = self._cached(kind, credentials)
+        if token is not None:
+            return token
+        key = (kind, credentials)
+        with self._key_lock(key):
+            # 等锁期间其他线程可能已经刷新完成
+            token = self._cached(kind, credentials, refresh_ahead=False)
+            if token is not None:
+                return token
+            return self._fetch(key)
+
+    def prefetch(self, kind: str, *credentials) -> None:
+        """后台预取Token，不阻塞调用方，通常在服务启动时调用"""
+        if self._cached(kind, credentials) is None:
+            self._refresh_in_background((kind, credentials))
+
+    def invalidate(self, kind: str, *credentials) -> None:
+        """服务端拒绝Token（如返回401）时丢弃缓存，下次获取时重新请求"""
+        with self._lock:
+            self._tokens.pop((kind, credentials), None)
+
+    def _cached(self, kind, credentials, refresh_ahead: bool = True) -> Optional[str]:
+        key = (kind, credentials)
+        cached = self._tokens.get(key)
+        if cached is None:
+            return None
+        token, expire_time = cached
+        if expire_time is None:
+            return token
+        remaining = expire_time - time.time()
+        if remaining <= EXPIRE_MARGIN:
+            return None
+        if refresh_ahead and remaining <= REFRESH_AHEAD:
+            # 即将过期：先返回当前Token，同时在后台刷新
+            self._refresh_in_background(key)
+        return token
+
+    def _fetch(self, key) -> str:
+        kind, credentials = key
+        fetcher = self._fetchers.get(kind)
+        if fetcher is None:
+            raise ValueError(f"未注册的Token类型: {kind}")
+        token, expire_time = fetcher(*credentials)
+        if not token:
+            raise ValueError("无法获取有效的访问Token")
+        with self._lock:
+            self._tokens[key] = (token, expire_time)
+        logger.bind(tag=TAG).info(
+            f"已刷新{kind} Token，有效期至"
+            f"{datetime.fromtimestamp(expire_time) if expire_time else '长期'}"
+        )
+        return token
+
+    def _refresh_in_background(self, key) -> None:
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        def refresh():
+            try:
+                with self._key_lock(key):
+                    cached = self._tokens.get(key)
+                    if cached and cached[1] and cached[1] - time.time() > REFRESH_AHEAD:
+                        return
+                    self._fetch(key)
+            except Exception as e:
+                logger.bind(tag=TAG).error(f"后台刷新Token失败: {e}")
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        runtime.submit(WorkloadType.NETWORK, refresh)
+
+    def _key_lock(self, key) -> threading.Lock:
+        with self._lock:
+            lock = self._locks.get(key)
+            if lock is None:
+                lock = self._locks[key] = threading.Lock()
+            return lock
+
+
+class AliyunTokenMixin:
+    """阿里云智能语音Provider的Token获取
+
+    配置了AccessKey密钥对时由全局Token管理器缓存并提前刷新，否则直接使用配置中的token
+    """
+
+    def _init_token(self, config: dict) -> None:
+        """读取密钥对和token，使用密钥对时在后台预取Token"""
+        self.access_key_id = config.get("access_key_id")
+        self.access_key_secret = config.get("access_key_secret")
+        self.token = config.get("token")
+        if self.access_key_id and self.access_key_secret:
+            token_manager.prefetch(ALIYUN_NLS, self.access_key_id, self.access_key_secret)
+
+    async def _get_token(self) -> str:
+        """获取访问Token，使用密钥对时由全局Token管理器缓存并提前刷新"""
+        if self.access_key_id and self.access_key_secret:
+            self.token = await token_manager.get(
+                ALIYUN_NLS, self.access_key_id, self.access_key_secret
+            )
+        return self.token
+
+    def _invalidate_token(self) -> None:
+        """服务端拒绝Token时丢弃缓存，下次获取时重新请求"""
+        if self.access_key_id and self.access_key_secret:
+            token_manager.invalidate(
+                ALIYUN_NLS, self.access_key_id, self.access_key_secret
+            )
+
+
+# 创建全局Token管理器实例
+token_manager = TokenManager()
+token_manager.register(ALIYUN_NLS, create_aliyun_nls_token)
@@ -3,12 +3,10 @@ import socket
 import subprocess
 import re
 import os
-import numpy as np
 import requests
-import opuslib_next
-from pydub import AudioSegment
 from typing import Dict, Any
 from core.utils import tts, llm, intent, memory, vad, asr
+from core.utils.audio_decoder import decode_audio_bytes
 import copy
 
 TAG = __name__
@@ -831,54 +829,22 @@ def analyze_emotion(text):
     return top_emotions[0]  # 如果都不在优先级列表里，返回第一个
 
 
-def audio_to_data(audio_file_path, is_opus=True):
+def audio_to_data(audio_file_path, is_opus=True, speech=False):
+    """音频文件转换为Opus包或PCM帧列表，返回(帧列表, 时长秒)
+
+    WAV/PCM/MP3在进程内解码，其他格式由解码器退回pydub处理；
+    speech为True时（TTS合成的语音）使用语音优化的Opus编码参数，否则使用默认参数
+    """
     # 获取文件后缀名
     file_type = os.path.splitext(audio_file_path)[1]
     if file_type:
         file_type = file_type.lstrip(".")
-    # 读取音频文件，-nostdin 参数：不要从标准输入读取数据，否则FFmpeg会阻塞
-    audio = AudioSegment.from_file(
-        audio_file_path, format=file_type, parameters=["-nostdin"]
+    with open(audio_file_path, "rb") as f:
+        audio_bytes = f.read()
+    return decode_audio_bytes(
+        audio_bytes, file_type, is_opus=is_opus, speech=speech
     )
 
-    # 转换为单声道/16kHz采样率/16位小端编码（确保与编码器匹配）
-    audio = audio.set_channels(1).set_frame_rate(16000).set_sample_width(2)
-
-    # 音频时长(秒)
-    duration = len(audio) / 1000.0
-
-    # 获取原始PCM数据（16位小端）
-    raw_data = audio.raw_data
-
-    # 初始化Opus编码器
-    encoder = opuslib_next.Encoder(16000, 1, opuslib_next.APPLICATION_AUDIO)
-
-    # 编码参数
-    frame_duration = 60  # 60ms per frame
-    frame_size = int(16000 * frame_duration / 1000)  # 960 samples/frame
-
-    datas = []
-    # 按帧处理所有音频数据（包括最后一帧可能补零）
-    for i in range(0, len(raw_data), frame_size * 2):  # 16bit=2bytes/sample
-        # 获取当前帧的二进制数据
-        chunk = raw_data[i : i + frame_size * 2]
-
-        # 如果最后一帧不足，补零
-        if len(chunk) < frame_size * 2:
-            chunk += b"\x00" * (frame_size * 2 - len(chunk))
-
-        if is_opus:
-            # 转换为numpy数组处理
-            np_frame = np.frombuffer(chunk, dtype=np.int16)
-            # 编码Opus数据
-            frame_data = encoder.encode(np_frame.tobytes(), frame_size)
-        else:
-            frame_data = chunk if isinstance(chunk, bytes) else bytes(chunk)
-
-        datas.append(frame_data)
-
-    return datas, duration
-
 
 def check_vad_update(before_config, new_config):
     if (
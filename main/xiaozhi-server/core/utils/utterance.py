@@ -0,0 +1,122 @@
+"""
+一句话的上行音频
+说话结束后把音频帧封装为不可变的 Utterance，ASR、声纹识别和聊天记录上报共用同一个对象，
+Opus解码、float32采样和WAV数据都只在第一次用到时计算一次
+"""
+
+import threading
+import numpy as np
+import opuslib_next
+from typing import Iterable, Tuple
+from config.logger import setup_logging
+
+TAG = __name__
+logger = setup_logging()
+
+SAMPLE_RATE = 16000
+FRAME_SAMPLES = 960  # 60ms at 16kHz
+
+
+def build_wav(pcm_data: bytes, sample_rate: int = SAMPLE_RATE) -> bytes:
+    """为16位单声道PCM数据加上WAV文件头"""
+    # 确保数据长度是偶数（16位音频）
+    if len(pcm_data) % 2 != 0:
+        pcm_data = pcm_data[:-1]
+    wav_header = bytearray()
+    wav_header.extend(b"RIFF")  # ChunkID
+    wav_header.extend((36 + len(pcm_data)).to_bytes(4, "little"))  # ChunkSize
+    wav_header.extend(b"WAVE")  # Format
+    wav_header.extend(b"fmt ")  # Subchunk1ID
+    wav_header.extend((16).to_bytes(4, "little"))  # Subchunk1Size
+    wav_header.extend((1).to_bytes(2, "little"))  # AudioFormat (PCM)
+    wav_header.extend((1).to_bytes(2, "little"))  # NumChannels
+    wav_header.extend(sample_rate.to_bytes(4, "little"))  # SampleRate
+    wav_header.extend((sample_rate * 2).to_bytes(4, "little"))  # ByteRate
+    wav_header.extend((2).to_bytes(2, "little"))  # BlockAlign
+    wav_header.extend((16).to_bytes(2, "little"))  # BitsPerSample
+    wav_header.extend(b"data")  # Subchunk2ID
+    wav_header.extend(len(pcm_data).to_bytes(4, "little"))  # Subchunk2Size
+    return bytes(wav_header) + pcm_data
+
+
+class Utterance(tuple):
+    """一句话的音频帧（Opus包或PCM帧）
+
+    本身是帧的元组，可以直接传给只需要帧列表的旧接口；
+    pcm_frames、pcm、samples、wav 均为惰性计算并缓存的只读结果，可在多个线程中同时访问
+    """
+
+    def __new__(cls, frames: Iterable[bytes] = (), audio_format: str = "opus"):
+        utterance = super().__new__(cls, frames)
+        utterance.audio_format = audio_format
+        utterance._lock = threading.RLock()
+        utterance._cache = {}
+        return utterance
+
+    def __reduce__(self):
+        return (self.__class__, (tuple(self), self.audio_format))
+
+    def __copy__(self):
+        # 不可变对象，复制时直接共享
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+    @property
+    def duration(self) -> float:
+        """时长（秒），按每帧60ms估算"""
+        return len(self) * FRAME_SAMPLES / SAMPLE_RATE
+
+    @property
+    def pcm_frames(self) -> Tuple[bytes, ...]:
+        """逐帧的16位PCM数据"""
+        return self._memoize("pcm_frames", self._decode)
+
+    @property
+    def pcm(self) -> bytes:
+        """拼接后的16位PCM数据"""
+        return self._memoize("pcm", lambda: b"".join(self.pcm_frames))
+
+    @property
+    def samples(self) -> np.ndarray:
+        """归一化到[-1, 1]的float32采样，只读"""
+
+        def to_samples():
+            samples = np.frombuffer(self.pcm, dtype=np.int16).astype(np.float32)
+            samples /= 32768.0
+            samples.flags.writeable = False
+            return samples
+
+        return self._memoize("samples", to_samples)
+
+    @property
+    def wav(self) -> bytes:
+        """WAV格式的音频数据，没有有效音频时为空"""
+        return self._memoize("wav", lambda: build_wav(self.pcm) if self.pcm else b"")
+
+    def _memoize(self, name, compute):
+        value = self._cache.get(name)
+        if value is None:
+            with self._lock:
+                value = self._cache.get(name)
+                if value is None:
+                    value = compute()
+                    self._cache[name] = value
+        return value
+
+    def _decode(self) -> Tuple[bytes, ...]:
+        if self.audio_format == "pcm":
+            return tuple(self)
+        decoder = opuslib_next.Decoder(SAMPLE_RATE, 1)
+        pcm_frames = []
+        for i, opus_packet in enumerate(self):
+            if not opus_packet:
+                continue
+            try:
+                pcm_frame = decoder.decode(opus_packet, FRAME_SAMPLES)
+                if pcm_frame:
+                    pcm_frames.append(pcm_frame)
+            except opuslib_next.OpusError as e:
+                logger.bind(tag=TAG).warning(f"Opus解码错误，跳过数据包 {i}: {e}")
+        return tuple(pcm_frames)
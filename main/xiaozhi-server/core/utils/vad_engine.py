@@ -0,0 +1,239 @@
+"""
+VAD批量推理引擎
+将所有连接在同一时间片内待检测的512采样点窗口合并为一次批量前向推理，
+每个连接保留各自的循环状态(state)与上下文(context)
+"""
+
+import time
+import asyncio
+import threading
+import numpy as np
+import opuslib_next
+from typing import List, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from config.logger import setup_logging
+
+TAG = __name__
+logger = setup_logging()
+
+# Silero VAD 在16kHz下的窗口大小与上下文长度
+WINDOW_SIZE_SAMPLES = 512
+CONTEXT_SIZE_SAMPLES = 64
+STATE_SHAPE = (2, 1, 128)
+
+
+class VADStreamState:
+    """单个连接的VAD流状态"""
+
+    __slots__ = ("state", "context", "decoder")
+
+    def __init__(self):
+        self.state = np.zeros(STATE_SHAPE, dtype=np.float32)
+        self.context = np.zeros((1, CONTEXT_SIZE_SAMPLES), dtype=np.float32)
+        # 每个连接独立的Opus解码器，避免多连接共用一个解码器造成状态串扰
+        self.decoder = opuslib_next.Decoder(16000, 1)
+
+    def reset(self):
+        """重置模型循环状态"""
+        self.state = np.zeros(STATE_SHAPE, dtype=np.float32)
+        self.context = np.zeros((1, CONTEXT_SIZE_SAMPLES), dtype=np.float32)
+
+
+class VADPreGate:
+    """能量/过零率预判
+
+    在神经网络VAD之前用向量化的RMS能量和过零率筛掉明显的静音窗口，
+    被判定为静音的窗口直接视为语音概率0，不再进入模型推理。
+    """
+
+    def __init__(
+        self,
+        energy_threshold: float = 0.003,
+        zcr_threshold: float = 0.35,
+        report_interval: float = 300,
+    ):
+        # RMS能量阈值（归一化到[-1, 1]的采样值），低于此值视为静音
+        self.energy_threshold = energy_threshold
+        # 能量略高但过零率很高的窗口通常是底噪/气流声，也视为静音
+        self.zcr_threshold = zcr_threshold
+        self.report_interval = report_interval
+        self.total_windows = 0
+        self.skipped_windows = 0
+        self._last_report_time = time.time()
+
+    @property
+    def skip_ratio(self) -> float:
+        if self.total_windows == 0:
+            return 0.0
+        return self.skipped_windows / self.total_windows
+
+    def filter(self, windows: np.ndarray) -> np.ndarray:
+        """返回需要送入模型推理的窗口掩码"""
+        if len(windows) == 0:
+            return np.zeros(0, dtype=bool)
+        rms = np.sqrt(np.mean(np.square(windows), axis=1))
+        signs = np.signbit(windows)
+        zcr = np.count_nonzero(signs[:, 1:] != signs[:, :-1], axis=1) / (
+            windows.shape[1] - 1
+        )
+        silent = (rms < self.energy_threshold) | (
+            (rms < self.energy_threshold * 2) & (zcr > self.zcr_threshold)
+        )
+
+        self.total_windows += len(windows)
+        self.skipped_windows += int(np.count_nonzero(silent))
+        self._maybe_report()
+        return ~silent
+
+    def _maybe_report(self):
+        now = time.time()
+        if now - self._last_report_time < self.report_interval:
+            return
+        self._last_report_time = now
+        logger.bind(tag=TAG).info(
+            f"VAD预判统计: 总窗口数 {self.total_windows}, 跳过模型推理 {self.skipped_windows}, "
+            f"跳过比例 {self.skip_ratio:.2%}"
+        )
+
+
+class SileroTorchBackend:
+    """基于torch jit模型的Silero前向推理"""
+
+    def __init__(self, model):
+        import torch
+
+        self._torch = torch
+        # VADRNNJITMerge._model 为16kHz子网络，接收显式的state，便于按连接维护状态
+        self._net = model._model
+
+    def forward(
+        self, x: np.ndarray, state: np.ndarray
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        with self._torch.no_grad():
+            out, new_state = self._net(
+                self._torch.from_numpy(x), self._torch.from_numpy(state)
+            )
+        return out.numpy().reshape(-1), new_state.numpy()
+
+
+class SileroOnnxBackend:
+    """基于onnxruntime的Silero前向推理，运行时无需torch"""
+
+    def __init__(
+        self,
+        model_path: str,
+        intra_op_num_threads: int = 1,
+        inter_op_num_threads: int = 1,
+    ):
+        import onnxruntime
+
+        opts = onnxruntime.SessionOptions()
+        opts.intra_op_num_threads = intra_op_num_threads
+        opts.inter_op_num_threads = inter_op_num_threads
+        opts.execution_mode = onnxruntime.ExecutionMode.ORT_SEQUENTIAL
+        self.session = onnxruntime.InferenceSession(
+            model_path, sess_options=opts, providers=["CPUExecutionProvider"]
+        )
+        self._sr = np.array(16000, dtype=np.int64)
+
+    def forward(
+        self, x: np.ndarray, state: np.ndarray
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        out, new_state = self.session.run(
+            None, {"input": x, "state": state, "sr": self._sr}
+        )
+        return out.reshape(-1), new_state
+
+
+class BatchVADEngine:
+    """跨连接批量VAD推理引擎
+
+    is_vad 调用方把解码好的窗口提交给引擎，引擎在一个时间片内收集所有连接的窗口，
+    在独立线程中做一次批量推理，再把语音概率分发回各连接，推理不会阻塞事件循环。
+    同一个连接的请求需按顺序提交（handleAudioMessage 本身是按连接串行执行的）。
+    """
+
+    def __init__(self, backend, max_batch_size: int = 64, batch_wait_ms: float = 2):
+        self.backend = backend
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.batch_wait = max(0.0, float(batch_wait_ms)) / 1000
+        self._pending: List[Tuple[VADStreamState, np.ndarray, asyncio.Future]] = []
+        self._tick_task: Optional[asyncio.Task] = None
+        self._forward_lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="vad-batch"
+        )
+        self.stats = {"batches": 0, "windows": 0, "max_batch": 0}
+
+    async def infer(self, stream: VADStreamState, windows: np.ndarray) -> np.ndarray:
+        """提交一个连接的窗口(N, 512)，返回N个语音概率"""
+        if len(windows) == 0:
+            return np.empty(0, dtype=np.float32)
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((stream, windows, future))
+        if self._tick_task is None or self._tick_task.done():
+            self._tick_task = loop.create_task(self._tick())
+        return await future
+
+    def infer_sync(self, stream: VADStreamState, windows: np.ndarray) -> np.ndarray:
+        """同步推理，供不在事件循环中的调用方使用"""
+        if len(windows) == 0:
+            return np.empty(0, dtype=np.float32)
+        return self._run_batch([(stream, windows)])[0]
+
+    async def _tick(self):
+        # 稍作等待，让同一时间片内其它连接的窗口一起进入本批次
+        if self.batch_wait > 0:
+            await asyncio.sleep(self.batch_wait)
+        loop = asyncio.get_running_loop()
+        while self._pending:
+            batch = self._pending[: self.max_batch_size]
+            del self._pending[: self.max_batch_size]
+            try:
+                results = await loop.run_in_executor(
+                    self._executor,
+                    self._run_batch,
+                    [(stream, windows) for stream, windows, _ in batch],
+                )
+            except Exception as e:
+                logger.bind(tag=TAG).error(f"VAD批量推理失败: {e}")
+                for _, _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            for (_, _, future), probs in zip(batch, results):
+                if not future.done():
+                    future.set_result(probs)
+
+    def _run_batch(
+        self, requests: List[Tuple[VADStreamState, np.ndarray]]
+    ) -> List[np.ndarray]:
+        """按步推理：第k步合并所有还有第k个窗口的连接，保证单个连接内窗口按序推理"""
+        results = [np.empty(len(windows), dtype=np.float32) for _, windows in requests]
+        max_steps = max(len(windows) for _, windows in requests)
+        with self._forward_lock:
+            for step in range(max_steps):
+                active = [i for i, (_, w) in enumerate(requests) if len(w) > step]
+                x = np.concatenate(
+                    [
+                        np.concatenate(
+                            (requests[i][0].context, requests[i][1][step : step + 1]),
+                            axis=1,
+                        )
+                        for i in active
+                    ]
+                )
+                state = np.concatenate([requests[i][0].state for i in active], axis=1)
+                probs, new_state = self.backend.forward(x, state)
+                for row, i in enumerate(active):
+                    stream = requests[i][0]
+                    stream.state = np.ascontiguousarray(new_state[:, row : row + 1])
+                    stream.context = x[row : row + 1, -CONTEXT_SIZE_SAMPLES:].copy()
+                    results[i][step] = probs[row]
+
+                self.stats["batches"] += 1
+                self.stats["windows"] += len(active)
+                if len(active) > self.stats["max_batch"]:
+                    self.stats["max_batch"] = len(active)
+        return results
@@ -0,0 +1,180 @@
+"""
+上游WebSocket连接池
+流式TTS等上游服务按配置共享已建立、已鉴权的连接：会话开始时借出，会话正常结束后归还，
+省去每次回复前的TLS握手和鉴权往返。借出前检查连接状态，空闲较久的连接先ping确认可用，
+空闲超时或超出数量上限的连接直接关闭
+"""
+
+import time
+import asyncio
+from collections import defaultdict, deque
+from typing import Any, Awaitable, Callable, Hashable
+from config.logger import setup_logging
+
+TAG = __name__
+logger = setup_logging()
+
+
+def is_open(ws) -> bool:
+    """兼容新旧版本websockets的连接状态检查"""
+    if ws is None:
+        return False
+    state = getattr(ws, "state", None)
+    if state is not None:
+        return getattr(state, "name", "") == "OPEN"
+    return bool(getattr(ws, "open", False))
+
+
+class WebSocketPool:
+    """按配置键缓存空闲上游连接的进程级连接池"""
+
+    def __init__(self):
+        self.enabled = True
+        # 每个配置键最多保留的空闲连接数
+        self.max_idle = 4
+        # 每个配置键预先建立的空闲连接数，0表示只复用用过的连接
+        self.prewarm = 0
+        # 空闲超过该时间（秒）的连接借出前先ping确认
+        self.ping_after = 15.0
+        self.ping_timeout = 1.0
+        # 空闲连接：(连接, 归还时间, 过期时间, 事件循环)
+        self._idle = defaultdict(deque)
+        self._warming = defaultdict(int)
+        # 正在关闭的连接任务，保留强引用避免任务在完成前被回收
+        self._closing = set()
+        self._stats = {"hits": 0, "misses": 0}
+
+    def configure(self, config: dict) -> None:
+        """根据配置中的ws_pool段设置连接池"""
+        pool_config = config.get("ws_pool") or {}
+        self.enabled = str(pool_config.get("enable", True)).lower() in (
+            "true",
+            "1",
+            "yes",
+        )
+        max_idle = pool_config.get("max_idle", "4")
+        self.max_idle = int(max_idle) if max_idle else 4
+        prewarm = pool_config.get("prewarm", "0")
+        self.prewarm = min(int(prewarm) if prewarm else 0, self.max_idle)
+        ping_after = pool_config.get("ping_after", "15")
+        self.ping_after = float(ping_after) if ping_after else 15.0
+
+    async def acquire(
+        self,
+        key: Hashable,
+        connect: Callable[[], Awaitable[Any]],
+        idle_timeout: float = 60,
+    ):
+        """借出一个可用连接，没有空闲连接时调用connect新建"""
+        loop = asyncio.get_running_loop()
+        idle = self._idle[key]
+        try:
+            while idle:
+                # 优先使用最近归还的连接
+                ws, idle_since, expire_time, ws_loop = idle.pop()
+                if ws_loop is not loop:
+                    # 连接属于其他事件循环，无法在这里使用，交回所属的事件循环关闭
+                    self._close(ws, ws_loop)
+                    continue
+                now = time.monotonic()
+                if now > expire_time or not is_open(ws):
+                    self._close(ws)
+                    continue
+                if now - idle_since > self.ping_after:
+                    if not await self._ping(ws):
+                        self._close(ws)
+                        continue
+                self._stats["hits"] += 1
+                return ws
+            self._stats["misses"] += 1
+            return await connect()
+        finally:
+            self._refill(key, connect, idle_timeout)
+
+    def release(self, key: Hashable, ws, idle_timeout: float = 60) -> None:
+        """会话正常结束后归还连接，连接已断开或空闲连接已满时关闭"""
+        if not self.enabled or not is_open(ws):
+            self._close(ws)
+            return
+        idle = self._idle[key]
+        self._purge(idle)
+        if len(idle) >= self.max_idle:
+            self._close(ws)
+            return
+        now = time.monotonic()
+        idle.append((ws, now, now + idle_timeout, asyncio.get_running_loop()))
+
+    def discard(self, ws) -> None:
+        """关闭状态未知的连接，不放回池中"""
+        self._close(ws)
+
+    def stats(self) -> dict:
+        idle = sum(len(entries) for entries in self._idle.values())
+        return {**self._stats, "idle": idle}
+
+    def _refill(self, key, connect, idle_timeout) -> None:
+        """预先建立连接，让下一个会话直接借到"""
+        if not self.enabled or not self.prewarm:
+            return
+        missing = self.prewarm - len(self._idle[key]) - self._warming[key]
+        for _ in range(max(0, missing)):
+            self._warming[key] += 1
+            asyncio.create_task(self._warm(key, connect, idle_timeout))
+
+    async def _warm(self, key, connect, idle_timeout) -> None:
+        try:
+            ws = await connect()
+            if ws is not None:
+                self.release(key, ws, idle_timeout)
+        except Exception as e:
+            logger.bind(tag=TAG).warning(f"预建上游连接失败: {e}")
+        finally:
+            self._warming[key] -= 1
+
+    async def _ping(self, ws) -> bool:
+        try:
+            pong_waiter = await ws.ping()
+            await asyncio.wait_for(pong_waiter, timeout=self.ping_timeout)
+            return True
+        except Exception:
+            return False
+
+    def _purge(self, idle: deque) -> None:
+        now = time.monotonic()
+        for entry in list(idle):
+            if now > entry[2] or not is_open(entry[0]):
+                idle.remove(entry)
+                self._close(entry[0], entry[3])
+
+    def _close(self, ws, ws_loop=None) -> None:
+        if ws is None:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = None
+        if ws_loop is not None and ws_loop is not loop:
+            # 连接只能在所属的事件循环中关闭
+            try:
+                ws_loop.call_soon_threadsafe(self._close, ws, ws_loop)
+            except RuntimeError:
+                # 所属的事件循环已关闭，交给垃圾回收
+                pass
+            return
+        if loop is None:
+            # 没有运行中的事件循环时交给垃圾回收
+            return
+
+        async def close_quietly():
+            try:
+                await ws.close()
+            except Exception:
+                pass
+
+        task = loop.create_task(close_quietly())
+        self._closing.add(task)
+        task.add_done_callback(self._closing.discard)
+
+
+# 创建全局上游连接池实例
+ws_pool = WebSocketPool()
@@ -4,6 +4,12 @@ from config.logger import setup_logging
 from core.connection import ConnectionHandler
 from core.utils.util import initialize_modules, check_vad_update, check_asr_update
 from config.config_loader import get_config_from_api
+from core.utils.runtime import runtime
+from core.utils.cache.tts_phrase import tts_phrase_cache
+from core.utils.asset_bank import asset_bank
+from core.utils.ws_pool import ws_pool
+from core.utils.http_client import http_client
+from core.utils.intent_classifier import intent_classifier
 
 TAG = __name__
 
@@ -13,6 +19,17 @@ class WebSocketServer:
         self.config = config
         self.logger = setup_logging()
         self.config_lock = asyncio.Lock()
+        # 所有连接共享的线程池，按负载类型划分并限制大小
+        runtime.configure(self.config)
+        tts_phrase_cache.configure(self.config)
+        # 流式TTS的上游连接在设备之间复用
+        ws_pool.configure(self.config)
+        # 基于HTTP的上游服务共用长连接池
+        http_client.configure(self.config)
+        # 明确的意图在本地识别，不确定的才请求意图识别大模型
+        intent_classifier.configure(self.config)
+        # 内置提示音启动时一次性编码，运行时直接复用
+        asset_bank.preload()
         modules = initialize_modules(
             self.logger,
             self.config,
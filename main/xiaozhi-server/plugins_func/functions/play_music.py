@@ -1,14 +1,13 @@
 import os
 import re
-import time
 import random
-import difflib
 import traceback
-from pathlib import Path
 from core.handle.sendAudioHandle import send_stt_message
 from plugins_func.register import register_function, ToolType, ActionResponse, Action
 from core.utils.dialogue import Message
-from core.tts.dto import TTSMessageDTO, SentenceType, ContentType
+from core.utils.music_catalog import MusicCatalog
+from core.utils.runtime import runtime, WorkloadType
+from core.providers.tts.dto.dto import TTSMessageDTO, SentenceType, ContentType
 
 TAG = __name__
 
@@ -82,39 +81,6 @@ def _extract_song_name(text):
     return None
 
 
-def _find_best_match(potential_song, music_files):
-    """查找最匹配的歌曲"""
-    best_match = None
-    highest_ratio = 0
-
-    for music_file in music_files:
-        song_name = os.path.splitext(music_file)[0]
-        ratio = difflib.SequenceMatcher(None, potential_song, song_name).ratio()
-        if ratio > highest_ratio and ratio > 0.4:
-            highest_ratio = ratio
-            best_match = music_file
-    return best_match
-
-
-def get_music_files(music_dir, music_ext):
-    music_dir = Path(music_dir)
-    music_files = []
-    music_file_names = []
-    for file in music_dir.rglob("*"):
-        # 判断是否是文件
-        if file.is_file():
-            # 获取文件扩展名
-            ext = file.suffix.lower()
-            # 判断扩展名是否在列表中
-            if ext in music_ext:
-                # 添加相对路径
-                music_files.append(str(file.relative_to(music_dir)))
-                music_file_names.append(
-                    os.path.splitext(str(file.relative_to(music_dir)))[0]
-                )
-    return music_files, music_file_names
-
-
 def initialize_music_handler(conn):
     global MUSIC_CACHE
     if MUSIC_CACHE == {}:
@@ -129,18 +95,37 @@ def initialize_music_handler(conn):
             MUSIC_CACHE["refresh_time"] = MUSIC_CACHE["music_config"].get(
                 "refresh_time", 60
             )
+            MUSIC_CACHE["catalog_file"] = MUSIC_CACHE["music_config"].get(
+                "catalog_file", "data/.music_catalog.db"
+            )
+            MUSIC_CACHE["prompt_top_k"] = int(
+                MUSIC_CACHE["music_config"].get("prompt_top_k", 20)
+            )
         else:
             MUSIC_CACHE["music_dir"] = os.path.abspath("./music")
             MUSIC_CACHE["music_ext"] = (".mp3", ".wav", ".p3")
             MUSIC_CACHE["refresh_time"] = 60
-        # 获取音乐文件列表
-        MUSIC_CACHE["music_files"], MUSIC_CACHE["music_file_names"] = get_music_files(
-            MUSIC_CACHE["music_dir"], MUSIC_CACHE["music_ext"]
+            MUSIC_CACHE["catalog_file"] = "data/.music_catalog.db"
+            MUSIC_CACHE["prompt_top_k"] = 20
+        # 持久化的音乐目录，按目录修改时间增量更新
+        MUSIC_CACHE["catalog"] = MusicCatalog(
+            MUSIC_CACHE["music_dir"],
+            MUSIC_CACHE["music_ext"],
+            catalog_file=MUSIC_CACHE["catalog_file"],
+            refresh_time=MUSIC_CACHE["refresh_time"],
         )
-        MUSIC_CACHE["scan_time"] = time.time()
+        MUSIC_CACHE["catalog"].refresh()
     return MUSIC_CACHE
 
 
+def get_music_prompt_names(conn, text=None):
+    """意图识别提示词中的候选歌名，按用户输入取最相关的前k首"""
+    music_cache = initialize_music_handler(conn)
+    catalog = music_cache["catalog"]
+    catalog.refresh_if_stale()
+    return catalog.prompt_candidates(text, limit=music_cache["prompt_top_k"])
+
+
 async def handle_music_command(conn, text):
     initialize_music_handler(conn)
     global MUSIC_CACHE
@@ -151,16 +136,13 @@ async def handle_music_command(conn, text):
 
     # 尝试匹配具体歌名
     if os.path.exists(MUSIC_CACHE["music_dir"]):
-        if time.time() - MUSIC_CACHE["scan_time"] > MUSIC_CACHE["refresh_time"]:
-            # 刷新音乐文件列表
-            MUSIC_CACHE["music_files"], MUSIC_CACHE["music_file_names"] = (
-                get_music_files(MUSIC_CACHE["music_dir"], MUSIC_CACHE["music_ext"])
-            )
-            MUSIC_CACHE["scan_time"] = time.time()
+        catalog = MUSIC_CACHE["catalog"]
+        # 增量刷新音乐目录，目录未变化时只检查目录修改时间
+        await runtime.run(WorkloadType.NETWORK, catalog.refresh_if_stale)
 
         potential_song = _extract_song_name(clean_text)
         if potential_song:
-            best_match = _find_best_match(potential_song, MUSIC_CACHE["music_files"])
+            best_match = catalog.find_best_match(potential_song)
             if best_match:
                 conn.logger.bind(tag=TAG).info(f"找到最匹配的歌曲: {best_match}")
                 await play_local_music(conn, specific_file=best_match)
@@ -202,10 +184,10 @@ async def play_local_music(conn, specific_file=None):
             selected_music = specific_file
             music_path = os.path.join(MUSIC_CACHE["music_dir"], specific_file)
         else:
-            if not MUSIC_CACHE["music_files"]:
+            selected_music = MUSIC_CACHE["catalog"].random_song()
+            if not selected_music:
                 conn.logger.bind(tag=TAG).error("未找到MP3音乐文件")
                 return
-            selected_music = random.choice(MUSIC_CACHE["music_files"])
             music_path = os.path.join(MUSIC_CACHE["music_dir"], selected_music)
 
         if not os.path.exists(music_path):
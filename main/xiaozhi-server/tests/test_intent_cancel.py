@@ -0,0 +1,208 @@
+"""
+意图识别超时与打断的压力测试
+识别进行中打断（取消conn.intent_task）时放弃本轮，下一轮仍能正常识别和对话；
+识别超时时按继续聊天处理；一个连接的识别阻塞时，其它连接的音频照常处理
+"""
+
+import asyncio
+import json
+import threading
+import time
+
+import core.utils.asr  # noqa: F401 先加载ASR模块，避免receiveAudioHandle的循环导入
+from core.handle import receiveAudioHandle
+from core.handle.abortHandle import handleAbortMessage
+from core.providers.intent.intent_llm import intent_llm
+from core.utils.dialogue import Dialogue
+from core.utils.runtime import runtime, WorkloadType
+
+CONTINUE_CHAT = json.dumps({"function_call": {"name": "continue_chat"}})
+# 含有这个词的输入，模拟意图识别大模型一直没有返回
+SLOW_WORD = "慢"
+
+
+class FakeLLM:
+    model_name = "fake-intent-llm"
+
+    def __init__(self):
+        self.started = asyncio.Event()
+        self.cancelled = 0
+
+    async def response_no_stream_async(self, system_prompt, user_prompt):
+        self.started.set()
+        try:
+            if SLOW_WORD in user_prompt.splitlines()[-1]:
+                await asyncio.sleep(3600)
+            return CONTINUE_CHAT
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+
+
+class BlockingLLM(FakeLLM):
+    """同步的网络调用，在网络线程池中阻塞直到被放行"""
+
+    def __init__(self):
+        super().__init__()
+        self.release = threading.Event()
+
+    async def response_no_stream_async(self, system_prompt, user_prompt):
+        self.started.set()
+        await runtime.run(WorkloadType.NETWORK, self.release.wait, 30)
+        return CONTINUE_CHAT
+
+
+class FakeWebsocket:
+    async def send(self, message):
+        pass
+
+
+class FakeConn:
+    def __init__(self, timeout=60):
+        self.session_id = "test-session"
+        self.device_id = "test-device"
+        self.headers = {"device-id": self.device_id}
+        self.config = {
+            "enable_wakeup_words_response_cache": False,
+            "wakeup_words": [],
+            "plugins": {"home_assistant": {"devices": []}},
+        }
+        self.cmd_exit = []
+        self.need_bind = False
+        self.max_output_size = 0
+        self.current_speaker = None
+        self.client_abort = False
+        self.asr_server_receive = False
+        self.chat_task = None
+        self.llm_stream_task = None
+        self.intent_task = None
+        self.intent_type = "intent_llm"
+        self.func_handler = None
+        self.dialogue = Dialogue()
+        self.websocket = FakeWebsocket()
+        self.logger = intent_llm.logger
+        self.llm = FakeLLM()
+        self.intent = intent_llm.IntentProvider({"timeout": str(timeout)})
+        self.intent.set_llm(self.llm)
+        self.chats = []
+
+    async def chat(self, text):
+        self.chats.append(text)
+
+    def cancel_llm_stream(self):
+        for task in (self.llm_stream_task, self.intent_task):
+            if task is not None and not task.done():
+                task.cancel()
+
+    def clear_queues(self):
+        pass
+
+    def clearSpeakStatus(self):
+        pass
+
+
+def _patch(monkeypatch):
+    async def send_stt_message(conn, text):
+        pass
+
+    monkeypatch.setattr(receiveAudioHandle, "send_stt_message", send_stt_message)
+    monkeypatch.setattr(intent_llm, "get_music_prompt_names", lambda conn, text: "")
+
+
+async def _abort_mid_intent(conn, text):
+    """开始一轮对话，在意图识别进行中打断"""
+    conn.llm.started.clear()
+    await receiveAudioHandle.startToChat(conn, text)
+    await conn.llm.started.wait()
+    assert conn.intent_task is not None and not conn.intent_task.done()
+    await handleAbortMessage(conn)
+    await conn.chat_task
+
+
+def test_abort_during_intent_drops_turn_and_next_turn_runs(monkeypatch):
+    _patch(monkeypatch)
+
+    async def run():
+        conn = FakeConn()
+        await _abort_mid_intent(conn, f"{SLOW_WORD}一点讲个故事")
+        assert conn.llm.cancelled == 1
+        assert conn.intent_task is None
+        assert conn.chats == []
+
+        # 打断后紧接着的新一轮（如唤醒词打断后的listen/detect）不能被之前的打断状态吞掉
+        await receiveAudioHandle.startToChat(conn, "今天过得怎么样")
+        await conn.chat_task
+        assert conn.chats == ["今天过得怎么样"]
+
+    asyncio.run(run())
+
+
+def test_repeated_barge_in_stress(monkeypatch):
+    _patch(monkeypatch)
+
+    async def run():
+        conn = FakeConn()
+        rounds = 50
+        for i in range(rounds):
+            await _abort_mid_intent(conn, f"{SLOW_WORD}慢说第{i}句")
+            await receiveAudioHandle.startToChat(conn, f"第{i}轮")
+            await conn.chat_task
+        assert conn.llm.cancelled == rounds
+        assert conn.chats == [f"第{i}轮" for i in range(rounds)]
+        assert conn.intent_task is None
+
+    asyncio.run(run())
+
+
+def test_intent_timeout_falls_back_to_chat(monkeypatch):
+    _patch(monkeypatch)
+
+    async def run():
+        conn = FakeConn(timeout=0.05)
+        texts = [f"{SLOW_WORD}一点回答第{i}个问题" for i in range(20)]
+        for text in texts:
+            await receiveAudioHandle.startToChat(conn, text)
+            await conn.chat_task
+        assert conn.llm.cancelled == len(texts)
+        assert conn.chats == texts
+
+    asyncio.run(run())
+
+
+def test_blocked_intent_does_not_stall_other_connections(monkeypatch):
+    _patch(monkeypatch)
+    frame_interval = 0.005
+
+    async def run():
+        blocked = FakeConn()
+        blocked.llm = BlockingLLM()
+        blocked.intent.set_llm(blocked.llm)
+        other = FakeConn()
+
+        await receiveAudioHandle.startToChat(blocked, f"{SLOW_WORD}一点讲个故事")
+        await blocked.llm.started.wait()
+
+        # 另一个连接按固定间隔处理音频帧，记录事件循环的最大延迟
+        frames = 0
+        max_lag = 0.0
+        deadline = time.monotonic() + 0.5
+        while time.monotonic() < deadline:
+            expected = time.monotonic() + frame_interval
+            await asyncio.sleep(frame_interval)
+            max_lag = max(max_lag, time.monotonic() - expected)
+            frames += 1
+            if frames % 20 == 0:
+                await receiveAudioHandle.startToChat(other, f"第{frames}帧")
+                await other.chat_task
+
+        try:
+            assert not blocked.chat_task.done()
+            assert frames >= 50
+            assert max_lag < 0.1
+            assert other.chats == [f"第{i}帧" for i in range(20, frames + 1, 20)]
+        finally:
+            blocked.llm.release.set()
+        await blocked.chat_task
+        assert blocked.chats == [f"{SLOW_WORD}一点讲个故事"]
+
+    asyncio.run(run())
@@ -0,0 +1,59 @@
+"""本地意图识别的规则：只在确定时给出结果，其余交给大模型"""
+
+import json
+
+import pytest
+
+from core.utils.intent_classifier import LocalIntentClassifier
+from core.utils.music_catalog import MusicCatalog
+
+
+@pytest.fixture
+def catalog(tmp_path):
+    music_dir = tmp_path / "music"
+    music_dir.mkdir()
+    for name in ("晴天.mp3", "稻香.mp3", "下一首情歌.mp3"):
+        (music_dir / name).touch()
+    catalog = MusicCatalog(
+        str(music_dir), (".mp3",), catalog_file=str(tmp_path / "catalog.db")
+    )
+    catalog.refresh()
+    return catalog
+
+
+def _function_call(result):
+    return json.loads(result)["function_call"] if result else None
+
+
+@pytest.mark.parametrize(
+    "text",
+    ["来一首唐诗", "来一首诗吧", "播放暂停", "播放下一首", "播放一下刚才的录音"],
+)
+def test_song_not_in_catalog_falls_through(catalog, text):
+    assert LocalIntentClassifier().classify(text, set(), catalog) is None
+
+
+@pytest.mark.parametrize("text,song", [("播放晴天", "晴天"), ("来一首稻香吧", "稻香")])
+def test_song_in_catalog_plays_locally(catalog, text, song):
+    function_call = _function_call(LocalIntentClassifier().classify(text, set(), catalog))
+    assert function_call == {"name": "play_music", "arguments": {"song_name": song}}
+
+
+def test_song_without_loaded_catalog_falls_through():
+    assert LocalIntentClassifier().classify("播放晴天", set()) is None
+
+
+@pytest.mark.parametrize("text", ["什么是今天的股价", "为什么我的快递还没到"])
+def test_open_questions_go_to_llm(text):
+    assert LocalIntentClassifier().classify(text, set()) is None
+
+
+def test_obvious_intents_decided_locally():
+    classifier = LocalIntentClassifier()
+    assert _function_call(classifier.classify("你好呀", set())) == {
+        "name": "continue_chat"
+    }
+    assert _function_call(classifier.classify("放首歌", set())) == {
+        "name": "play_music",
+        "arguments": {"song_name": "random"},
+    }
@@ -0,0 +1,103 @@
+"""OpenAI兼容接口的流式输出：content为None的chunk和<think>标签"""
+
+import asyncio
+from types import SimpleNamespace
+
+import core.utils.asr  # noqa: F401 先加载ASR模块，避免util的循环导入
+from core.providers.llm.openai import openai as openai_llm
+
+
+def _chunk(content):
+    return SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=content))])
+
+
+# 推理模型先输出reasoning_content（content为None），结束的chunk的content也为None
+CHUNKS = [
+    _chunk(None),
+    _chunk(None),
+    _chunk("<think>想一想"),
+    _chunk("还在想</think>你"),
+    _chunk(None),
+    _chunk("好"),
+    SimpleNamespace(choices=[]),
+    _chunk(None),
+]
+
+
+def _provider(chunks):
+    provider = object.__new__(openai_llm.LLMProvider)
+    provider.model_name = "test-model"
+    provider.max_tokens = 500
+    provider.client = SimpleNamespace(
+        chat=SimpleNamespace(
+            completions=SimpleNamespace(create=lambda **kwargs: iter(chunks))
+        )
+    )
+    return provider
+
+
+def test_chunk_content_none_is_empty():
+    assert openai_llm._chunk_content(_chunk(None)) == ""
+    assert openai_llm._chunk_content(SimpleNamespace(choices=[])) == ""
+    assert openai_llm._strip_think(None, True) == ("", True)
+    assert openai_llm._strip_think("", False) == ("", False)
+
+
+def test_strip_think_across_chunks():
+    is_active = True
+    output = []
+    for chunk in CHUNKS:
+        content, is_active = openai_llm._strip_think(
+            openai_llm._chunk_content(chunk), is_active
+        )
+        output.append(content)
+    assert "".join(output) == "你好"
+    assert is_active
+
+
+def test_response_skips_none_chunks(monkeypatch):
+    errors = []
+    monkeypatch.setattr(
+        openai_llm.logger, "bind", lambda **kwargs: SimpleNamespace(error=errors.append)
+    )
+    assert "".join(_provider(CHUNKS).response("session", [])) == "你好"
+    assert errors == []
+
+
+def test_response_stream_skips_none_chunks(monkeypatch):
+    class FakeStream:
+        def __init__(self, chunks):
+            self._chunks = iter(chunks)
+
+        async def __aenter__(self):
+            return self
+
+        async def __aexit__(self, *exc):
+            return False
+
+        def __aiter__(self):
+            return self
+
+        async def __anext__(self):
+            try:
+                return next(self._chunks)
+            except StopIteration:
+                raise StopAsyncIteration
+
+    async def create(**kwargs):
+        return FakeStream(CHUNKS)
+
+    errors = []
+    monkeypatch.setattr(
+        openai_llm.logger, "bind", lambda **kwargs: SimpleNamespace(error=errors.append)
+    )
+    provider = _provider(CHUNKS)
+    provider._async_client = lambda: SimpleNamespace(
+        chat=SimpleNamespace(completions=SimpleNamespace(create=create))
+    )
+
+    async def collect():
+        return "".join([part async for part in provider.response_stream("session", [])])
+
+    assert asyncio.run(collect()) == "你好"
+    assert errors == []
@@ -0,0 +1,105 @@
+"""VAD预判跳过静音窗口后，送入模型的窗口仍拿到与不跳过时相同的上下文"""
+
+import asyncio
+from collections import deque
+
+import numpy as np
+import pytest
+
+from core.providers.vad.base import SileroVADProviderBase
+from core.utils.vad_engine import CONTEXT_SIZE_SAMPLES, WINDOW_SIZE_SAMPLES
+
+
+class ContextBackend:
+    """语音概率取决于上下文和窗口本身，状态只做计数，便于比较上下文是否一致"""
+
+    def forward(self, x, state):
+        probs = np.abs(x[:, :CONTEXT_SIZE_SAMPLES]).mean(axis=1) + np.abs(
+            x[:, CONTEXT_SIZE_SAMPLES:]
+        ).mean(axis=1)
+        return probs.astype(np.float32), state + 1
+
+
+class FakeConn:
+    def __init__(self):
+        self.vad_stream = None
+        self.last_is_voice = False
+        self.client_voice_window = deque(maxlen=5)
+        self.client_have_voice = False
+        self.client_have_voice_last_time = 0.0
+        self.client_voice_stop = False
+
+
+class _StreamState:
+    """不创建Opus解码器的流状态"""
+
+    def __init__(self):
+        self.state = np.zeros((2, 1, 128), dtype=np.float32)
+        self.context = np.zeros((1, CONTEXT_SIZE_SAMPLES), dtype=np.float32)
+
+
+def _speech_then_silence():
+    """前半段是语音（正弦波，每个窗口的末尾都不同），后半段是静音"""
+    rng = np.random.default_rng(0)
+    speech = 0.3 * np.sin(np.arange(4 * WINDOW_SIZE_SAMPLES) / 7.0)
+    speech += 0.05 * rng.standard_normal(len(speech))
+    silence = np.zeros(3 * WINDOW_SIZE_SAMPLES)
+    audio = np.concatenate((speech, silence)).astype(np.float32)
+    return audio.reshape(-1, WINDOW_SIZE_SAMPLES)
+
+
+def _provider(pre_gate_enable, windows, monkeypatch):
+    provider = SileroVADProviderBase(
+        {"pre_gate_enable": pre_gate_enable}, ContextBackend()
+    )
+    probs = []
+    real_update = provider._update_voice_state
+
+    def update_voice_state(conn, speech_probs):
+        probs.append(speech_probs.copy())
+        return real_update(conn, speech_probs)
+
+    monkeypatch.setattr(provider, "_decode_windows", lambda conn, packet: windows)
+    monkeypatch.setattr(provider, "_update_voice_state", update_voice_state)
+    monkeypatch.setattr("core.providers.vad.base.VADStreamState", _StreamState)
+    return provider, probs
+
+
+@pytest.mark.parametrize("use_async", [False, True])
+def test_gated_probs_match_ungated(monkeypatch, use_async):
+    windows = _speech_then_silence()
+
+    results = {}
+    for pre_gate_enable in (False, True):
+        provider, probs = _provider(pre_gate_enable, windows, monkeypatch)
+        conn = FakeConn()
+        if use_async:
+            asyncio.run(provider.is_vad_async(conn, b""))
+        else:
+            provider.is_vad(conn, b"")
+        results[pre_gate_enable] = (probs[0], conn.vad_stream.context)
+
+    ungated, ungated_context = results[False]
+    gated, gated_context = results[True]
+    kept = np.arange(4)
+    # 语音窗口的概率与不跳过时完全一致，静音窗口直接为0
+    np.testing.assert_array_equal(gated[kept], ungated[kept])
+    assert (gated[4:] == 0).all()
+    # 最后一个窗口被跳过，上下文仍与不跳过时一致
+    np.testing.assert_array_equal(gated_context, ungated_context)
+
+
+def test_skipped_window_resets_context_for_next_run(monkeypatch):
+    # 语音-静音-语音：第二段语音以静音窗口的末尾作为上下文
+    windows = _speech_then_silence()
+    windows = np.concatenate((windows[:2], windows[-1:], windows[2:4]))
+
+    results = {}
+    for pre_gate_enable in (False, True):
+        provider, probs = _provider(pre_gate_enable, windows, monkeypatch)
+        provider.is_vad(FakeConn(), b"")
+        results[pre_gate_enable] = probs[0]
+
+    assert results[True][2] == 0
+    kept = [0, 1, 3, 4]
+    np.testing.assert_array_equal(results[True][kept], results[False][kept])